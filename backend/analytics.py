@@ -0,0 +1,296 @@
+# backend/analytics.py
+"""
+Portfolio exposure summaries for the insurance pool.
+
+claim_exposure holds one row per (week, crop_type, region, status, is_stressed)
+with the claim count, insured acres and payout sums of the claims in it. It is
+kept current inside the same transaction as the claims themselves:
+
+    before_flush   new / changed / deleted Claims become -1 / +1 deltas on their
+                   keys; the pre-change row is read from the database, so this is
+                   right even when an attribute was expired on the instance
+    after_flush    the deltas are applied with INSERT .. ON CONFLICT DO UPDATE
+
+so GET /api/analytics/exposure reads a table sized by weeks x crops x regions x
+statuses, however many claims there are, and groups it with NumPy. A claim is
+filed under its land's crop, size and location at the time the claim row was
+written; region is the ANALYTICS_REGION_DEGREES lat/lon grid cell.
+
+Query.update()/delete() on claims bypasses the ORM events and marks the summaries
+stale in analytics_state, in the same transaction as the bulk write, so every
+process sees it until `python analytics.py rebuild` recomputes them from scratch
+in one transaction and clears it (idempotent; writers wait on SQLite's lock
+while it runs).
+"""
+import math, os, time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import AnalyticsState, Claim, ClaimExposure, Land
+
+ANALYTICS_REGION_DEGREES = float(os.environ.get("ANALYTICS_REGION_DEGREES", 1.0))
+
+DIMENSIONS = ("week", "crop_type", "region", "status", "is_stressed")
+SUMS = ("claims", "acres", "payout_pct_sum", "payout_acres_sum", "probability_sum")
+TRACKED = ("land_id", "status", "is_stressed", "payout_percentage", "model1_probability", "created_at")
+_IN_CHUNK = 500  # SQLite bound-parameter limit is 999 on older builds
+STATE_NAME = "claim_exposure"  # analytics_state row
+
+
+def region_of(lat, lon, deg=ANALYTICS_REGION_DEGREES):
+    if lat is None or lon is None:
+        return "unknown"
+    return f"{math.floor(lat / deg) * deg:g},{math.floor(lon / deg) * deg:g}"
+
+
+def week_of(ts):
+    d = ts.date() if isinstance(ts, datetime) else ts
+    return d - timedelta(days=d.weekday())
+
+
+def contribution(claim, land):
+    """(key, sums) that one claim adds to claim_exposure.
+
+    `claim` maps the TRACKED attributes; `land` is (crop_type, size_acres, geo_lat, geo_lon) or None.
+    """
+    crop, acres, lat, lon = land or (None, None, None, None)
+    acres = float(acres or 0.0)
+    payout = float(claim["payout_percentage"] or 0.0)
+    key = (week_of(claim["created_at"]), crop or "unknown", region_of(lat, lon), claim["status"] or "submitted",
+           -1 if claim["is_stressed"] is None else int(claim["is_stressed"]))
+    return key, (1, acres, payout, payout * acres, float(claim["model1_probability"] or 0.0))
+
+
+def _add(deltas, key, sums, sign):
+    cur = deltas.get(key)
+    deltas[key] = tuple(sign * v for v in sums) if cur is None else tuple(c + sign * v for c, v in zip(cur, sums))
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), _IN_CHUNK):
+        yield ids[i:i + _IN_CHUNK]
+
+
+def _lands(conn, land_ids):
+    t = Land.__table__
+    out = {}
+    for chunk in _chunks(i for i in land_ids if i is not None):
+        for row in conn.execute(select(t.c.id, t.c.crop_type, t.c.size_acres, t.c.geo_lat, t.c.geo_lon)
+                                .where(t.c.id.in_(chunk))):
+            out[row[0]] = tuple(row[1:])
+    return out
+
+
+def apply_deltas(conn, deltas):
+    """Add `deltas` ({key: sums}) onto claim_exposure, creating missing rows."""
+    if not deltas:
+        return
+    t = ClaimExposure.__table__
+    stmt = sqlite_insert(t)
+    stmt = stmt.on_conflict_do_update(index_elements=[t.c[d] for d in DIMENSIONS],
+                                      set_={s: t.c[s] + stmt.excluded[s] for s in SUMS})
+    conn.execute(stmt, [dict(zip(DIMENSIONS + SUMS, key + sums)) for key, sums in deltas.items()])
+
+
+# -- incremental maintenance ----------------------------------------------
+
+def _tracked_change(obj):
+    attrs = inspect(obj).attrs
+    return any(attrs[a].history.has_changes() for a in TRACKED)
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    new = [o for o in session.new if isinstance(o, Claim)]
+    changed = [o for o in session.dirty if isinstance(o, Claim) and _tracked_change(o)]
+    deleted = [o for o in session.deleted if isinstance(o, Claim)]
+    if not (new or changed or deleted):
+        return
+    for o in new:
+        if o.created_at is None:
+            o.created_at = datetime.utcnow()  # the column default, set now so the week is known
+    conn = session.connection()
+    t = Claim.__table__
+    old = []
+    old_ids = [inspect(o).identity[0] for o in changed + deleted if inspect(o).identity]
+    for chunk in _chunks(old_ids):
+        old.extend(row._mapping for row in conn.execute(
+            select(*[t.c[a] for a in TRACKED]).where(t.c.id.in_(chunk))))
+    current = [{a: getattr(o, a) for a in TRACKED} for o in new + changed]
+    lands = _lands(conn, {r["land_id"] for r in old} | {c["land_id"] for c in current})
+    deltas = {}
+    for row in old:
+        _add(deltas, *contribution(row, lands.get(row["land_id"])), sign=-1)
+    for row in current:
+        _add(deltas, *contribution(row, lands.get(row["land_id"])), sign=1)
+    deltas = {k: v for k, v in deltas.items() if any(v)}
+    if deltas:
+        session.info.setdefault("analytics_deltas", []).append(deltas)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    pending = session.info.pop("analytics_deltas", None)
+    if pending:
+        conn = session.connection()
+        for deltas in pending:
+            apply_deltas(conn, deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("analytics_deltas", None)
+
+
+def _set_stale(conn, reason):
+    """Upsert the claim_exposure stale flag; `reason` None clears it."""
+    t = AnalyticsState.__table__
+    values = {"stale": reason is not None, "stale_reason": reason, "updated_at": datetime.utcnow()}
+    stmt = sqlite_insert(t).values(name=STATE_NAME, **values)
+    conn.execute(stmt.on_conflict_do_update(index_elements=[t.c.name], set_=values))
+
+
+def stale_state(conn):
+    t = AnalyticsState.__table__
+    row = conn.execute(select(t.c.stale, t.c.stale_reason).where(t.c.name == STATE_NAME)).first()
+    return {"stale": bool(row and row[0]), "stale_reason": row[1] if row else None}
+
+
+def _after_bulk(context):
+    if context.mapper is not None and context.mapper.class_ is Claim:
+        _set_stale(context.session.connection(),
+                   f"bulk {type(context).__name__} on claims at {datetime.utcnow().isoformat()}Z")
+        print("analytics: claim_exposure is stale after a bulk claims update; run `python analytics.py rebuild`")
+
+
+event.listen(Session, "after_bulk_update", _after_bulk)
+event.listen(Session, "after_bulk_delete", _after_bulk)
+
+
+# -- rebuild ----------------------------------------------------------------
+
+def rebuild(session, batch=5000):
+    """Recompute claim_exposure from claims + lands and commit. Running it twice gives the same table."""
+    started = time.perf_counter()
+    conn = session.connection()
+    ct, lt = Claim.__table__, Land.__table__
+    conn.execute(ClaimExposure.__table__.delete())  # first write: later claim writers wait for our commit
+    rows = conn.execution_options(stream_results=True).execute(
+        select(*[ct.c[a] for a in TRACKED], lt.c.crop_type, lt.c.size_acres, lt.c.geo_lat, lt.c.geo_lon)
+        .select_from(ct.outerjoin(lt, lt.c.id == ct.c.land_id)))
+    deltas = {}
+    n = 0
+    while True:
+        chunk = rows.fetchmany(batch)
+        if not chunk:
+            break
+        for row in chunk:
+            land = tuple(row[len(TRACKED):]) if row[len(TRACKED)] is not None else None
+            _add(deltas, *contribution(dict(zip(TRACKED, row[:len(TRACKED)])), land), sign=1)
+        n += len(chunk)
+    items = list(deltas.items())
+    for i in range(0, len(items), batch):
+        apply_deltas(conn, dict(items[i:i + batch]))
+    _set_stale(conn, None)
+    session.commit()
+    return {"claims": n, "summary_rows": len(deltas), "seconds": round(time.perf_counter() - started, 3)}
+
+
+# -- queries ----------------------------------------------------------------
+
+def _group(values, group_by):
+    """Group summary rows on `group_by` with NumPy: (key columns, {sum: per-group totals})."""
+    n = len(values["claims"])
+    if not group_by:
+        inverse, n_groups, keys = np.zeros(n, dtype=np.intp), 1 if n else 0, {}
+    else:
+        codes, uniques = [], []
+        for g in group_by:
+            u, inv = np.unique(values[g], return_inverse=True)
+            uniques.append(u)
+            codes.append(inv)
+        flat = np.ravel_multi_index(codes, [len(u) for u in uniques]) if n else np.zeros(0, dtype=np.intp)
+        groups, inverse = np.unique(flat, return_inverse=True)
+        n_groups = len(groups)
+        parts = np.unravel_index(groups, [len(u) for u in uniques]) if n_groups else [[] for _ in group_by]
+        keys = {g: u[p] for g, u, p in zip(group_by, uniques, parts)}
+    sums = {s: np.bincount(inverse, weights=values[s], minlength=n_groups) for s in SUMS}
+    sums["stressed_claims"] = np.bincount(inverse, weights=values["claims"] * (values["is_stressed"] == 1),
+                                          minlength=n_groups)
+    return keys, sums, n_groups
+
+
+def _metrics(sums, i):
+    claims, acres = sums["claims"][i], sums["acres"][i]
+    return {
+        "claims": int(round(claims)),
+        "stressed_claims": int(round(sums["stressed_claims"][i])),
+        "acres": round(float(acres), 4),
+        "avg_payout_pct": round(float(sums["payout_pct_sum"][i] / claims), 4) if claims else None,
+        "acre_weighted_payout_pct": round(float(sums["payout_acres_sum"][i] / acres), 4) if acres else None,
+        "exposure_acres": round(float(sums["payout_acres_sum"][i] / 100.0), 4),  # acres x payout fraction
+        "avg_probability": round(float(sums["probability_sum"][i] / claims), 4) if claims else None,
+    }
+
+
+def exposure(session, group_by=(), start=None, end=None, **filters):
+    """Totals and per-group exposure from claim_exposure.
+
+    group_by: any of DIMENSIONS; start/end: dates bounding the claim week;
+    filters: DIMENSION=value (or list of values) equality filters.
+    """
+    t = ClaimExposure.__table__
+    q = select(*[t.c[c] for c in DIMENSIONS + SUMS]).where(t.c.claims != 0)
+    if start:
+        q = q.where(t.c.week >= week_of(start))
+    if end:
+        q = q.where(t.c.week <= end)
+    for dim, value in filters.items():
+        if value is not None:
+            q = q.where(t.c[dim].in_(value if isinstance(value, (list, tuple, set)) else [value]))
+    conn = session.connection()
+    rows = conn.execute(q).fetchall()
+    cols = list(zip(*rows)) or [()] * len(DIMENSIONS + SUMS)
+    values = {}
+    for name, col in zip(DIMENSIONS + SUMS, cols):
+        if name == "week":
+            values[name] = np.array([d.isoformat() for d in col], dtype=str)
+        elif name in ("crop_type", "region", "status"):
+            values[name] = np.array(col, dtype=str)
+        else:
+            values[name] = np.array(col, dtype=float)
+    keys, sums, n_groups = _group(values, list(group_by))
+    groups = []
+    for i in range(n_groups if group_by else 0):
+        item = {g: (int(keys[g][i]) if g == "is_stressed" else str(keys[g][i])) for g in group_by}
+        item.update(_metrics(sums, i))
+        groups.append(item)
+    _, total_sums, n_total = _group(values, [])
+    totals = _metrics(total_sums, 0) if n_total else _metrics({k: [0.0] for k in total_sums}, 0)
+    return {"group_by": list(group_by), "groups": groups, "totals": totals, "summary_rows": len(rows),
+            **stale_state(conn)}
+
+
+def main():
+    import argparse, json
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=["rebuild", "show"])
+    ap.add_argument("--group-by", default="crop_type")
+    args = ap.parse_args()
+    from database import create_app, db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if args.command == "rebuild":
+            print(json.dumps(rebuild(db.session)))
+        else:
+            print(json.dumps(exposure(db.session, [g for g in args.group_by.split(",") if g]), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,45 @@
 # backend/app.py
-import os, json, uuid, time
+import os, csv, io, json, uuid, time, threading
 from datetime import datetime
-from flask import request, jsonify, send_from_directory
+from flask import Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import load_only, selectinload
 
 from database import create_app, db
-from models import Farmer, Land, Claim
-from ml import STRESS_FEATURES, predict_stress, predict_payout
-from chainlink_client import push_prediction_to_chainlink
-from utils import ok, err
+from models import Farmer, Land, Claim, ClaimFeatures
+from ml import STRESS_FEATURES, PAYOUT_FEATURES, predict_stress, predict_payout, predict_stress_batch, predict_payout_batch, invalid_features, prediction_cache_stats, current_model, model_status, start_watcher as start_model_watcher
+from chainlink_client import push_prediction_to_chainlink, chainlink_stats
+from chain_queue import CHAIN_WORKERS, OutboxWorker, enqueue_claim, queue_depth
+from chain_indexer import CHAIN_INDEXER, EventIndexer, claim_tx_status as indexed_tx_status
+from idempotency import idempotent, stats as idempotency_stats
+from identity_cache import get_farmer, get_farmers, get_land, get_lands, get_farmer_lands, stats as identity_cache_stats
+from upload_store import UploadStore
+import analytics
+import geo
+import metrics
+from metrics import timed
+from utils import ok, err, encode_cursor, decode_cursor
 
 load_dotenv()
 app = create_app()
 CORS(app)
+metrics.init_app(app)
 
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_MAX_AGE = int(os.environ.get("UPLOAD_MAX_AGE", 365 * 24 * 3600))
+upload_store = UploadStore(UPLOAD_DIR)
 ALLOWED_EXT = {"png","jpg","jpeg"}
+MAX_BATCH_CLAIMS = int(os.environ.get("MAX_BATCH_CLAIMS", 1000))
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 20))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", 1000))
+# models the production bundle must have before /health/ready answers 200 ("none" to serve heuristics)
+MODELS_REQUIRED = [m.strip() for m in os.environ.get("MODELS_REQUIRED", "stress,payout").lower().split(",")
+                   if m.strip() and m.strip() != "none"]
+CROP_MAP = {'Wheat': 0, 'Maize': 1, 'Rice': 2}
 
 def gen_registration_no():
     return f"HBL-{datetime.utcnow().year}-{uuid.uuid4().hex[:6].upper()}"
@@ -26,24 +47,69 @@ def gen_registration_no():
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".",1)[1].lower() in ALLOWED_EXT
 
-def save_upload(file_storage, prefix="file"):
+def save_upload(file_storage):
+    # stored once per distinct content under uploads/<sha256 shard path>
     if not file_storage or file_storage.filename == "":
         return None
     if not allowed_file(file_storage.filename):
         return None
-    fname = secure_filename(file_storage.filename)
-    token = uuid.uuid4().hex[:8]
-    outname = f"{prefix}_{token}_{fname}"
-    path = os.path.join(UPLOAD_DIR, outname)
-    file_storage.save(path)
-    return outname
+    return upload_store.save(file_storage.stream, file_storage.filename.rsplit(".",1)[1])
 
 with app.app_context():
     db.create_all()
 
+outbox_worker = None
+event_indexer = None
+_bg_lock = threading.Lock()
+_bg_pid = None
+
+def start_background_workers():
+    global outbox_worker, event_indexer
+    start_model_watcher()
+    if CHAIN_WORKERS > 0:
+        outbox_worker = OutboxWorker(app, concurrency=CHAIN_WORKERS).start()
+    if CHAIN_INDEXER:
+        event_indexer = EventIndexer(app).start()
+
+def stop_background_workers(timeout=5.0):
+    # graceful worker exit: let outbox / indexer threads finish the batch they hold
+    for worker in (outbox_worker, event_indexer):
+        if worker is not None:
+            worker.stop(timeout)
+
+def ensure_background_workers():
+    # started lazily and per pid, so forked server workers each get their own threads
+    global _bg_pid
+    if _bg_pid == os.getpid():
+        return
+    with _bg_lock:
+        if _bg_pid != os.getpid():
+            start_background_workers()
+            _bg_pid = os.getpid()
+
+app.before_request(ensure_background_workers)
+
 @app.get("/health")
 def health():
-    return jsonify(ok({"uptime": True}))
+    # liveness: the process answers; says nothing about models or the database
+    return jsonify(ok({"uptime": True, "pid": os.getpid()}))
+
+@app.get("/health/ready")
+def health_ready():
+    # readiness: take traffic only once the required models are loaded and the database answers
+    bundle = current_model()
+    checks = {"pid": os.getpid(), "models": bundle.describe() if bundle else None,
+              "models_missing": [m for m in MODELS_REQUIRED if not (bundle and getattr(bundle, "has_" + m, False))],
+              "background_workers": _bg_pid == os.getpid()}
+    try:
+        db.session.execute(db.text("SELECT 1"))
+        checks["database"] = True
+    except Exception as e:
+        checks["database"] = False
+        checks["database_error"] = str(e)
+    if bundle is None or checks["models_missing"] or not checks["database"]:
+        return jsonify({"ok": False, "error": "not ready", "data": checks}), 503
+    return jsonify(ok(checks))
 
 @app.post("/api/register")
 def register():
@@ -58,8 +124,8 @@ def register():
 
     govfile = request.files.get("gov_id_file")
     selfie = request.files.get("selfie_file")
-    gov_fname = save_upload(govfile, "gov") if govfile else None
-    selfie_fname = save_upload(selfie, "selfie") if selfie else None
+    gov_fname = save_upload(govfile) if govfile else None
+    selfie_fname = save_upload(selfie) if selfie else None
 
     regno = gen_registration_no()
     farmer = Farmer(registration_no=regno, name=name, mobile=mobile, aadhaar=aadhaar, email=email, wallet_address=wallet_address, gov_id_path=gov_fname, selfie_path=selfie_fname, verified=False)
@@ -98,7 +164,7 @@ def verify_otp():
 def add_land():
     data = request.form.to_dict()
     reg = data.get("registration_no")
-    farmer = Farmer.query.filter_by(registration_no=reg).first()
+    farmer = get_farmer(reg)
     if not farmer:
         return err("farmer not found", 404)
     land_name = data.get("land_name") or f"{farmer.name}-land"
@@ -108,9 +174,11 @@ def add_land():
     geo_lat = data.get("geo_lat")
     geo_lon = data.get("geo_lon")
     verification_image = request.files.get("verification_image")
-    ver_fname = save_upload(verification_image, "land") if verification_image else None
+    ver_fname = save_upload(verification_image) if verification_image else None
 
-    land = Land(farmer_id=farmer.id, land_name=land_name, size_acres=size_acres, crop_type=crop_type, plots_count=plots_count, verification_image_path=ver_fname, geo_lat=float(geo_lat) if geo_lat else None, geo_lon=float(geo_lon) if geo_lon else None)
+    geo_lat = float(geo_lat) if geo_lat else None
+    geo_lon = float(geo_lon) if geo_lon else None
+    land = Land(farmer_id=farmer.id, land_name=land_name, size_acres=size_acres, crop_type=crop_type, plots_count=plots_count, verification_image_path=ver_fname, geo_lat=geo_lat, geo_lon=geo_lon, geohash=geo.encode(geo_lat, geo_lon))
     db.session.add(land)
     db.session.commit()
     return jsonify(ok({"land_id": land.id, "land_name": land.land_name}))
@@ -121,12 +189,12 @@ def login():
     reg = data.get("registration_no")
     if not reg:
         return err("registration_no required", 400)
-    farmer = Farmer.query.filter_by(registration_no=reg).first()
+    farmer = get_farmer(reg)
     if not farmer:
         return err("invalid registration id", 401)
     if not farmer.verified:
         return err("farmer not verified", 403)
-    lands = [{"id": l.id, "land_name": l.land_name, "crop_type": l.crop_type, "location": f"{l.geo_lat},{l.geo_lon}"} for l in farmer.lands]
+    lands = [{"id": l.id, "land_name": l.land_name, "crop_type": l.crop_type, "location": f"{l.geo_lat},{l.geo_lon}"} for l in get_farmer_lands(farmer.id)]
     return jsonify(ok({"farmer_id": farmer.id, "registration_no": farmer.registration_no, "name": farmer.name, "wallet_address": farmer.wallet_address, "lands": lands}))
 
 # helper to fetch lands (used by frontend)
@@ -135,24 +203,56 @@ def api_lands():
     farmer_id = request.args.get("farmer_id")
     if not farmer_id:
         return err("farmer_id required", 400)
-    lands = Land.query.filter_by(farmer_id=int(farmer_id)).all()
+    lands = get_farmer_lands(int(farmer_id))
     out = [{"id": l.id, "land_name": l.land_name, "crop_type": l.crop_type, "geo_lat": l.geo_lat, "geo_lon": l.geo_lon} for l in lands]
     return jsonify(ok(out))
 
+GEO_MAX_RESULTS = int(os.environ.get("GEO_MAX_RESULTS", 1000))
+GEO_LAND_COLUMNS = (Land.id, Land.farmer_id, Land.land_name, Land.crop_type, Land.size_acres, Land.geo_lat, Land.geo_lon)
+
+def _geo_land(row, **extra):
+    return dict({"id": row.id, "farmer_id": row.farmer_id, "land_name": row.land_name, "crop_type": row.crop_type,
+                 "size_acres": row.size_acres, "geo_lat": row.geo_lat, "geo_lon": row.geo_lon}, **extra)
+
+def _geo_limit():
+    return max(1, min(GEO_MAX_RESULTS, int(request.args.get("limit", GEO_MAX_RESULTS))))
+
+@app.get("/api/lands/near")
+def lands_near():
+    """Lands within radius_km of (lat, lon), nearest first."""
+    try:
+        lat, lon = float(request.args["lat"]), float(request.args["lon"])
+        radius_km = float(request.args.get("radius_km", 25))
+        limit = _geo_limit()
+    except (KeyError, ValueError):
+        return err("lat, lon required; radius_km and limit must be numbers", 400)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or not 0 < radius_km <= 20000:
+        return err("lat/lon out of range or radius_km not in (0, 20000]", 400)
+    t0 = time.perf_counter()
+    hits, stats = geo.near(db.session.query(*GEO_LAND_COLUMNS), Land, lat, lon, radius_km)
+    out = [_geo_land(r, distance_km=round(d, 4)) for r, d in hits[:limit]]
+    return jsonify(ok(out, count=len(hits), truncated=len(hits) > limit or stats["candidates_truncated"],
+                      ms=round((time.perf_counter() - t0) * 1000, 3), **stats))
+
+@app.post("/api/lands/within")
+def lands_within():
+    """Lands inside a polygon: {"polygon": [[lat, lon], ...]} or a GeoJSON Polygon."""
+    try:
+        polygon = geo.parse_polygon(request.get_json(force=True))
+        limit = _geo_limit()
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        return err(str(e) or "invalid polygon", 400)
+    t0 = time.perf_counter()
+    hits, stats = geo.within(db.session.query(*GEO_LAND_COLUMNS), Land, polygon)
+    out = [_geo_land(r) for r in hits[:limit]]
+    return jsonify(ok(out, count=len(hits), truncated=len(hits) > limit or stats["candidates_truncated"],
+                      ms=round((time.perf_counter() - t0) * 1000, 3), **stats))
+
 # web3 client import
-from web3_client import submit_claim_to_chain, get_tx_status
+from web3_client import get_tx_status
 
-@app.post("/api/claims/submit")
-def submit_claim():
-    data = request.get_json(force=True)
-    reg = data.get("registration_no")
-    farmer = Farmer.query.filter_by(registration_no=reg).first()
-    if not farmer:
-        return err("invalid farmer", 400)
-    land_id = int(data.get("land_id", 0))
-    land = Land.query.get(land_id)
-    if not land or land.farmer_id != farmer.id:
-        return err("invalid land", 400)
+@timed("build_model_inputs")
+def build_model_inputs(data, land):
     m1 = data.get("model1", {}) or {}
     m2 = data.get("model2", {}) or {}
     for k in STRESS_FEATURES:
@@ -160,48 +260,28 @@ def submit_claim():
             m2[k] = m1[k]
     if "Crop_Type" not in m2:
         m2["Crop_Type"] = land.crop_type
-    crop_map = {'Wheat': 0, 'Maize': 1, 'Rice': 2}
     if 'Crop_Type' in m2 and 'Crop_Type_encoded' not in m2:
-        m2['Crop_Type_encoded'] = crop_map.get(m2['Crop_Type'], 0)
+        m2['Crop_Type_encoded'] = CROP_MAP.get(m2['Crop_Type'], 0)
+    return m1, m2
 
-    # ML predictions
-    is_stressed, prob = predict_stress(m1)
-    payout = predict_payout(m2)  # percent 0-100
+def notify_outbox():
+    if outbox_worker is not None:
+        outbox_worker.notify()
 
-    claim = Claim(land_id=land_id, farmer_id=farmer.id, status="predicted", is_stressed=is_stressed, model1_probability=prob, payout_percentage=payout, payload_json=json.dumps({"model1":m1,"model2":m2}))
-    db.session.add(claim)
-    db.session.commit()
-
-    scaled = int(round((payout / 100.0) * 1_000_000))
-
-    # submit on-chain (fire-and-forget by default)
-    try:
-        tx_result = submit_claim_to_chain(policy_id=claim.id, stress_level=int(is_stressed), payout_percentage_scaled=scaled, wait_for_receipt=False)
-    except Exception as e:
-        tx_result = {"error": str(e)}
-
-    if isinstance(tx_result, dict):
-        tx_hash = tx_result.get("tx_hash")
-        if tx_hash:
-            claim.onchain_tx = tx_hash
-            claim.onchain_status = "pending"
-            claim.status = "onchain_submitted"
-            db.session.commit()
-        else:
-            claim.onchain_status = "failed"
-            claim.status = "onchain_error"
-            db.session.commit()
-
-    push_resp = push_prediction_to_chainlink({
+def push_claim_to_chainlink(land_id, farmer, is_stressed, prob, payout):
+    if os.environ.get("PUSH_TO_CHAINLINK","false").lower() != "true":
+        return {"skipped": True}
+    return push_prediction_to_chainlink({
         "policy_id": land_id,
         "is_stressed": is_stressed,
         "payout": round(payout,2),
         "probability": round(prob,4),
         "farmer_wallet": farmer.wallet_address
-    }) if os.environ.get("PUSH_TO_CHAINLINK","false").lower() == "true" else {"skipped": True}
+    })
 
-    result = {
-        "claim_id": claim.id,
+def claim_result(claim_id, reg, farmer, land_id, is_stressed, prob, payout, tx_result):
+    return {
+        "claim_id": claim_id,
         "registration_no": reg,
         "is_stressed": is_stressed,
         "probability": round(prob,4),
@@ -211,7 +291,107 @@ def submit_claim():
         "onchain": tx_result,
         "ts": datetime.utcnow().isoformat() + "Z"
     }
-    return jsonify(ok(result, chainlink_response=push_resp))
+
+@app.post("/api/claims/submit")
+@idempotent
+def submit_claim():
+    data = request.get_json(force=True)
+    reg = data.get("registration_no")
+    farmer = get_farmer(reg)
+    if not farmer:
+        return err("invalid farmer", 400)
+    land_id = int(data.get("land_id", 0))
+    land = get_land(land_id)
+    if not land or land.farmer_id != farmer.id:
+        return err("invalid land", 400)
+    m1, m2 = build_model_inputs(data, land)
+
+    # ML predictions, both from one model version even if a reload swaps mid-request
+    model = current_model()
+    is_stressed, prob = predict_stress(m1, model)
+    payout = predict_payout(m2, model)  # percent 0-100
+
+    claim = Claim(land_id=land_id, farmer_id=farmer.id, status="predicted", is_stressed=is_stressed, model1_probability=prob, payout_percentage=payout, payload_json=json.dumps({"model1":m1,"model2":m2}), model_version=model.version)
+    db.session.add(claim)
+    db.session.flush()
+    claim_id = claim.id
+    db.session.add(ClaimFeatures.for_claim(claim, m1, m2))
+    # claim + outbox row in one commit; the chain write happens on the outbox worker
+    enqueue_claim(claim, is_stressed, payout)
+    db.session.commit()
+    notify_outbox()
+    tx_result = {"status": "queued"}
+
+    push_resp = push_claim_to_chainlink(land_id, farmer, is_stressed, prob, payout)
+    return jsonify(ok(claim_result(claim_id, reg, farmer, land_id, is_stressed, prob, payout, tx_result), chainlink_response=push_resp))
+
+@app.post("/api/claims/submit-batch")
+@idempotent
+def submit_claim_batch():
+    data = request.get_json(force=True)
+    items = data.get("claims") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return err("claims list required", 400)
+    if len(items) > MAX_BATCH_CLAIMS:
+        return err(f"at most {MAX_BATCH_CLAIMS} claims per batch", 413)
+
+    # resolve every farmer and land up front: at most two queries for the whole batch
+    regs = {it.get("registration_no") for it in items if isinstance(it, dict) and it.get("registration_no")}
+    farmers = get_farmers(regs)
+    land_ids = set()
+    for it in items:
+        try:
+            land_ids.add(int(it.get("land_id", 0)))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    lands = get_lands(land_ids)
+
+    results = [None] * len(items)
+    valid = []
+    for i, it in enumerate(items):
+        if not isinstance(it, dict):
+            results[i] = {"index": i, "ok": False, "error": "claim must be an object"}
+            continue
+        farmer = farmers.get(it.get("registration_no"))
+        if not farmer:
+            results[i] = {"index": i, "ok": False, "error": "invalid farmer"}
+            continue
+        try:
+            land = lands.get(int(it.get("land_id", 0)))
+        except (TypeError, ValueError):
+            land = None
+        if not land or land.farmer_id != farmer.id:
+            results[i] = {"index": i, "ok": False, "error": "invalid land"}
+            continue
+        m1, m2 = build_model_inputs(it, land)
+        bad = invalid_features(m1, STRESS_FEATURES) + invalid_features(m2, PAYOUT_FEATURES)
+        if bad:
+            results[i] = {"index": i, "ok": False, "error": f"non-numeric features: {', '.join(sorted(set(bad)))}"}
+            continue
+        valid.append((i, farmer, land, m1, m2))
+
+    # one feature matrix per model for all valid claims
+    model = current_model()
+    stress = predict_stress_batch([v[3] for v in valid], model)
+    payouts = predict_payout_batch([v[4] for v in valid], model)
+
+    claims = [Claim(land_id=land.id, farmer_id=farmer.id, status="predicted", is_stressed=is_stressed, model1_probability=prob, payout_percentage=payout, payload_json=json.dumps({"model1":m1,"model2":m2}), model_version=model.version)
+              for (i, farmer, land, m1, m2), (is_stressed, prob), payout in zip(valid, stress, payouts)]
+    db.session.add_all(claims)
+    db.session.flush()
+    claim_ids = [c.id for c in claims]  # read before commit expires the rows
+    db.session.add_all([ClaimFeatures.for_claim(claim, m1, m2) for claim, (i, farmer, land, m1, m2) in zip(claims, valid)])
+    for claim, (is_stressed, prob), payout in zip(claims, stress, payouts):
+        enqueue_claim(claim, is_stressed, payout)
+    db.session.commit()
+    notify_outbox()
+
+    for (i, farmer, land, m1, m2), (is_stressed, prob), payout, claim_id in zip(valid, stress, payouts, claim_ids):
+        item = claim_result(claim_id, farmer.registration_no, farmer, land.id, is_stressed, prob, payout, {"status": "queued"})
+        item.update({"index": i, "ok": True, "chainlink_response": push_claim_to_chainlink(land.id, farmer, is_stressed, prob, payout)})
+        results[i] = item
+
+    return jsonify(ok(results, accepted=len(claims), rejected=len(items) - len(claims)))
 
 @app.get("/api/claims/<int:claim_id>/tx_status")
 def claim_tx_status(claim_id):
@@ -219,7 +399,12 @@ def claim_tx_status(claim_id):
     if not claim:
         return err("claim not found", 404)
     if not claim.onchain_tx:
+        if claim.onchain_status:
+            return jsonify(ok({"claim_id": claim.id, "onchain_status": claim.onchain_status}))
         return err("no onchain tx for claim", 404)
+    if CHAIN_INDEXER:
+        # kept current by the event indexer; no RPC per poll
+        return jsonify(ok(indexed_tx_status(claim)))
     st = get_tx_status(claim.onchain_tx)
     if "receipt" in st and st.get("status") == 1:
         claim.onchain_status = "success"
@@ -231,6 +416,181 @@ def claim_tx_status(claim_id):
         db.session.commit()
     return jsonify(ok(st))
 
+def page_params():
+    """(limit, cursor) from the query string; cursor is None for the first page."""
+    try:
+        limit = max(1, min(MAX_PAGE_SIZE, int(request.args.get("limit", PAGE_SIZE))))
+    except ValueError:
+        raise ValueError("invalid limit")
+    cursor = request.args.get("cursor")
+    return limit, decode_cursor(cursor) if cursor else None
+
+def keyset_page(query, model, limit, cursor):
+    """Newest-first page on (created_at, id) strictly after `cursor`, plus the next cursor."""
+    if cursor:
+        created_at, row_id = cursor
+        query = query.filter(or_(model.created_at < created_at, and_(model.created_at == created_at, model.id < row_id)))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id) if more else None
+
+@app.get("/api/farmers/<reg>/claims")
+def farmer_claims(reg):
+    farmer = get_farmer(reg)
+    if not farmer:
+        return err("farmer not found", 404)
+    try:
+        limit, cursor = page_params()
+    except ValueError as e:
+        return err(str(e), 400)
+    # one query for the page (served by ix_claims_farmer_created) + one IN query for its lands
+    query = (Claim.query.filter(Claim.farmer_id == farmer.id)
+             .options(load_only(Claim.id, Claim.land_id, Claim.status, Claim.is_stressed, Claim.model1_probability,
+                                Claim.payout_percentage, Claim.onchain_status, Claim.onchain_tx, Claim.created_at),
+                      selectinload(Claim.land).load_only(Land.id, Land.land_name, Land.crop_type)))
+    claims, next_cursor = keyset_page(query, Claim, limit, cursor)
+    out = [{"claim_id": c.id, "land_id": c.land_id, "land_name": c.land.land_name if c.land else None,
+            "crop_type": c.land.crop_type if c.land else None, "status": c.status, "is_stressed": c.is_stressed,
+            "probability": c.model1_probability, "payout_percentage": c.payout_percentage,
+            "onchain_status": c.onchain_status, "onchain_tx": c.onchain_tx,
+            "created_at": c.created_at.isoformat() + "Z" if c.created_at else None} for c in claims]
+    return jsonify(ok(out, next_cursor=next_cursor))
+
+@app.get("/api/farmers/<reg>/lands")
+def farmer_lands(reg):
+    farmer = get_farmer(reg)
+    if not farmer:
+        return err("farmer not found", 404)
+    try:
+        limit, cursor = page_params()
+    except ValueError as e:
+        return err(str(e), 400)
+    query = Land.query.filter(Land.farmer_id == farmer.id).options(
+        load_only(Land.id, Land.land_name, Land.crop_type, Land.size_acres, Land.geo_lat, Land.geo_lon, Land.created_at))
+    lands, next_cursor = keyset_page(query, Land, limit, cursor)
+    # claim counts for the whole page in one grouped query rather than loading every claim
+    summary = {}
+    if lands:
+        summary = {land_id: (n, last) for land_id, n, last in db.session.query(
+            Claim.land_id, func.count(Claim.id), func.max(Claim.created_at)
+        ).filter(Claim.land_id.in_([l.id for l in lands])).group_by(Claim.land_id)}
+    out = []
+    for l in lands:
+        n, last = summary.get(l.id, (0, None))
+        out.append({"id": l.id, "land_name": l.land_name, "crop_type": l.crop_type, "size_acres": l.size_acres,
+                    "geo_lat": l.geo_lat, "geo_lon": l.geo_lon, "claims": n,
+                    "last_claim_at": last.isoformat() + "Z" if last else None,
+                    "created_at": l.created_at.isoformat() + "Z" if l.created_at else None})
+    return jsonify(ok(out, next_cursor=next_cursor))
+
+EXPORT_CLAIM_COLUMNS = [Claim.id, Claim.farmer_id, Claim.land_id, Claim.status, Claim.is_stressed,
+                        Claim.model1_probability, Claim.payout_percentage, Claim.model_version,
+                        Claim.onchain_status, Claim.onchain_tx, Claim.created_at]
+EXPORT_FEATURE_COLUMNS = [getattr(ClaimFeatures, c) for c in
+                          list(ClaimFeatures.MODEL1_COLUMNS.values()) + list(ClaimFeatures.MODEL2_COLUMNS.values())]
+
+def _export_filters(query):
+    args = request.args
+    try:
+        if args.get("since_id"):
+            query = query.filter(Claim.id > int(args["since_id"]))
+        if args.get("land_id"):
+            query = query.filter(Claim.land_id == int(args["land_id"]))
+        if args.get("from"):
+            query = query.filter(Claim.created_at >= datetime.fromisoformat(args["from"]))
+        if args.get("to"):
+            query = query.filter(Claim.created_at < datetime.fromisoformat(args["to"]))
+    except ValueError:
+        raise ValueError("invalid since_id, land_id, from or to")
+    return query
+
+@app.get("/api/claims/export")
+def export_claims():
+    """Every claim (optionally since_id / land_id / from / to) with its features, streamed as NDJSON or CSV."""
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return err("format must be ndjson or csv", 400)
+    try:
+        query = _export_filters(db.session.query(*EXPORT_CLAIM_COLUMNS, *EXPORT_FEATURE_COLUMNS)
+                                .outerjoin(ClaimFeatures, ClaimFeatures.claim_id == Claim.id))
+    except ValueError as e:
+        return err(str(e), 400)
+    # plain tuples in id order, fetched EXPORT_BATCH_ROWS at a time: memory stays flat however big the table
+    rows = query.order_by(Claim.id).yield_per(EXPORT_BATCH_ROWS)
+    names = [c.key for c in EXPORT_CLAIM_COLUMNS] + [c.key for c in EXPORT_FEATURE_COLUMNS]
+    created = names.index("created_at")
+
+    def chunks():
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(names)
+        n = 0
+        for row in rows:
+            row = list(row)
+            if row[created] is not None:
+                row[created] = row[created].isoformat() + "Z"
+            if writer:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(dict(zip(names, row))))
+                buf.write("\n")
+            n += 1
+            if n % EXPORT_BATCH_ROWS == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(chunks()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=claims.{fmt}"})
+
+@app.get("/api/analytics/exposure")
+def analytics_exposure():
+    """Pool exposure from the claim_exposure summaries: ?group_by=crop_type,week&from=&to=&crop_type=&region=&status=&is_stressed="""
+    args = request.args
+    group_by = [g for g in args.get("group_by", "crop_type").split(",") if g]
+    if any(g not in analytics.DIMENSIONS for g in group_by):
+        return err(f"group_by must be among {', '.join(analytics.DIMENSIONS)}", 400)
+    try:
+        start = datetime.fromisoformat(args["from"]).date() if args.get("from") else None
+        end = datetime.fromisoformat(args["to"]).date() if args.get("to") else None
+        filters = {d: args.getlist(d) or None for d in ("crop_type", "region", "status")}
+        if args.get("is_stressed"):
+            filters["is_stressed"] = int(args["is_stressed"])
+    except ValueError:
+        return err("invalid from, to or is_stressed", 400)
+    t0 = time.perf_counter()
+    out = analytics.exposure(db.session, group_by, start, end, **filters)
+    out["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return jsonify(ok(out))
+
+@app.get("/api/chain/outbox")
+def chain_outbox_depth():
+    return jsonify(ok(queue_depth()))
+
+@app.get("/api/cache/identity")
+def identity_cache_counters():
+    return jsonify(ok(identity_cache_stats()))
+
+@app.get("/api/idempotency/stats")
+def idempotency_counters():
+    return jsonify(ok(idempotency_stats()))
+
+@app.get("/api/ml/cache")
+def ml_cache_stats():
+    return jsonify(ok(prediction_cache_stats()))
+
+@app.get("/api/ml/models")
+def ml_models():
+    return jsonify(ok(model_status()))
+
+@app.get("/api/chainlink/stats")
+def chainlink_dispatch_stats():
+    return jsonify(ok(chainlink_stats()))
+
 @app.post("/api/authorize_oracle")
 def authorize_oracle_route():
     data = request.get_json(force=True)
@@ -243,7 +603,27 @@ def authorize_oracle_route():
 
 @app.get("/uploads/<path:filename>")
 def serve_upload(filename):
-    return send_from_directory(UPLOAD_DIR, filename)
+    # conditional=True: If-None-Match -> 304 and Range -> 206 handled by send_file
+    if UploadStore.is_temporary(filename):
+        return err("upload not found", 404)  # partial uploads in progress
+    if not UploadStore.is_content_addressed(filename):
+        return send_from_directory(UPLOAD_DIR, filename, conditional=True)  # legacy flat uploads
+    size = request.args.get("size")
+    path = upload_store.resolve(filename, size)
+    if size == "thumb" and path == filename:
+        # thumbnail not rendered yet: serve the original, but don't let it be cached as the thumb
+        return send_from_directory(UPLOAD_DIR, path, conditional=True, max_age=60)
+    digest = filename.rsplit("/", 1)[1].split(".", 1)[0]
+    resp = send_from_directory(UPLOAD_DIR, path, conditional=True, etag=digest + ("-thumb" if path != filename else ""),
+                               max_age=UPLOAD_MAX_AGE)
+    resp.cache_control.private = True  # gov IDs and selfies: browser cache only
+    resp.cache_control.public = False
+    resp.cache_control.immutable = True
+    return resp
+
+@app.get("/api/uploads/stats")
+def upload_stats():
+    return jsonify(ok(upload_store.stats()))
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
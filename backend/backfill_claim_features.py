@@ -0,0 +1,56 @@
+# backend/backfill_claim_features.py
+"""
+One-off backfill of claim_features for claims scored before the table existed.
+Parses Claim.payload_json in id order, BATCH rows per transaction, and inserts the
+typed rows the submit endpoints now write. Safe to re-run or interrupt: only claims
+without a claim_features row are touched.
+Run this from the backend/ folder using your Python interpreter.
+
+    python backfill_claim_features.py [--batch 5000]
+"""
+
+import argparse, json, sys, time
+
+try:
+    from app import app
+    from database import db
+    from models import Claim, ClaimFeatures
+except Exception as e:
+    print("Error importing app/db. Make sure to run from backend/ folder.")
+    print("Exception:", e)
+    sys.exit(1)
+
+
+def backfill(batch=5000):
+    done = skipped = 0
+    last_id = 0
+    started = time.perf_counter()
+    with app.app_context():
+        while True:
+            rows = (db.session.query(Claim.id, Claim.land_id, Claim.farmer_id, Claim.created_at, Claim.payload_json)
+                    .outerjoin(ClaimFeatures, ClaimFeatures.claim_id == Claim.id)
+                    .filter(ClaimFeatures.claim_id.is_(None), Claim.id > last_id)
+                    .order_by(Claim.id).limit(batch).all())
+            if not rows:
+                break
+            mappings = []
+            for claim_id, land_id, farmer_id, created_at, payload in rows:
+                try:
+                    inputs = json.loads(payload or "{}")
+                except ValueError:
+                    skipped += 1
+                    continue
+                mappings.append(ClaimFeatures.values(claim_id, land_id, farmer_id, created_at,
+                                                     inputs.get("model1") or {}, inputs.get("model2") or {}))
+            db.session.bulk_insert_mappings(ClaimFeatures, mappings)
+            db.session.commit()
+            done += len(mappings)
+            last_id = rows[-1][0]
+            print(f"… {done} rows (claim id {last_id})")
+    print(f"Backfill complete: {done} rows in {time.perf_counter() - started:.1f}s, {skipped} unreadable payloads skipped.")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch", type=int, default=5000)
+    backfill(ap.parse_args().batch)
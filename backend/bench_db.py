@@ -0,0 +1,101 @@
+# backend/bench_db.py
+"""
+Throughput of the claim endpoints' query mix under DB_PROFILE=default vs production.
+
+Each worker thread loops over the same mix the API issues:
+  login / GET /api/lands   farmer by registration_no, lands by farmer_id
+  GET /api/claims/<id>     claim by id
+  claims by land / status  claims for one land, count of queued claims
+  POST /api/claims/submit  insert a claim and commit (1 in --write-every ops)
+
+    python bench_db.py --farmers 2000 --claims 20000 --threads 1,2,4,8 --seconds 5
+"""
+import argparse, json, os, random, sys, tempfile, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func
+from database import db, create_app
+from models import Farmer, Land, Claim
+
+
+def seed(app, farmers, claims, rng):
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(Farmer, [
+            {"id": i, "registration_no": f"HBL-B-{i}", "name": f"Farmer {i}"} for i in range(1, farmers + 1)])
+        db.session.bulk_insert_mappings(Land, [
+            {"id": i, "farmer_id": i, "land_name": "plot", "crop_type": "Rice", "size_acres": 2.0}
+            for i in range(1, farmers + 1)])
+        db.session.bulk_insert_mappings(Claim, [
+            {"land_id": lid, "farmer_id": lid, "status": rng.choice(["paid_out", "no_payout", "submitted"]),
+             "onchain_status": rng.choice(["success", "queued", "pending"])}
+            for lid in (rng.randint(1, farmers) for _ in range(claims))])
+        db.session.commit()
+
+
+def worker(app, farmers, max_claim, write_every, stop, counts, idx, seed_):
+    rng = random.Random(seed_)
+    ops = 0
+    with app.app_context():
+        while not stop.is_set():
+            fid = rng.randint(1, farmers)
+            farmer = Farmer.query.filter_by(registration_no=f"HBL-B-{fid}").first()
+            Land.query.filter_by(farmer_id=farmer.id).all()
+            db.session.get(Claim, rng.randint(1, max_claim))
+            Claim.query.filter_by(land_id=fid).all()
+            db.session.query(func.count(Claim.id)).filter(Claim.status == "submitted",
+                                                          Claim.farmer_id == fid).scalar()
+            ops += 5
+            if ops % (5 * write_every) == 0:
+                db.session.add(Claim(land_id=fid, farmer_id=fid, status="submitted", onchain_status="queued"))
+                db.session.commit()
+                ops += 1
+            db.session.remove()
+    counts[idx] = ops
+
+
+def run(profile, args):
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_db_"), "bench.sqlite3")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    app = create_app(profile)
+    seed(app, args.farmers, args.claims, random.Random(args.seed))
+    results = []
+    for n in args.threads:
+        stop = threading.Event()
+        counts = [0] * n
+        threads = [threading.Thread(target=worker, args=(app, args.farmers, args.claims, args.write_every,
+                                                         stop, counts, i, args.seed + i)) for i in range(n)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        results.append({"threads": n, "ops_per_s": round(sum(counts) / elapsed)})
+    with app.app_context():
+        journal = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+        db.engine.dispose()
+    return {"profile": profile, "journal_mode": journal, "results": results}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--farmers", type=int, default=2000)
+    ap.add_argument("--claims", type=int, default=20000)
+    ap.add_argument("--threads", default="1,2,4,8")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--write-every", type=int, default=10, help="one claim insert per N read rounds")
+    ap.add_argument("--profiles", default="default,production")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    args.threads = [int(t) for t in args.threads.split(",")]
+
+    report = [run(p, args) for p in args.profiles.split(",")]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# backend/bench_history.py
+"""
+Query count and latency of the paginated history endpoints.
+
+Seeds one farmer with --claims claims over --lands lands in a throwaway SQLite
+database, walks every page of GET /api/farmers/<reg>/claims and /lands, and
+checks that every page issues the same number of SQL statements (keyset pages
++ selectinload, no N+1) and that late pages are no slower than early ones.
+Exits non-zero if the per-page query count is not fixed.
+
+    python bench_history.py --claims 5000 --limit 50
+"""
+import argparse, json, os, random, statistics, sys, tempfile, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_history_"), "history.sqlite3")
+os.environ.setdefault("CHAIN_WORKERS", "0")
+
+from sqlalchemy import event
+
+from app import app
+from database import db
+from models import Farmer, Land, Claim
+
+REG = "HBL-BENCH-1"
+
+
+def seed(n_claims, n_lands, rng):
+    with app.app_context():
+        db.session.add(Farmer(id=1, registration_no=REG, name="bench", verified=True))
+        db.session.bulk_insert_mappings(Land, [
+            {"id": i, "farmer_id": 1, "land_name": f"plot {i}", "crop_type": "Rice", "size_acres": 1.5}
+            for i in range(1, n_lands + 1)])
+        t0 = datetime.utcnow() - timedelta(days=365)
+        db.session.bulk_insert_mappings(Claim, [
+            # a few identical timestamps so the id tie-break in the cursor is exercised
+            {"land_id": rng.randint(1, n_lands), "farmer_id": 1, "status": "no_payout", "is_stressed": 0,
+             "onchain_status": "success", "created_at": t0 + timedelta(minutes=i // 3)}
+            for i in range(n_claims)])
+        db.session.commit()
+
+
+def walk(client, path, limit, statements):
+    pages, cursor, seen = [], None, []
+    while True:
+        url = f"{path}?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        statements.clear()
+        t0 = time.perf_counter()
+        body = client.get(url).get_json()
+        elapsed = time.perf_counter() - t0
+        assert body["ok"], body
+        pages.append({"queries": len(statements), "ms": elapsed * 1000})
+        seen.extend(row.get("claim_id", row.get("id")) for row in body["data"])
+        cursor = body.get("next_cursor")
+        if not cursor:
+            return pages, seen
+
+
+def summarize(pages, seen):
+    counts = sorted({p["queries"] for p in pages})
+    head, tail = pages[:5], pages[-5:]
+    return {"pages": len(pages), "rows": len(seen), "unique_rows": len(set(seen)), "queries_per_page": counts,
+            "first_pages_ms": round(statistics.median(p["ms"] for p in head), 2),
+            "last_pages_ms": round(statistics.median(p["ms"] for p in tail), 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--claims", type=int, default=5000)
+    ap.add_argument("--lands", type=int, default=200)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    seed(args.claims, args.lands, random.Random(args.seed))
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: statements.append(a[2]))
+    client = app.test_client()
+    client.get(f"/api/farmers/{REG}/claims?limit=1")  # warm the identity cache so every page counts the same
+
+    report = {
+        "claims": summarize(*walk(client, f"/api/farmers/{REG}/claims", args.limit, statements)),
+        "lands": summarize(*walk(client, f"/api/farmers/{REG}/lands", args.limit, statements)),
+    }
+    print(json.dumps(report, indent=2))
+    for name, expected in (("claims", args.claims), ("lands", args.lands)):
+        r = report[name]
+        if len(r["queries_per_page"]) != 1 or r["unique_rows"] != expected or r["rows"] != expected:
+            sys.exit(f"{name}: per-page query count is not fixed or pages overlap")
+
+
+if __name__ == "__main__":
+    main()
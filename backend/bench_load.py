@@ -0,0 +1,309 @@
+# backend/bench_load.py
+"""
+End-to-end load benchmark for the claim pipeline.
+
+Seeds a throwaway SQLite database with --farmers verified farmers (each with
+--lands-per-farmer lands) and --claims historical claims, swaps web3_client onto
+an in-process eth-tester chain (local_chain.LocalChain) and points the Chainlink
+webhook at a local stub server, then drives the Flask app with --concurrency
+closed-loop clients, one endpoint at a time:
+
+    register    POST /api/register
+    login       POST /api/login
+    submit      POST /api/claims/submit
+    tx_status   GET  /api/claims/<id>/tx_status   (claims submitted above)
+
+and reports requests/sec and p50/p95/p99 latency per endpoint as JSON.
+
+    pip install "eth-tester[py-evm]"
+    python bench_load.py --farmers 2000 --claims 20000 --concurrency 8 --requests 500 --out bench.json
+    python bench_load.py ... --compare bench.json --tolerance 0.15   # exit 1 on a regression
+
+--server wsgi runs the app on a threaded werkzeug server and goes through real
+HTTP; the default drives app.test_client() in-process. py-evm mines slowly
+(~70 ms/tx), so only --policies policies are created and policy id == claim id
+means only the first --policies submitted claims can land on chain; the
+historical claims are therefore inserted after the submit phase, and on-chain
+writes past --policies revert and are dead-lettered after one attempt. The
+outbox drains in the background; its counts are reported but don't gate
+request latency.
+"""
+import argparse, json, os, random, subprocess, sys, tempfile, threading, time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+ENDPOINTS = ("register", "login", "submit", "tx_status")
+
+
+class _StubChainlink(BaseHTTPRequestHandler):
+    received = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        _StubChainlink.received += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"data":{"id":"stub"}}')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_chainlink():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubChainlink)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_env(args, chain, webhook_url):
+    # must run before `import app`: these modules read their config at import time
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_load_"), "bench.sqlite3")
+    os.environ["DB_PROFILE"] = args.db_profile
+    os.environ["PUSH_TO_CHAINLINK"] = "true"
+    os.environ["CHAINLINK_WEBHOOK_URL"] = webhook_url
+    os.environ["CHAIN_WORKERS"] = str(args.chain_workers if chain else 0)
+    os.environ["CHAIN_MAX_ATTEMPTS"] = "1"
+    os.environ.pop("SEPOLIA_RPC", None)
+    os.environ.pop("SEPOLIA_RPCS", None)
+    if chain:
+        from eth_tester.backends.pyevm.main import get_default_account_keys
+        os.environ.update(PRIVATE_KEY=get_default_account_keys()[0].to_hex(), WALLET_ADDRESS=chain.owner,
+                          INSURANCE_POOL=chain.pool.address, STABLE_TOKEN=chain.token.address)
+
+
+def seed(app, db, args, rng):
+    from models import Farmer, Land
+    with app.app_context():
+        db.session.bulk_insert_mappings(Farmer, [
+            {"id": i, "registration_no": f"HBL-LOAD-{i}", "name": f"Farmer {i}", "verified": True,
+             "wallet_address": "0x000000000000000000000000000000000000dEaD"}
+            for i in range(1, args.farmers + 1)])
+        lands, lid = [], 0
+        for fid in range(1, args.farmers + 1):
+            for _ in range(args.lands_per_farmer):
+                lid += 1
+                lands.append({"id": lid, "farmer_id": fid, "land_name": f"plot {lid}", "size_acres": 2.0,
+                              "crop_type": rng.choice(["Wheat", "Maize", "Rice"]), "plots_count": 1})
+        db.session.bulk_insert_mappings(Land, lands)
+        db.session.commit()
+    return [(f"HBL-LOAD-{l['farmer_id']}", l["id"]) for l in lands]
+
+
+def seed_claims(app, db, args, pairs, rng):
+    from models import Claim
+    with app.app_context():
+        db.session.bulk_insert_mappings(Claim, [
+            {"land_id": land_id, "farmer_id": int(reg.rsplit("-", 1)[1]), "status": "no_payout", "is_stressed": 0,
+             "model1_probability": 0.1, "payout_percentage": 0.0, "onchain_status": "success"}
+            for reg, land_id in (rng.choice(pairs) for _ in range(args.claims))])
+        db.session.commit()
+
+
+def claim_payload(rng, reg, land_id):
+    return {"registration_no": reg, "land_id": land_id,
+            "model1": {"NDVI": round(rng.uniform(0.1, 0.9), 3), "SAVI": round(rng.uniform(0.1, 0.8), 3),
+                       "Chlorophyll_Content": round(rng.uniform(20, 60), 1), "Leaf_Area_Index": round(rng.uniform(0.5, 5), 2),
+                       "Temperature": round(rng.uniform(18, 42), 1), "Humidity": round(rng.uniform(20, 95), 1),
+                       "Rainfall": round(rng.uniform(0, 300), 1), "Soil_Moisture": round(rng.uniform(5, 45), 1)},
+            "model2": {"Expected_Yield": round(rng.uniform(1, 8), 2), "Crop_Stress_Indicator": round(rng.uniform(0, 100), 1),
+                       "Canopy_Coverage": round(rng.uniform(10, 95), 1), "Pest_Damage": round(rng.uniform(0, 60), 1)}}
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, json_body=None, form=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        r = client.open(path, method=method, json=json_body, data=form)
+        return r.status_code, r.get_json(silent=True)
+
+
+class WSGIDriver:
+    def __init__(self, app, threads):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from werkzeug.serving import make_server
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=threads))
+
+    def request(self, method, path, json_body=None, form=None):
+        r = self.session.request(method, self.base + path, json=json_body, data=form, timeout=60)
+        try:
+            body = r.json()
+        except ValueError:
+            body = None
+        return r.status_code, body
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def run_endpoint(driver, name, make_request, n_requests, concurrency, on_response=None):
+    """Closed loop: `concurrency` threads share `n_requests` calls of make_request(i) -> (method, path, json, form)."""
+    latencies, errors = [], [0]
+    counter = iter(range(n_requests))
+    lock = threading.Lock()
+
+    def loop():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            method, path, body, form = make_request(i)
+            t0 = time.perf_counter()
+            try:
+                status, payload = driver.request(method, path, body, form)
+            except Exception:
+                status, payload = 599, None
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors[0] += 1
+            if on_response and status < 400:
+                on_response(payload)
+
+    threads = [threading.Thread(target=loop) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {"requests": len(lat), "errors": errors[0], "rps": round(len(lat) / wall, 1) if wall else None,
+            "p50_ms": ms(percentile(lat, 50)), "p95_ms": ms(percentile(lat, 95)), "p99_ms": ms(percentile(lat, 99)),
+            "mean_ms": ms(sum(lat) / len(lat)) if lat else None, "max_ms": ms(lat[-1]) if lat else None}
+
+
+def compare(report, baseline_path, tolerance):
+    """Regressions vs a previous report: rps down or p95 up by more than `tolerance`."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = json.load(f)["endpoints"]
+    problems = []
+    for name, cur in report["endpoints"].items():
+        old = base.get(name)
+        if not old or not cur["requests"]:
+            continue
+        if old.get("rps") and cur["rps"] < old["rps"] * (1 - tolerance):
+            problems.append(f"{name}: rps {old['rps']} -> {cur['rps']}")
+        if old.get("p95_ms") and cur["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {old['p95_ms']}ms -> {cur['p95_ms']}ms")
+    return problems
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--farmers", type=int, default=1000)
+    ap.add_argument("--lands-per-farmer", type=int, default=2)
+    ap.add_argument("--claims", type=int, default=10000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=400, help="requests per endpoint")
+    ap.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    ap.add_argument("--server", choices=["testclient", "wsgi"], default="testclient")
+    ap.add_argument("--chain", choices=["local", "none"], default="local", help="none: no outbox workers, no chain")
+    ap.add_argument("--policies", type=int, default=100, help="policies to create on the local chain")
+    ap.add_argument("--chain-workers", type=int, default=2)
+    ap.add_argument("--drain-seconds", type=float, default=5, help="outbox drain time before tx_status")
+    ap.add_argument("--db-profile", default=os.environ.get("DB_PROFILE", "production"))
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument("--compare", help="previous JSON report to check for regressions")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+    endpoints = [e for e in args.endpoints.split(",") if e]
+    rng = random.Random(args.seed)
+
+    chain = None
+    if args.chain == "local":
+        from local_chain import LocalChain
+        chain = LocalChain()
+    stub = start_stub_chainlink()
+    configure_env(args, chain, f"http://127.0.0.1:{stub.server_port}/")
+
+    from app import app
+    from database import db
+    if chain is not None:
+        import web3_client
+        web3_client.use_provider(chain.provider())
+        chain.create_policies(args.policies)  # policy ids 1..N == the first N submitted claim ids
+    t0 = time.perf_counter()
+    pairs = seed(app, db, args, rng)
+    seed_s = time.perf_counter() - t0
+    claims_seeded = False
+
+    driver = WSGIDriver(app, args.concurrency) if args.server == "wsgi" else TestClientDriver(app)
+    submitted = []
+    builders = {
+        "register": lambda i: ("POST", "/api/register", None, {"name": f"Load {i}", "mobile": "9000000000"}),
+        "login": lambda i: ("POST", "/api/login", {"registration_no": rng.choice(pairs)[0]}, None),
+        "submit": lambda i: ("POST", "/api/claims/submit", claim_payload(rng, *rng.choice(pairs)), None),
+        "tx_status": lambda i: ("GET", f"/api/claims/{submitted[i % len(submitted)] if submitted else rng.randint(1, max(1, args.claims))}/tx_status", None, None),
+    }
+    hooks = {"submit": lambda body: submitted.append(body["data"]["claim_id"]) if body and body.get("ok") else None}
+
+    results = {}
+    for name in endpoints:
+        if not claims_seeded and name not in ("register", "login", "submit"):
+            t0 = time.perf_counter()
+            seed_claims(app, db, args, pairs, rng)
+            seed_s += time.perf_counter() - t0
+            claims_seeded = True
+        if name == "tx_status" and chain is not None and args.drain_seconds:
+            time.sleep(args.drain_seconds)  # let the outbox put some of the submitted claims on chain
+        driver.request("GET", "/health")  # starts the per-process background workers outside the timings
+        results[name] = run_endpoint(driver, name, builders[name], args.requests, args.concurrency, hooks.get(name))
+
+    if not claims_seeded:
+        seed_claims(app, db, args, pairs, rng)
+    from chain_queue import queue_depth
+    with app.app_context():
+        outbox = queue_depth()
+    report = {
+        "commit": git_commit(),
+        "ts": datetime.utcnow().isoformat() + "Z",
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "seed_seconds": round(seed_s, 2),
+        "endpoints": results,
+        "outbox": outbox,
+        "chainlink_stub_posts": _StubChainlink.received,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        problems = compare(report, args.compare, args.tolerance)
+        if problems:
+            print("REGRESSIONS:\n  " + "\n  ".join(problems), file=sys.stderr)
+            sys.exit(1)
+    os._exit(0)  # don't wait on the daemon outbox/dispatcher threads
+
+
+if __name__ == "__main__":
+    main()
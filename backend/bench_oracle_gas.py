@@ -0,0 +1,79 @@
+# backend/bench_oracle_gas.py
+"""
+Gas per claim: submitOracleData (one tx per claim) vs submitOracleDataBatch.
+
+Compiles contracts/FarmInsurancePool.sol with py-solc-x, deploys it on an
+eth-tester (py-evm) chain and pushes the same claims both ways. Without solc
+the committed artifact is deployed and only the single-tx baseline is measured.
+
+    pip install py-solc-x "eth-tester[py-evm]"
+    npm install @openzeppelin/contracts@4   # or set OZ_NODE_MODULES to an existing node_modules
+    python bench_oracle_gas.py --claims 200 --batch-size 50
+"""
+import argparse, random, sys, time
+
+from local_chain import CONTRACT, POOL_ARTIFACT, LocalChain, compile_pool
+
+
+def make_claims(first_policy, n, rng):
+    # roughly the live mix: a third stressed with a payout, the rest recorded without one
+    claims = []
+    for pid in range(first_policy, first_policy + n):
+        stressed = rng.random() < 0.33
+        claims.append((pid, 1 if stressed else 0, rng.randint(50_000, 900_000) if stressed else 0))
+    return claims
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--claims", type=int, default=200)
+    ap.add_argument("--batch-size", type=int, default=50)
+    ap.add_argument("--solc", default="0.8.19")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    try:
+        artifact = compile_pool(args.solc)
+    except Exception as e:
+        print(f"could not compile {CONTRACT} ({e}); deploying the committed artifact")
+        artifact = POOL_ARTIFACT
+
+    chain = LocalChain(pool_artifact=artifact)
+    chain.create_policies(2 * args.claims)
+    rng = random.Random(args.seed)
+
+    single = make_claims(1, args.claims, rng)
+    t0 = time.perf_counter()
+    single_gas = 0
+    for pid, level, pct in single:
+        r = chain.submit_claim_to_chain(pid, level, pct, wait_for_receipt=True)
+        if r.get("status") != 1:
+            sys.exit(f"single submit failed for policy {pid}: {r}")
+        single_gas += r["gas_used"]
+    single_s = time.perf_counter() - t0
+
+    print(f"claims: {args.claims}  batch size: {args.batch_size}")
+    print(f"{'mode':<8}{'txs':>6}{'total gas':>14}{'gas/claim':>12}{'wall s':>9}")
+    print(f"{'single':<8}{args.claims:>6}{single_gas:>14,}{single_gas / args.claims:>12,.0f}{single_s:>9.2f}")
+    if not chain.has_batch:
+        print("batch: the deployed pool has no submitOracleDataBatch; run `python local_chain.py build` first")
+        return
+
+    batched = make_claims(args.claims + 1, args.claims, rng)
+    t0 = time.perf_counter()
+    batch_gas, n_tx = 0, 0
+    for i in range(0, len(batched), args.batch_size):
+        r = chain.submit_claims_batch_to_chain(batched[i:i + args.batch_size], wait_for_receipt=True)
+        if r.get("status") != 1:
+            sys.exit(f"batch submit failed at offset {i}: {r}")
+        batch_gas += r["gas_used"]
+        n_tx += 1
+    batch_s = time.perf_counter() - t0
+
+    skipped = len(chain.pool.events.OracleDataSkipped().get_logs(fromBlock=0))
+    print(f"{'batch':<8}{n_tx:>6}{batch_gas:>14,}{batch_gas / args.claims:>12,.0f}{batch_s:>9.2f}")
+    print(f"batched gas per claim is {batch_gas / single_gas:.1%} of single ({skipped} entries skipped on-chain)")
+
+
+if __name__ == "__main__":
+    main()
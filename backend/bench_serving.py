@@ -0,0 +1,185 @@
+# backend/bench_serving.py
+"""
+Serving benchmark: the `python app.py` dev server vs gunicorn.conf.py.
+
+Both servers run as subprocesses on one throwaway SQLite database seeded with
+--farmers farmers (--lands-per-farmer lands each; DB_PROFILE=production,
+CHAIN_WORKERS=0). Each server is started, waited on until GET /health/ready
+answers 200, and driven over HTTP by --concurrency closed-loop clients for
+--seconds per scenario:
+
+    ready     GET  /health/ready
+    history   GET  /api/farmers/<reg>/claims?limit=20
+    submit    POST /api/claims/submit
+
+Afterwards it reads /proc/<pid>/smaps_rollup for every process of the server:
+RSS counts pages shared with the master in every worker; PSS splits shared pages
+between the processes mapping them, so the PSS sum is the server's real footprint.
+
+    python bench_serving.py --workers 4 --threads 8 --concurrency 16 --seconds 20 --out serving.json
+"""
+import argparse, json, os, random, signal, subprocess, sys, tempfile, threading, time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import requests
+
+from bench_load import claim_payload, percentile, seed
+
+SCENARIOS = ("ready", "history", "submit")
+
+
+def process_tree(root):
+    children = {}
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append(int(name))
+    out, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        out.append(pid)
+        todo.extend(children.get(pid, []))
+    return sorted(out)
+
+
+def memory(pid):
+    """smaps_rollup in MiB: rss, pss, shared, private."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+    return {"rss_mb": round(fields.get("Rss", 0), 1), "pss_mb": round(fields.get("Pss", 0), 1),
+            "shared_mb": round(fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0), 1),
+            "private_mb": round(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), 1)}
+
+
+def start_server(kind, args, env, port):
+    env = dict(env, PORT=str(port))
+    if kind == "dev":
+        cmd = [sys.executable, "app.py"]
+    else:
+        env.update(WEB_WORKERS=str(args.workers), WEB_THREADS=str(args.threads))
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    log = open(os.path.join(env["BENCH_DIR"], f"{kind}.log"), "w")
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.boot_timeout:
+        if proc.poll() is not None:
+            sys.exit(f"❌ {kind} server exited during startup, see {log.name}")
+        try:
+            if requests.get(url + "/health/ready", timeout=1).status_code == 200:
+                return proc, url, time.perf_counter() - started
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    os.killpg(proc.pid, signal.SIGTERM)
+    sys.exit(f"❌ {kind} server not ready after {args.boot_timeout}s, see {log.name}")
+
+
+def drive(url, scenario, pairs, args):
+    lat, errors, stop = [], [0], time.perf_counter() + args.seconds
+    lock = threading.Lock()
+
+    def client(seed_):
+        rng = random.Random(seed_)
+        s = requests.Session()
+        mine = []
+        while time.perf_counter() < stop:
+            reg, land_id = rng.choice(pairs)
+            t0 = time.perf_counter()
+            try:
+                if scenario == "ready":
+                    r = s.get(url + "/health/ready", timeout=30)
+                elif scenario == "history":
+                    r = s.get(f"{url}/api/farmers/{reg}/claims?limit=20", timeout=30)
+                else:
+                    r = s.post(url + "/api/claims/submit", json=claim_payload(rng, reg, land_id), timeout=30)
+                good = r.status_code == 200
+            except requests.RequestException:
+                good = False
+            mine.append(time.perf_counter() - t0)
+            if not good:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            lat.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    lat.sort()
+    ms = lambda v: round(v * 1000, 2)
+    return {"requests": len(lat), "errors": errors[0], "rps": round(len(lat) / elapsed, 1),
+            "p50_ms": ms(percentile(lat, 50)), "p95_ms": ms(percentile(lat, 95)), "p99_ms": ms(percentile(lat, 99))}
+
+
+def run_server(kind, args, env, port, pairs):
+    proc, url, boot = start_server(kind, args, env, port)
+    try:
+        result = {"boot_seconds": round(boot, 2)}
+        for scenario in SCENARIOS:
+            result[scenario] = drive(url, scenario, pairs, args)
+        # measured after traffic: copy-on-write pages a worker touched are private by now
+        procs = {pid: memory(pid) for pid in process_tree(proc.pid)}
+        result["processes"] = [dict(pid=pid, **m) for pid, m in procs.items()]
+        result["total_rss_mb"] = round(sum(m["rss_mb"] for m in procs.values()), 1)
+        result["total_pss_mb"] = round(sum(m["pss_mb"] for m in procs.values()), 1)
+        return result
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(30)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--servers", default="dev,gunicorn")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--farmers", type=int, default=2000)
+    ap.add_argument("--lands-per-farmer", type=int, default=2)
+    ap.add_argument("--port", type=int, default=8191)
+    ap.add_argument("--boot-timeout", type=float, default=120)
+    ap.add_argument("--seed", type=int, default=3)
+    ap.add_argument("--out", help="write the JSON report here")
+    args = ap.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_serving_")
+    env = dict(os.environ, BENCH_DIR=work, DATABASE_URL=f"sqlite:///{os.path.join(work, 'bench.sqlite3')}",
+               DB_PROFILE="production", CHAIN_WORKERS="0", PUSH_TO_CHAINLINK="false", CHAIN_INDEXER="false")
+    # the servers are only waited on until ready; benchmark whatever models this checkout has
+    env.setdefault("MODELS_REQUIRED", "none")
+    os.environ.update(DATABASE_URL=env["DATABASE_URL"], DB_PROFILE="production")
+    from database import create_app, db
+    import models  # noqa: F401  (registers the tables)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    pairs = seed(app, db, args, random.Random(args.seed))
+
+    report = {"cpus": os.cpu_count(), "workers": args.workers, "threads": args.threads,
+              "concurrency": args.concurrency, "seconds_per_scenario": args.seconds}
+    for i, kind in enumerate(k for k in args.servers.split(",") if k):
+        report[kind] = run_server(kind, args, env, args.port + i, pairs)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# backend/bench_spatial.py
+"""
+Radius and polygon queries over synthetic land parcels: geohash index (geo.py)
+vs the full table scan with per-row Python haversine it replaces.
+
+Parcels are clustered around --districts centres across India plus a uniform
+background. Every indexed answer is checked against a brute-force NumPy scan.
+
+    python bench_spatial.py --parcels 1000000 --queries 50 --radii 5,25,100
+"""
+import argparse, json, math, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from database import db, create_app
+from models import Land
+import geo
+
+LAT_RANGE, LON_RANGE = (8.0, 35.0), (68.0, 97.0)
+
+
+def seed(app, n, districts, rng, batch=50000):
+    centres = np.column_stack([rng.uniform(*LAT_RANGE, districts), rng.uniform(*LON_RANGE, districts)])
+    clustered = int(n * 0.8)
+    pick = rng.integers(0, districts, clustered)
+    lats = np.concatenate([centres[pick, 0] + rng.normal(0, 0.3, clustered), rng.uniform(*LAT_RANGE, n - clustered)])
+    lons = np.concatenate([centres[pick, 1] + rng.normal(0, 0.3, clustered), rng.uniform(*LON_RANGE, n - clustered)])
+    t0 = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        table = Land.__table__
+        for start in range(0, n, batch):
+            la, lo = lats[start:start + batch], lons[start:start + batch]
+            hashes = geo.encode_many(la, lo)
+            db.session.execute(table.insert(), [
+                {"id": start + i + 1, "farmer_id": 1, "land_name": "plot", "crop_type": "Rice", "size_acres": 2.0,
+                 "geo_lat": float(a), "geo_lon": float(b), "geohash": h}
+                for i, (a, b, h) in enumerate(zip(la, lo, hashes))])
+        db.session.commit()
+        db.session.execute(db.text("ANALYZE"))
+    return centres, time.perf_counter() - t0
+
+
+def python_scan_near(lat, lon, radius_km):
+    """The pre-index approach: every row into Python, haversine per row."""
+    out = []
+    for land_id, la, lo in db.session.query(Land.id, Land.geo_lat, Land.geo_lon).filter(Land.geo_lat.isnot(None)):
+        p1, p2 = math.radians(lat), math.radians(la)
+        a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lo - lon) / 2) ** 2
+        if 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(a)) <= radius_km:
+            out.append(land_id)
+    return out
+
+
+def polygon_around(lat, lon, radius_deg, rng, vertices=7):
+    angles = np.sort(rng.uniform(0, 2 * math.pi, vertices))
+    radii = rng.uniform(0.5, 1.0, vertices) * radius_deg
+    return [(lat + r * math.sin(a), lon + r * math.cos(a)) for a, r in zip(angles, radii)]
+
+
+def pct(values, p):
+    return round(float(np.percentile(values, p)), 3) if values else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--parcels", type=int, default=1_000_000)
+    ap.add_argument("--districts", type=int, default=200)
+    ap.add_argument("--queries", type=int, default=50, help="queries per radius / polygon size")
+    ap.add_argument("--radii", default="5,25,100", help="km")
+    ap.add_argument("--polygon-deg", default="0.1,0.5", help="polygon radius in degrees")
+    ap.add_argument("--scan-queries", type=int, default=3, help="full-scan baseline runs (slow)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write the JSON report here")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    prng = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_spatial_"), "bench.sqlite3")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    app = create_app()
+    centres, seed_s = seed(app, args.parcels, args.districts, rng)
+    report = {"parcels": args.parcels, "seed_seconds": round(seed_s, 2), "precision": geo.GEOHASH_PRECISION,
+              "max_cover_cells": geo.GEO_MAX_COVER_CELLS, "near": {}, "within": {}}
+
+    with app.app_context():
+        all_ids, all_lat, all_lon = (np.array(c) for c in zip(*db.session.query(Land.id, Land.geo_lat, Land.geo_lon)))
+        query = db.session.query(Land.id, Land.geo_lat, Land.geo_lon)
+        plan = db.session.execute(db.text("EXPLAIN QUERY PLAN " + str(
+            query.filter(geo.prefix_filter(Land.geohash, ["tdr1", "tdr3"])).statement.compile(
+                compile_kwargs={"literal_binds": True})))).fetchall()
+        report["query_plan"] = [r[-1] for r in plan]
+
+        def station():
+            c = centres[prng.randrange(len(centres))]
+            return float(c[0] + rng.normal(0, 0.2)), float(c[1] + rng.normal(0, 0.2))
+
+        for radius in (float(r) for r in args.radii.split(",")):
+            times, candidates, matched = [], [], []
+            for _ in range(args.queries):
+                lat, lon = station()
+                t0 = time.perf_counter()
+                hits, stats = geo.near(query, Land, lat, lon, radius)
+                times.append((time.perf_counter() - t0) * 1000)
+                expect = set(all_ids[geo.haversine_km(lat, lon, all_lat, all_lon) <= radius].tolist())
+                if {r.id for r, _ in hits} != expect:
+                    sys.exit(f"❌ near({lat}, {lon}, {radius}) disagrees with the brute-force scan")
+                candidates.append(stats["candidates"])
+                matched.append(len(hits))
+            report["near"][f"{radius:g}km"] = {"p50_ms": pct(times, 50), "p95_ms": pct(times, 95),
+                                               "avg_candidates": round(float(np.mean(candidates)), 1),
+                                               "avg_matched": round(float(np.mean(matched)), 1)}
+
+        for size in (float(s) for s in args.polygon_deg.split(",")):
+            times, candidates, matched = [], [], []
+            for _ in range(args.queries):
+                polygon = polygon_around(*station(), size, rng)
+                t0 = time.perf_counter()
+                hits, stats = geo.within(query, Land, polygon)
+                times.append((time.perf_counter() - t0) * 1000)
+                expect = set(all_ids[geo.points_in_polygon(all_lat, all_lon, polygon)].tolist())
+                if {r.id for r in hits} != expect:
+                    sys.exit(f"❌ within({polygon}) disagrees with the brute-force scan")
+                candidates.append(stats["candidates"])
+                matched.append(len(hits))
+            report["within"][f"{size:g}deg"] = {"p50_ms": pct(times, 50), "p95_ms": pct(times, 95),
+                                                "avg_candidates": round(float(np.mean(candidates)), 1),
+                                                "avg_matched": round(float(np.mean(matched)), 1)}
+
+        times = []
+        for _ in range(args.scan_queries):
+            lat, lon = station()
+            t0 = time.perf_counter()
+            python_scan_near(lat, lon, 25.0)
+            times.append((time.perf_counter() - t0) * 1000)
+        report["full_scan_25km"] = {"p50_ms": pct(times, 50), "runs": len(times)}
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
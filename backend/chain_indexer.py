@@ -0,0 +1,265 @@
+# backend/chain_indexer.py
+"""
+Event-log indexer for FarmInsurancePool.
+
+Instead of one eth_getTransactionReceipt per claim per poll, a background thread
+reads OracleDataReceived / PayoutExecuted / OracleDataSkipped logs with one
+eth_getLogs per block range and bulk-updates the matching claims (policy id ==
+claim id, as sent by the outbox worker). GET /api/claims/<id>/tx_status then
+answers from the database.
+
+Only blocks at least INDEXER_CONFIRMATIONS deep are indexed. The hash of the last
+indexed block is checkpointed; if it changes (a reorg deeper than that), the
+indexer rewinds INDEXER_CONFIRMATIONS blocks, puts claims settled by logs from
+the orphaned blocks back to pending (claims.onchain_block) and re-reads them.
+
+Reverted txs emit no logs, so claims still pending after INDEXER_STALE_SECONDS
+fall back to a single receipt lookup, oldest first. A tx the node no longer knows
+after INDEXER_DROP_SECONDS was dropped from the mempool: its outbox row is
+requeued for a fresh signature (or the claim marked failed if it has none).
+
+Run standalone with `python chain_indexer.py`, or in-process with CHAIN_INDEXER=true.
+"""
+import os, threading, time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from database import db
+from models import ChainOutbox, Claim, IndexerCheckpoint
+
+CHAIN_INDEXER = os.environ.get("CHAIN_INDEXER", "false").lower() == "true"
+INDEXER_CONFIRMATIONS = int(os.environ.get("INDEXER_CONFIRMATIONS", 6))
+INDEXER_BATCH_BLOCKS = int(os.environ.get("INDEXER_BATCH_BLOCKS", 2000))
+INDEXER_POLL_SECONDS = float(os.environ.get("INDEXER_POLL_SECONDS", 12))
+INDEXER_START_BLOCK = int(os.environ.get("INDEXER_START_BLOCK", 0))  # pool deployment block
+INDEXER_STALE_SECONDS = int(os.environ.get("INDEXER_STALE_SECONDS", 600))
+INDEXER_DROP_SECONDS = int(os.environ.get("INDEXER_DROP_SECONDS", 3600))
+INDEXER_SWEEP_PAGE = 100
+
+EVENT_SIGNATURES = {
+    "OracleDataReceived": "OracleDataReceived(uint256,uint8,uint256)",
+    "PayoutExecuted": "PayoutExecuted(uint256,address,uint256)",
+    "OracleDataSkipped": "OracleDataSkipped(uint256,uint8)",
+}
+
+
+def _default_chain():
+    from web3_client import get_w3, get_pool_contract
+    return get_w3(), get_pool_contract()
+
+
+class EventIndexer:
+    """Pass `w3`/`pool` (e.g. from local_chain.LocalChain) to index a chain other than web3_client's."""
+    def __init__(self, app, w3=None, pool=None, name="pool_events", confirmations=INDEXER_CONFIRMATIONS,
+                 batch_blocks=INDEXER_BATCH_BLOCKS, poll_interval=INDEXER_POLL_SECONDS,
+                 start_block=INDEXER_START_BLOCK, stale_seconds=INDEXER_STALE_SECONDS,
+                 drop_seconds=INDEXER_DROP_SECONDS):
+        self.app = app
+        self.w3 = w3
+        self.pool = pool
+        self.name = name
+        self.confirmations = confirmations
+        self.batch_blocks = batch_blocks
+        self.poll_interval = poll_interval
+        self.start_block = start_block
+        self.stale_seconds = stale_seconds
+        self.drop_seconds = drop_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self.rpc_calls = 0
+
+    def _chain(self):
+        if self.pool is None:
+            self.w3, self.pool = _default_chain()
+            if self.pool is None:
+                raise RuntimeError("Pool contract not initialized. Check INSURANCE_POOL and ABI")
+        return self.w3, self.pool
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="chain-indexer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                caught_up = True
+                try:
+                    caught_up = self.run_once() == 0
+                    if caught_up:
+                        self.sweep_stale()
+                except Exception as e:
+                    db.session.rollback()
+                    print("chain indexer error:", e)
+                finally:
+                    db.session.remove()
+                if caught_up:
+                    self._stop.wait(self.poll_interval)
+
+    def _checkpoint(self):
+        ckpt = IndexerCheckpoint.query.filter_by(name=self.name).first()
+        if ckpt is None:
+            ckpt = IndexerCheckpoint(name=self.name, last_block=self.start_block - 1)
+            db.session.add(ckpt)
+        return ckpt
+
+    def _block_hash(self, number):
+        self.rpc_calls += 1
+        return Web3.to_hex(self.w3.eth.get_block(number)["hash"])
+
+    def run_once(self):
+        """Index the next confirmed block range. Returns the number of blocks processed."""
+        w3, pool = self._chain()
+        ckpt = self._checkpoint()
+
+        if ckpt.last_block_hash and ckpt.last_block >= 0 and self._block_hash(ckpt.last_block) != ckpt.last_block_hash:
+            # reorg below our confirmation depth: step back, undo what the orphaned blocks settled, re-read
+            ckpt.last_block = max(self.start_block - 1, ckpt.last_block - self.confirmations)
+            ckpt.last_block_hash = None
+            self.revert_after(ckpt.last_block)
+            db.session.commit()
+            return 0
+
+        self.rpc_calls += 1
+        safe_head = w3.eth.block_number - self.confirmations
+        from_block = ckpt.last_block + 1
+        if from_block > safe_head:
+            db.session.commit()
+            return 0
+        to_block = min(safe_head, from_block + self.batch_blocks - 1)
+
+        topics = {Web3.to_hex(Web3.keccak(text=sig)): name for name, sig in EVENT_SIGNATURES.items()}
+        self.rpc_calls += 1
+        logs = w3.eth.get_logs({"address": pool.address, "fromBlock": from_block, "toBlock": to_block,
+                                "topics": [list(topics)]})
+        self.apply_logs(pool, logs, topics)
+
+        ckpt.last_block = to_block
+        ckpt.last_block_hash = self._block_hash(to_block)
+        db.session.commit()
+        return to_block - from_block + 1
+
+    def apply_logs(self, pool, logs, topics):
+        """Fold decoded logs into claim rows (caller commits). Later logs win."""
+        updates = {}
+        for log in logs:
+            name = topics.get(Web3.to_hex(log["topics"][0]))
+            if name is None:
+                continue
+            ev = getattr(pool.events, name)().process_log(log)
+            claim_id = int(ev["args"]["policyId"])
+            tx_hash = Web3.to_hex(log["transactionHash"])
+            block = int(log["blockNumber"])
+            if name == "OracleDataReceived":
+                updates[claim_id] = ("success", "paid_out" if ev["args"]["stressLevel"] == 1 else "no_payout",
+                                     tx_hash, block)
+            elif name == "PayoutExecuted":
+                updates[claim_id] = ("success", "paid_out", tx_hash, block)
+            elif name == "OracleDataSkipped":
+                updates[claim_id] = ("failed", "onchain_failed", tx_hash, block)
+        if not updates:
+            return 0
+        # one SELECT for the whole range, one flush on commit
+        for claim in Claim.query.filter(Claim.id.in_(list(updates))).all():
+            onchain_status, status, tx_hash, block = updates[claim.id]
+            claim.onchain_status = onchain_status
+            claim.status = status
+            claim.onchain_block = block
+            if not claim.onchain_tx:
+                claim.onchain_tx = tx_hash
+        return len(updates)
+
+    def revert_after(self, block):
+        """Claims settled by logs above `block` go back to pending (caller commits)."""
+        claims = Claim.query.filter(Claim.onchain_block > block).all()
+        for claim in claims:
+            claim.onchain_status, claim.status, claim.onchain_block = "pending", "onchain_submitted", None
+        return len(claims)
+
+    def sweep_stale(self, page_size=INDEXER_SWEEP_PAGE):
+        """Receipt lookup for claims that stayed pending too long (reverted txs emit no logs), oldest first."""
+        w3, _ = self._chain()
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.stale_seconds)
+        drop_cutoff = now - timedelta(seconds=self.drop_seconds)
+        query = Claim.query.filter(Claim.onchain_status == "pending", Claim.onchain_tx.isnot(None),
+                                   Claim.created_at < cutoff).order_by(Claim.created_at, Claim.id)
+        swept, after = 0, None
+        while True:
+            page = query
+            if after:
+                page = page.filter(or_(Claim.created_at > after[0],
+                                       and_(Claim.created_at == after[0], Claim.id > after[1])))
+            stale = page.limit(page_size).all()
+            if not stale:
+                return swept
+            after = (stale[-1].created_at, stale[-1].id)
+            for claim in stale:
+                self._sweep_one(w3, claim, drop_cutoff)
+            swept += len(stale)
+            db.session.commit()
+
+    def _sweep_one(self, w3, claim, drop_cutoff):
+        try:
+            self.rpc_calls += 1
+            receipt = w3.eth.get_transaction_receipt(claim.onchain_tx)
+        except TransactionNotFound:
+            if claim.created_at < drop_cutoff and not self._tx_known(w3, claim.onchain_tx):
+                self._dropped(claim)
+            return  # else not mined yet
+        except Exception:
+            return  # node unreachable: next sweep
+        if receipt.status == 0:
+            claim.onchain_status = "failed"
+            claim.status = "onchain_failed"
+            claim.onchain_block = int(receipt.blockNumber)
+
+    def _tx_known(self, w3, tx_hash):
+        try:
+            self.rpc_calls += 1
+            w3.eth.get_transaction(tx_hash)
+            return True
+        except TransactionNotFound:
+            return False
+        except Exception:
+            return True  # can't tell: leave it for the next sweep
+
+    def _dropped(self, claim):
+        """The node forgot the tx: requeue the claim's outbox row for a fresh signature."""
+        row = ChainOutbox.query.filter_by(claim_id=claim.id).order_by(ChainOutbox.id.desc()).first()
+        if row is None:
+            claim.onchain_status, claim.status = "failed", "onchain_error"
+            return
+        row.status, row.lease, row.next_attempt_at = "queued", None, datetime.utcnow()
+        row.tx_hash = row.tx_nonce = row.raw_tx = None
+        row.last_error = f"tx {claim.onchain_tx} dropped from the mempool"
+        claim.onchain_status, claim.onchain_tx = "queued", None
+
+
+def claim_tx_status(claim):
+    """tx_status payload answered from the indexed claim row, no RPC."""
+    status = {"success": 1, "failed": 0}.get(claim.onchain_status, "pending")
+    return {"tx_hash": claim.onchain_tx, "status": status, "onchain_status": claim.onchain_status,
+            "claim_status": claim.status, "source": "index"}
+
+
+if __name__ == "__main__":
+    from database import create_app
+    import analytics  # noqa: F401  keeps claim_exposure current for the status changes made here
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    indexer = EventIndexer(app).start()
+    print("chain indexer running")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        indexer.stop()
@@ -0,0 +1,301 @@
+# backend/chain_queue.py
+"""
+Durable outbox for on-chain claim submission.
+
+`enqueue_claim` adds a ChainOutbox row in the caller's transaction, so the claim
+and its pending chain write commit together. `OutboxWorker` drains the table with
+a bounded pool of threads, retrying failed sends with exponential backoff:
+
+    claim.onchain_status: queued -> pending (tx sent) -> success/failed
+
+With CHAIN_BATCH_SIZE > 1 the worker aggregates due rows into one
+submitOracleDataBatch tx, sent when the batch is full or its oldest row has
+waited CHAIN_BATCH_WAIT seconds. Only enable it against a pool deployed with
+the batch entry point.
+
+The signed tx (hash, nonce, raw bytes) is committed on the rows before it is
+broadcast. Rows a dead worker left 'inflight' without one are requeued; rows
+with one are reconciled: done if the tx has a receipt or the node accepts the
+same raw tx again, requeued only once its nonce was taken by another tx.
+
+Run standalone with `python chain_queue.py` (from backend/) when the web
+workers are started with CHAIN_WORKERS=0.
+"""
+import os, random, threading, time, uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func
+
+from database import db
+from models import Claim, ChainOutbox
+from tx_manager import is_nonce_error
+
+CHAIN_WORKERS = int(os.environ.get("CHAIN_WORKERS", 4))
+CHAIN_MAX_ATTEMPTS = int(os.environ.get("CHAIN_MAX_ATTEMPTS", 6))
+CHAIN_RETRY_BASE = float(os.environ.get("CHAIN_RETRY_BASE", 2.0))     # seconds
+CHAIN_RETRY_MAX = float(os.environ.get("CHAIN_RETRY_MAX", 300.0))     # seconds
+CHAIN_LEASE_SECONDS = int(os.environ.get("CHAIN_LEASE_SECONDS", 300))  # inflight rows older than this are requeued (swept every half lease)
+CHAIN_BATCH_SIZE = int(os.environ.get("CHAIN_BATCH_SIZE", 1))          # >1 enables submitOracleDataBatch
+CHAIN_BATCH_WAIT = float(os.environ.get("CHAIN_BATCH_WAIT", 5.0))      # seconds a partial batch may wait to fill
+
+
+def enqueue_claim(claim, is_stressed, payout):
+    """Queue the oracle tx for `claim` (must be flushed so it has an id). Caller commits."""
+    scaled = int(round((payout / 100.0) * 1_000_000))
+    claim.onchain_status = "queued"
+    row = ChainOutbox(claim_id=claim.id, stress_level=int(is_stressed), payout_scaled=scaled, status="queued")
+    db.session.add(row)
+    return row
+
+
+def queue_depth():
+    """Outbox counts per status plus the age of the oldest queued row."""
+    counts = dict(db.session.query(ChainOutbox.status, func.count(ChainOutbox.id)).group_by(ChainOutbox.status).all())
+    oldest = db.session.query(func.min(ChainOutbox.created_at)).filter(ChainOutbox.status == "queued").scalar()
+    return {
+        "queued": counts.get("queued", 0),
+        "inflight": counts.get("inflight", 0),
+        "done": counts.get("done", 0),
+        "dead": counts.get("dead", 0),
+        "oldest_queued_age_s": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
+
+
+def backoff_delay(attempts, base=CHAIN_RETRY_BASE, cap=CHAIN_RETRY_MAX):
+    # full jitter on an exponential schedule: base, 2*base, 4*base ... capped
+    return random.uniform(0.5, 1.0) * min(cap, base * (2 ** max(0, attempts - 1)))
+
+
+def _default_submit(**kwargs):
+    from web3_client import submit_claim_to_chain
+    return submit_claim_to_chain(**kwargs)
+
+
+def _default_batch_submit(**kwargs):
+    from web3_client import submit_claims_batch_to_chain
+    return submit_claims_batch_to_chain(**kwargs)
+
+
+def _pool_has_batch():
+    from web3_client import pool_has_batch
+    return pool_has_batch()
+
+
+def _default_tx_status(tx_hash):
+    from web3_client import get_tx_status
+    return get_tx_status(tx_hash)
+
+
+def _default_rebroadcast(raw_tx):
+    from web3_client import rebroadcast
+    return rebroadcast(raw_tx)
+
+
+class OutboxWorker:
+    """Pool of threads draining ChainOutbox to the chain.
+
+    `submit_fn` / `batch_submit_fn` have the signatures of web3_client.submit_claim_to_chain /
+    submit_claims_batch_to_chain, `tx_status_fn` / `rebroadcast_fn` those of
+    web3_client.get_tx_status / rebroadcast; pass ones bound to a local eth-tester chain
+    (local_chain.LocalChain) to exercise the worker without Sepolia.
+    """
+    def __init__(self, app, submit_fn=None, concurrency=CHAIN_WORKERS, max_attempts=CHAIN_MAX_ATTEMPTS,
+                 poll_interval=1.0, lease_seconds=CHAIN_LEASE_SECONDS, batch_submit_fn=None,
+                 batch_size=CHAIN_BATCH_SIZE, batch_wait=CHAIN_BATCH_WAIT, tx_status_fn=None, rebroadcast_fn=None):
+        self.app = app
+        self.submit_fn = submit_fn or _default_submit
+        self.batch_submit_fn = batch_submit_fn or _default_batch_submit
+        if batch_submit_fn is None and batch_size > 1 and not _pool_has_batch():
+            print("chain outbox: abi/FarmInsurancePool.json has no submitOracleDataBatch "
+                  "(run `python local_chain.py build`); sending one tx per claim")
+            batch_size = 1
+        self.tx_status_fn = tx_status_fn or _default_tx_status
+        self.rebroadcast_fn = rebroadcast_fn or _default_rebroadcast
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.concurrency = max(1, int(concurrency))
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._requeue_lock = threading.Lock()
+        self._last_requeue = time.monotonic()
+
+    def start(self):
+        with self.app.app_context():
+            self.requeue_stale()
+        self._last_requeue = time.monotonic()
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._run, name=f"chain-outbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake idle threads after new rows are committed."""
+        self._wake.set()
+
+    def requeue_stale(self):
+        """Settle rows a dead worker left inflight; returns how many went back to 'queued'."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        stale = ChainOutbox.query.filter(ChainOutbox.status == "inflight", ChainOutbox.updated_at < cutoff)
+        # never signed: nothing can have reached the chain, send afresh
+        n = stale.filter(ChainOutbox.tx_hash.is_(None)).update(
+            {"status": "queued", "lease": None, "next_attempt_at": datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        # signed: the tx may be on chain already; signing again with a new nonce could pay the claim twice
+        by_tx = {}
+        for row in stale.filter(ChainOutbox.tx_hash.isnot(None)).order_by(ChainOutbox.id).all():
+            by_tx.setdefault(row.tx_hash, []).append(row)
+        for tx_hash, rows in by_tx.items():
+            n += self._reconcile(tx_hash, rows)
+            db.session.commit()
+        return n
+
+    def _maybe_requeue(self):
+        # rows of a worker that died after this one started only go stale later: sweep every half lease
+        with self._requeue_lock:
+            if time.monotonic() - self._last_requeue < max(self.lease_seconds / 2, self.poll_interval):
+                return
+            self._last_requeue = time.monotonic()
+        if self.requeue_stale():
+            self._wake.set()
+
+    def _reconcile(self, tx_hash, rows):
+        if "error" in self.tx_status_fn(tx_hash):  # no receipt (yet): put the same signed tx back on the wire
+            sent = self.rebroadcast_fn(rows[0].raw_tx) if rows[0].raw_tx else {"error": "no signed tx stored"}
+            error = sent.get("error")
+            if error and "already known" not in error.lower():
+                if not is_nonce_error(error):
+                    print(f"chain outbox: cannot reconcile {tx_hash} yet:", error)
+                    return 0  # node unreachable or similar: left inflight for the next pass
+                if "error" in self.tx_status_fn(tx_hash):
+                    # the nonce went to another tx, so this one can never be mined: sign afresh
+                    for row in rows:
+                        row.status, row.lease, row.next_attempt_at = "queued", None, datetime.utcnow()
+                        row.tx_hash = row.tx_nonce = row.raw_tx = None
+                    return len(rows)
+        claims = {c.id: c for c in Claim.query.filter(Claim.id.in_([r.claim_id for r in rows])).all()}
+        for row in rows:
+            self._record(row, claims.get(row.claim_id), {"tx_hash": tx_hash})
+        return 0
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self._maybe_requeue()
+                    worked = self.drain_once()
+                except Exception as e:
+                    db.session.rollback()
+                    print("chain outbox worker error:", e)
+                    worked = False
+                finally:
+                    db.session.remove()
+                if not worked:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+
+    def _due(self, now):
+        return (ChainOutbox.query
+                .filter(ChainOutbox.status == "queued", ChainOutbox.next_attempt_at <= now)
+                .order_by(ChainOutbox.next_attempt_at, ChainOutbox.id))
+
+    def _claim(self, now):
+        """Lease the next batch of due rows. None if nothing is ready, False if another worker won the race."""
+        rows = self._due(now).limit(self.batch_size).all()
+        if not rows:
+            return None
+        if len(rows) < self.batch_size and (now - rows[0].next_attempt_at).total_seconds() < self.batch_wait:
+            return None  # let the batch fill up
+        # compare-and-set so concurrent threads/processes never send the same row twice
+        lease = uuid.uuid4().hex
+        won = ChainOutbox.query.filter(ChainOutbox.id.in_([r.id for r in rows]), ChainOutbox.status == "queued").update(
+            {"status": "inflight", "lease": lease, "attempts": ChainOutbox.attempts + 1, "updated_at": now},
+            synchronize_session=False)
+        db.session.commit()
+        if not won:
+            return False
+        return ChainOutbox.query.filter_by(lease=lease).order_by(ChainOutbox.id).all()
+
+    def drain_once(self):
+        """Send at most one tx (single claim or batch). Returns True if rows were claimed (or lost to a race)."""
+        rows = self._claim(datetime.utcnow())
+        if rows is None:
+            return False
+        if rows is False:
+            return True
+        lease = rows[0].lease
+        on_signed = lambda tx_hash, nonce, raw_tx: self._signed(lease, tx_hash, nonce, raw_tx)
+        try:
+            if self.batch_size > 1:
+                result = self.batch_submit_fn(items=[(r.claim_id, r.stress_level, r.payout_scaled) for r in rows],
+                                              wait_for_receipt=False, on_signed=on_signed)
+            else:
+                row = rows[0]
+                result = self.submit_fn(policy_id=row.claim_id, stress_level=row.stress_level,
+                                        payout_percentage_scaled=row.payout_scaled, wait_for_receipt=False,
+                                        on_signed=on_signed)
+        except Exception as e:
+            result = {"error": str(e)}
+
+        claims = {c.id: c for c in Claim.query.filter(Claim.id.in_([r.claim_id for r in rows])).all()}
+        for row in rows:
+            self._record(row, claims.get(row.claim_id), result)
+        db.session.commit()
+        return True
+
+    def _signed(self, lease, tx_hash, nonce, raw_tx):
+        # committed before the broadcast, see requeue_stale
+        ChainOutbox.query.filter_by(lease=lease).update({"tx_hash": tx_hash, "tx_nonce": nonce, "raw_tx": raw_tx},
+                                                        synchronize_session=False)
+        db.session.commit()
+
+    def _record(self, row, claim, result):
+        tx_hash = result.get("tx_hash") if isinstance(result, dict) else None
+        row.lease = None
+        row.raw_tx = None
+        if tx_hash:
+            row.status = "done"
+            row.tx_hash = tx_hash
+            row.last_error = None
+            if claim:
+                claim.onchain_tx = tx_hash
+                claim.onchain_status = "pending"
+                claim.status = "onchain_submitted"
+            return
+        row.tx_hash = row.tx_nonce = None  # the send failed: the next attempt signs a new tx
+        row.last_error = str(result.get("error") if isinstance(result, dict) else result)
+        if row.attempts >= self.max_attempts:
+            row.status = "dead"
+            if claim:
+                claim.onchain_status = "failed"
+                claim.status = "onchain_error"
+        else:
+            row.status = "queued"
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(row.attempts))
+
+
+if __name__ == "__main__":
+    from database import create_app
+    import analytics  # noqa: F401  keeps claim_exposure current for the status changes made here
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    worker = OutboxWorker(app).start()
+    print(f"chain outbox worker running with {worker.concurrency} threads")
+    try:
+        while True:
+            time.sleep(30)
+            with app.app_context():
+                print("queue depth:", queue_depth())
+    except KeyboardInterrupt:
+        worker.stop()
@@ -1,12 +1,146 @@
-import os, json, requests
+import os, json, random, threading, time, queue
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import timed
 
 CHAINLINK_WEBHOOK_URL = os.environ.get("CHAINLINK_WEBHOOK_URL", "")
 CHAINLINK_API_KEY = os.environ.get("CHAINLINK_API_KEY", "")
 PUSH_TO_CHAINLINK = os.environ.get("PUSH_TO_CHAINLINK", "false").lower() == "true"
+# set when the node job accepts {"predictions": [...]} instead of one prediction per run
+CHAINLINK_BATCH = os.environ.get("CHAINLINK_BATCH", "false").lower() == "true"
+CHAINLINK_BATCH_SIZE = int(os.environ.get("CHAINLINK_BATCH_SIZE", 50))
+CHAINLINK_FLUSH_SECONDS = float(os.environ.get("CHAINLINK_FLUSH_SECONDS", 1.0))
+CHAINLINK_MAX_ATTEMPTS = int(os.environ.get("CHAINLINK_MAX_ATTEMPTS", 5))
+CHAINLINK_TIMEOUT = float(os.environ.get("CHAINLINK_TIMEOUT", 20))
+CHAINLINK_QUEUE_MAX = int(os.environ.get("CHAINLINK_QUEUE_MAX", 10000))
+
+
+class ChainlinkDispatcher:
+    """
+    Background sender for webhook job runs.
+
+    push() only enqueues; one thread drains the queue over a pooled keep-alive
+    session, coalescing up to `batch_size` predictions per POST when `batch` is on,
+    and retries 5xx/429/connection errors with jittered exponential backoff.
+    """
+    def __init__(self, url=CHAINLINK_WEBHOOK_URL, api_key=CHAINLINK_API_KEY, batch=CHAINLINK_BATCH,
+                 batch_size=CHAINLINK_BATCH_SIZE, flush_seconds=CHAINLINK_FLUSH_SECONDS,
+                 max_attempts=CHAINLINK_MAX_ATTEMPTS, timeout=CHAINLINK_TIMEOUT, queue_max=CHAINLINK_QUEUE_MAX,
+                 retry_base=0.5, retry_max=30.0):
+        self.url = url
+        self.batch = batch
+        self.batch_size = max(1, batch_size if batch else 1)
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["X-API-Key"] = api_key
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=2))
+        self._queue = queue.Queue(maxsize=queue_max)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counters = {"delivered": 0, "failed": 0, "dropped": 0, "retries": 0, "posts": 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="chainlink-dispatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop after flushing what is already queued (bounded by `timeout`)."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def push(self, payload):
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self._count("dropped")
+            return {"queued": False, "reason": "dispatcher queue full"}
+        return {"queued": True, "queue_depth": self._queue.qsize()}
+
+    def stats(self):
+        with self._lock:
+            out = dict(self.counters)
+        out["queued"] = self._queue.qsize()
+        return out
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            items = [first]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            body = {"predictions": items} if self.batch else items[0]
+            if self._post(body):
+                self._count("delivered", len(items))
+            else:
+                self._count("failed", len(items))
+
+    @timed("chainlink_post")
+    def _post(self, body):
+        data = json.dumps(body)
+        for attempt in range(1, self.max_attempts + 1):
+            retryable = True
+            try:
+                self._count("posts")
+                r = self.session.post(self.url, headers=self.headers, data=data, timeout=self.timeout)
+                if r.status_code < 300:
+                    return True
+                retryable = r.status_code >= 500 or r.status_code == 429
+            except requests.RequestException:
+                pass
+            if not retryable or attempt == self.max_attempts:
+                return False
+            self._count("retries")
+            delay = random.uniform(0.5, 1.0) * min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+            self._stop.wait(delay)  # cut short on shutdown so stop() can flush
+        return False
+
+
+_dispatcher = None
+_dispatcher_pid = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    # one sender thread per process (re-created after fork)
+    global _dispatcher, _dispatcher_pid
+    if _dispatcher is None or _dispatcher_pid != os.getpid():
+        with _dispatcher_lock:
+            if _dispatcher is None or _dispatcher_pid != os.getpid():
+                _dispatcher = ChainlinkDispatcher().start()
+                _dispatcher_pid = os.getpid()
+    return _dispatcher
+
 
+@timed("push_prediction_to_chainlink")
 def push_prediction_to_chainlink(payload: dict) -> dict:
     """
-    Push mode: POST the result to a Chainlink Node job (webhook job) if you want the node to ingest it.
+    Push mode: queue the result for a Chainlink Node job (webhook job) if you want the node to ingest it.
+    Delivery happens on the dispatcher thread; the returned dict only says whether it was queued.
     If you're using Chainlink Functions (pull mode), keep PUSH_TO_CHAINLINK=false
     and let the DON call your /oracle/predict endpoint instead.
     """
@@ -14,13 +148,8 @@ def push_prediction_to_chainlink(payload: dict) -> dict:
         return {"skipped": True, "reason": "PUSH_TO_CHAINLINK=false"}
     if not CHAINLINK_WEBHOOK_URL:
         return {"skipped": True, "reason": "missing CHAINLINK_WEBHOOK_URL"}
+    return get_dispatcher().push(payload)
 
-    headers = {"Content-Type": "application/json"}
-    if CHAINLINK_API_KEY:
-        headers["X-API-Key"] = CHAINLINK_API_KEY
 
-    try:
-        r = requests.post(CHAINLINK_WEBHOOK_URL, headers=headers, data=json.dumps(payload), timeout=20)
-        return {"status_code": r.status_code, "text": r.text}
-    except Exception as e:
-        return {"error": str(e)}
+def chainlink_stats() -> dict:
+    return _dispatcher.stats() if _dispatcher is not None else {"delivered": 0, "failed": 0, "dropped": 0, "retries": 0, "posts": 0, "queued": 0}
@@ -2,13 +2,63 @@
 import os
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
 
 db = SQLAlchemy()
 
-def create_app():
+# DB_PROFILE=production: WAL so readers don't block on the writer, NORMAL fsync (safe under WAL),
+# a shared mmap window and a larger page cache, and a real connection pool instead of a
+# fresh sqlite3 connection per request.
+DB_PROFILE = os.environ.get("DB_PROFILE", "default")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", os.environ.get("WEB_THREADS", 10)))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 5))
+
+SQLITE_PROFILES = {
+    "default": {"pragmas": {}, "engine": {}},
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+            "cache_size": -int(os.environ.get("SQLITE_CACHE_KB", 64 * 1024)),  # negative = KiB
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+        "engine": {
+            "poolclass": QueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": 10,
+            "connect_args": {"check_same_thread": False, "timeout": 5},
+        },
+    },
+}
+
+
+def _set_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cur = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+    return on_connect
+
+
+def create_app(profile=None):
     app = Flask(__name__)
     db_path = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(os.path.dirname(__file__), 'db.sqlite3')}")
     app.config["SQLALCHEMY_DATABASE_URI"] = db_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    profile = profile or DB_PROFILE
+    settings = SQLITE_PROFILES.get(profile) if db_path.startswith("sqlite") else None
+    if profile != "default" and db_path.startswith("sqlite") and settings is None:
+        raise ValueError(f"unknown DB_PROFILE {profile!r}; expected one of {sorted(SQLITE_PROFILES)}")
+    if settings and settings["engine"]:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = dict(settings["engine"])
     db.init_app(app)
+    if settings and settings["pragmas"]:
+        with app.app_context():
+            event.listen(db.engine, "connect", _set_sqlite_pragmas(settings["pragmas"]))
     return app
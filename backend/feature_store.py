@@ -0,0 +1,274 @@
+# backend/feature_store.py
+"""
+Columnar feature store for training and analytics.
+
+Two tables, one per model, with the serving schema:
+
+    stress   STRESS_FEATURES + is_stressed
+    payout   PAYOUT_FEATURES + payout_percentage
+
+Each table is a directory of partitions; a partition is one .npy file per column
+(float32 features/labels, int64 claim_id/created_ts, int8 source) that readers
+open with mmap_mode="r", so scanning tens of millions of rows only ever touches
+the pages being read. manifest.json lists the committed partitions and the
+Claim.id high-water mark; it is replaced atomically after the partition files
+are written, so an interrupted build leaves nothing half-visible.
+
+`build` imports the seed CSVs once (streamed with pandas chunksize) and then
+appends every claim with id above the high-water mark, parsed from
+Claim.payload_json. Missing or non-numeric features are stored as 0.0, the value
+ml._feature_matrix scored them with. Claim labels are the served predictions,
+not ground truth; filter on source (0 = seed CSV, 1 = claim) when that matters.
+
+    python feature_store.py build
+    python feature_store.py info
+"""
+import argparse, json, os, shutil, sys
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+FEATURE_STORE_DIR = os.environ.get("FEATURE_STORE_DIR", os.path.join(REPO_DIR, "feature_store"))
+PARTITION_ROWS = int(os.environ.get("FEATURE_STORE_PARTITION_ROWS", 1_000_000))
+
+STRESS_FEATURES = ['NDVI','SAVI','Chlorophyll_Content','Leaf_Area_Index','Temperature','Humidity','Rainfall','Soil_Moisture']
+PAYOUT_FEATURES = ['NDVI','Expected_Yield','Crop_Stress_Indicator','Temperature','Rainfall','Soil_Moisture','Crop_Type_encoded','Canopy_Coverage','Pest_Damage','Leaf_Area_Index']
+CROP_MAP = {'Wheat': 0, 'Maize': 1, 'Rice': 2}
+
+TABLES = {
+    "stress": {"features": STRESS_FEATURES, "label": "is_stressed", "payload_key": "model1",
+               "seed_csv": os.path.join(REPO_DIR, "model1_stress_detection_dataset_balanced.csv")},
+    "payout": {"features": PAYOUT_FEATURES, "label": "payout_percentage", "payload_key": "model2",
+               "seed_csv": os.path.join(REPO_DIR, "model2_payout_prediction_dataset.csv")},
+}
+META_COLUMNS = {"claim_id": np.int64, "created_ts": np.int64, "source": np.int8}
+SOURCE_SEED, SOURCE_CLAIM = 0, 1
+
+
+def _to_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Table:
+    """Reader (and appender) for one table directory."""
+    def __init__(self, root, name):
+        self.name = name
+        self.dir = os.path.join(root, name)
+        self.spec = TABLES[name]
+        self.features = list(self.spec["features"])
+        self.label = self.spec["label"]
+        self.columns = self.features + [self.label] + list(META_COLUMNS)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        path = os.path.join(self.dir, "manifest.json")
+        if not os.path.exists(path):
+            return {"table": self.name, "features": self.features, "label": self.label,
+                    "partitions": [], "high_water_mark": 0, "seeded": False}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = os.path.join(self.dir, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.dir, "manifest.json"))
+
+    @property
+    def rows(self):
+        return sum(p["rows"] for p in self.manifest["partitions"])
+
+    def dtype(self, column):
+        return META_COLUMNS.get(column, np.float32)
+
+    # -- writing --------------------------------------------------------
+
+    def write_partition(self, columns):
+        """Write one partition from {column: 1-D array}; returns its manifest entry (not yet committed)."""
+        n = len(columns["claim_id"])
+        seq = max([int(p["name"].split("-")[1]) for p in self.manifest["partitions"]], default=-1) + 1
+        name = f"part-{seq:06d}"
+        path = os.path.join(self.dir, name)
+        shutil.rmtree(path, ignore_errors=True)  # leftovers of an interrupted build
+        os.makedirs(path)
+        for col in self.columns:
+            np.save(os.path.join(path, f"{col}.npy"), np.ascontiguousarray(columns[col], dtype=self.dtype(col)))
+        entry = {"name": name, "rows": int(n)}
+        if n:
+            entry["claim_id_min"] = int(columns["claim_id"].min())
+            entry["claim_id_max"] = int(columns["claim_id"].max())
+        self.manifest["partitions"].append(entry)
+        return entry
+
+    def commit(self, **updates):
+        self.manifest.update(updates)
+        self._write_manifest()
+
+    # -- reading --------------------------------------------------------
+
+    def partition(self, entry, columns=None):
+        """{column: read-only memmap} for one manifest entry."""
+        path = os.path.join(self.dir, entry["name"])
+        return {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r") for c in (columns or self.columns)}
+
+    def iter_chunks(self, columns=None, chunk_rows=65536, source=None):
+        """Yield {column: array view} of at most `chunk_rows` rows, partition by partition."""
+        need = list(columns or self.columns)
+        read = need + (["source"] if source is not None and "source" not in need else [])
+        for entry in self.manifest["partitions"]:
+            cols = self.partition(entry, read)
+            for start in range(0, entry["rows"], chunk_rows):
+                chunk = {c: cols[c][start:start + chunk_rows] for c in read}
+                if source is not None:
+                    keep = chunk["source"] == source
+                    if not keep.all():
+                        chunk = {c: v[keep] for c, v in chunk.items()}
+                yield {c: chunk[c] for c in need}
+
+    def iter_matrix(self, chunk_rows=65536, source=None):
+        """Yield (X, y) float32 chunks with X columns in feature order."""
+        for chunk in self.iter_chunks(self.features + [self.label], chunk_rows, source):
+            X = np.column_stack([chunk[f] for f in self.features]) if len(chunk[self.label]) else \
+                np.empty((0, len(self.features)), dtype=np.float32)
+            yield X, np.asarray(chunk[self.label])
+
+
+class FeatureStore:
+    def __init__(self, root=FEATURE_STORE_DIR):
+        self.root = root
+
+    def table(self, name):
+        return Table(self.root, name)
+
+    def info(self):
+        out = {}
+        for name in TABLES:
+            t = self.table(name)
+            out[name] = {"rows": t.rows, "partitions": len(t.manifest["partitions"]),
+                         "high_water_mark": t.manifest["high_water_mark"], "seeded": t.manifest["seeded"]}
+        return out
+
+    # -- building -------------------------------------------------------
+
+    def import_seed(self, table, partition_rows=PARTITION_ROWS, chunk_rows=100_000):
+        """Stream the table's seed CSV into partitions (once per store, committed in one manifest write)."""
+        import pandas as pd
+        if table.manifest["seeded"] or not os.path.exists(table.spec["seed_csv"]):
+            return 0
+        total = 0
+        buf = []
+        for df in pd.read_csv(table.spec["seed_csv"], chunksize=chunk_rows):
+            if "Crop_Type_encoded" in table.features and "Crop_Type_encoded" not in df.columns:
+                df["Crop_Type_encoded"] = df["Crop_Type"].map(CROP_MAP).fillna(0)
+            n = len(df)
+            cols = {f: df[f].to_numpy(dtype=np.float32) if f in df.columns else np.zeros(n, np.float32)
+                    for f in table.features}
+            cols[table.label] = df[table.label].to_numpy(dtype=np.float32)
+            cols["claim_id"] = np.zeros(n, np.int64)
+            cols["created_ts"] = np.zeros(n, np.int64)
+            cols["source"] = np.full(n, SOURCE_SEED, np.int8)
+            buf.append(cols)
+            if sum(len(b["claim_id"]) for b in buf) >= partition_rows:
+                total += self._flush(table, buf, commit=False)
+                buf = []
+        total += self._flush(table, buf, commit=False)
+        table.commit(seeded=True)  # partitions and the flag land together: a rerun after a crash starts over
+        return total
+
+    def append_claims(self, tables, partition_rows=PARTITION_ROWS, chunk_rows=5000):
+        """Append claims above each table's high-water mark. Returns rows added per table."""
+        from database import db
+        from models import Claim
+
+        upper = db.session.query(db.func.max(Claim.id)).scalar() or 0  # claims inserted during the build wait for the next one
+        lower = min(t.manifest["high_water_mark"] for t in tables)
+        added = {t.name: 0 for t in tables}
+        bufs = {t.name: [] for t in tables}
+        rows = (db.session.query(Claim.id, Claim.created_at, Claim.payload_json, Claim.is_stressed, Claim.payout_percentage)
+                .filter(Claim.id > lower, Claim.id <= upper).order_by(Claim.id).yield_per(chunk_rows))
+        pending = []
+        for row in rows:
+            pending.append(row)
+            if len(pending) >= chunk_rows:
+                self._columns_from_claims(tables, pending, bufs)
+                pending = []
+                for t in tables:
+                    if sum(len(b["claim_id"]) for b in bufs[t.name]) >= partition_rows:
+                        added[t.name] += self._flush(t, bufs[t.name], commit=False)
+                        bufs[t.name] = []
+        self._columns_from_claims(tables, pending, bufs)
+        for t in tables:
+            added[t.name] += self._flush(t, bufs[t.name], commit=False)
+            t.commit(high_water_mark=max(t.manifest["high_water_mark"], upper))
+        return added
+
+    def _columns_from_claims(self, tables, rows, bufs):
+        if not rows:
+            return
+        payloads = []
+        for r in rows:
+            try:
+                payloads.append(json.loads(r.payload_json or "{}"))
+            except ValueError:
+                payloads.append({})
+        for t in tables:
+            keep = [i for i, r in enumerate(rows) if r.id > t.manifest["high_water_mark"]]
+            if not keep:
+                continue
+            key = t.spec["payload_key"]
+            fds = [payloads[i].get(key) or {} for i in keep]
+            cols = {f: np.array([_to_float(fd.get(f, 0.0)) for fd in fds], dtype=np.float32) for f in t.features}
+            label = [getattr(rows[i], t.label) for i in keep]
+            cols[t.label] = np.array([_to_float(v) for v in label], dtype=np.float32)
+            cols["claim_id"] = np.array([rows[i].id for i in keep], dtype=np.int64)
+            cols["created_ts"] = np.array([int(rows[i].created_at.timestamp()) if rows[i].created_at else 0
+                                           for i in keep], dtype=np.int64)
+            cols["source"] = np.full(len(keep), SOURCE_CLAIM, np.int8)
+            bufs[t.name].append(cols)
+
+    def _flush(self, table, buf, commit=True):
+        buf = [b for b in buf if len(b["claim_id"])]
+        if not buf:
+            return 0
+        merged = {c: np.concatenate([b[c] for b in buf]) for c in table.columns}
+        entry = table.write_partition(merged)
+        if commit:
+            table.commit()
+        return entry["rows"]
+
+    def build(self, seed=True, partition_rows=PARTITION_ROWS):
+        tables = [self.table(name) for name in TABLES]
+        report = {}
+        for t in tables:
+            report[t.name] = {"seed_rows": self.import_seed(t, partition_rows) if seed else 0}
+        for name, n in self.append_claims(tables, partition_rows).items():
+            report[name]["claim_rows"] = n
+        return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=["build", "info"])
+    ap.add_argument("--root", default=FEATURE_STORE_DIR)
+    ap.add_argument("--partition-rows", type=int, default=PARTITION_ROWS)
+    ap.add_argument("--no-seed", action="store_true", help="skip importing the seed CSVs")
+    args = ap.parse_args()
+
+    store = FeatureStore(args.root)
+    if args.command == "info":
+        print(json.dumps(store.info(), indent=2))
+        return
+    sys.path.insert(0, BASE_DIR)
+    from database import create_app
+    app = create_app()
+    with app.app_context():
+        report = store.build(seed=not args.no_seed, partition_rows=args.partition_rows)
+    print(json.dumps({"added": report, "store": store.info()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# backend/geo.py
+"""
+Geohash spatial index over land parcels.
+
+Every land with coordinates gets lands.geohash (GEOHASH_PRECISION chars, ~150 m
+cells at 7) under a plain B-tree index. A geohash prefix is a grid cell and all
+hashes inside it sort together, so a cell is one index range scan:
+
+    geohash >= 'tdr1w' AND geohash < 'tdr1w{'      ('{' sorts right after 'z')
+
+A radius or polygon query takes its bounding box, picks the finest precision at
+which the box is covered by at most GEO_MAX_COVER_CELLS cells, scans those
+ranges (plus the bounding box on geo_lat/geo_lon), and refines the candidates
+with vectorized haversine distance / point-in-polygon tests in NumPy. At most
+GEO_MAX_CANDIDATES rows are fetched (radius queries nearest first by a planar
+distance computed in SQL); past that the stats say candidates_truncated.
+
+    python geo.py backfill      # hash lands created before the column existed
+"""
+import math, os, sys
+
+import numpy as np
+from sqlalchemy import and_, func, or_
+
+GEOHASH_PRECISION = int(os.environ.get("GEOHASH_PRECISION", 7))
+GEO_MAX_COVER_CELLS = int(os.environ.get("GEO_MAX_COVER_CELLS", 32))
+GEO_MAX_CANDIDATES = int(os.environ.get("GEO_MAX_CANDIDATES", 20000))
+GEO_MAX_POLYGON_VERTICES = int(os.environ.get("GEO_MAX_POLYGON_VERTICES", 1000))
+EARTH_RADIUS_KM = 6371.0088
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32 = np.array(list(BASE32))
+
+
+def _bits(precision):
+    # geohash interleaves lon, lat, lon, ... starting with lon: lon gets the extra bit
+    n = 5 * precision
+    return (n + 1) // 2, n // 2  # lon bits, lat bits
+
+
+def cell_size(precision):
+    """(lat degrees, lon degrees) of one cell at `precision`."""
+    lon_bits, lat_bits = _bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def _cell_index(lat, lon, precision):
+    lon_bits, lat_bits = _bits(precision)
+    lat_i = np.floor((np.asarray(lat, dtype=float) + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64)
+    lon_i = np.floor((np.asarray(lon, dtype=float) + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64)
+    return np.clip(lat_i, 0, (1 << lat_bits) - 1), np.clip(lon_i, 0, (1 << lon_bits) - 1)
+
+
+def _hash_from_index(lat_i, lon_i, precision):
+    lon_bits, lat_bits = _bits(precision)
+    lat_i, lon_i = np.atleast_1d(lat_i), np.atleast_1d(lon_i)
+    chars = np.zeros((len(lat_i), precision), dtype=np.int64)
+    lon_k, lat_k = lon_bits, lat_bits
+    for k in range(5 * precision):
+        if k % 2 == 0:
+            lon_k -= 1
+            bit = (lon_i >> lon_k) & 1
+        else:
+            lat_k -= 1
+            bit = (lat_i >> lat_k) & 1
+        chars[:, k // 5] = (chars[:, k // 5] << 1) | bit
+    return ["".join(row) for row in _BASE32[chars]]
+
+
+def encode_many(lats, lons, precision=GEOHASH_PRECISION):
+    """Geohashes for arrays of coordinates."""
+    return _hash_from_index(*_cell_index(lats, lons, precision), precision)
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    if lat is None or lon is None:
+        return None
+    return encode_many([lat], [lon], precision)[0]
+
+
+def _split_antimeridian(min_lat, min_lon, max_lat, max_lon):
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    if max_lon - min_lon >= 360.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def cover(min_lat, min_lon, max_lat, max_lon, max_cells=GEO_MAX_COVER_CELLS):
+    """Geohash prefixes whose cells cover the box, as fine as `max_cells` allows."""
+    boxes = _split_antimeridian(min_lat, min_lon, max_lat, max_lon)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        ranges = []
+        for b in boxes:
+            (la0, la1), (lo0, lo1) = zip(_cell_index(b[0], b[1], precision), _cell_index(b[2], b[3], precision))
+            ranges.append((la0, la1, lo0, lo1))
+        if sum((la1 - la0 + 1) * (lo1 - lo0 + 1) for la0, la1, lo0, lo1 in ranges) <= max_cells or precision == 1:
+            prefixes = set()
+            for la0, la1, lo0, lo1 in ranges:
+                lat_i, lon_i = np.meshgrid(np.arange(la0, la1 + 1), np.arange(lo0, lo1 + 1))
+                prefixes.update(_hash_from_index(lat_i.ravel(), lon_i.ravel(), precision))
+            return sorted(prefixes)
+
+
+def prefix_filter(column, prefixes):
+    """OR of one index range per prefix."""
+    return or_(*[and_(column >= p, column < p + "{") for p in prefixes])
+
+
+def radius_box(lat, lon, radius_km):
+    """(min_lat, min_lon, max_lat, max_lon) around a circle; lon span widens toward the poles."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    coslat = math.cos(math.radians(lat))
+    if abs(lat) + dlat >= 90.0 or coslat < 1e-9:
+        return lat - dlat, -180.0, lat + dlat, 180.0
+    dlon = math.degrees(min(math.pi, radius_km / (EARTH_RADIUS_KM * coslat)))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def points_in_polygon(lats, lons, polygon):
+    """Even-odd rule for each point against a ring of (lat, lon) vertices; vectorized over points."""
+    y = np.asarray(lats, dtype=float)
+    x = np.asarray(lons, dtype=float)
+    poly = np.asarray(polygon, dtype=float)
+    inside = np.zeros(len(y), dtype=bool)
+    for (y1, x1), (y2, x2) in zip(poly, np.roll(poly, -1, axis=0)):
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (x < x_at)
+    return inside
+
+
+def parse_polygon(body):
+    """[(lat, lon), ...] from {"polygon": [[lat, lon], ...]} or a GeoJSON Polygon ({"type": "Polygon", ...})."""
+    if isinstance(body, dict) and body.get("type") == "Polygon":
+        raw, lat_first = body["coordinates"][0], False
+    elif isinstance(body, dict) and isinstance(body.get("geometry"), dict):
+        return parse_polygon(body["geometry"])
+    elif isinstance(body, dict) and "polygon" in body:
+        raw, lat_first = body["polygon"], True
+    else:
+        raise ValueError("polygon (list of [lat, lon]) or a GeoJSON Polygon required")
+    if len(raw) > GEO_MAX_POLYGON_VERTICES + 1:  # +1: a closed ring repeats its first vertex
+        raise ValueError(f"polygon has more than {GEO_MAX_POLYGON_VERTICES} vertices")
+    ring = [(float(a), float(b)) if lat_first else (float(b), float(a)) for a, b in raw]
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring = ring[:-1]
+    if len(ring) < 3:
+        raise ValueError("polygon needs at least 3 vertices")
+    if any(not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0) for lat, lon in ring):
+        raise ValueError("polygon coordinates out of range")
+    return ring
+
+
+def planar_distance2(model, lat, lon):
+    """Squared equirectangular distance in degrees as a SQL expression: ranks rows nearest first."""
+    dlon = func.abs(model.geo_lon - lon)
+    dlon = func.min(dlon, 360.0 - dlon)  # SQLite's scalar min(): the short way round the antimeridian
+    dlat = model.geo_lat - lat
+    k = math.cos(math.radians(lat))
+    return dlat * dlat + dlon * dlon * (k * k)
+
+
+def _candidates(query, model, box, order_by=None, max_candidates=GEO_MAX_CANDIDATES):
+    min_lat, min_lon, max_lat, max_lon = box
+    prefixes = cover(*box)
+    q = query.filter(prefix_filter(model.geohash, prefixes), model.geo_lat.between(min_lat, max_lat))
+    if min_lon >= -180.0 and max_lon <= 180.0:
+        q = q.filter(model.geo_lon.between(min_lon, max_lon))
+    if order_by is not None:
+        q = q.order_by(order_by)
+    rows = q.limit(max_candidates + 1).all()
+    stats = {"cells": len(prefixes), "candidates": min(len(rows), max_candidates),
+             "candidates_truncated": len(rows) > max_candidates}
+    return rows[:max_candidates], stats
+
+
+def near(query, model, lat, lon, radius_km, max_candidates=GEO_MAX_CANDIDATES):
+    """Rows of `query` within radius_km, nearest first: ([(row, distance_km)], stats)."""
+    rows, stats = _candidates(query, model, radius_box(lat, lon, radius_km), planar_distance2(model, lat, lon),
+                              max_candidates)
+    if not rows:
+        return [], stats
+    dist = haversine_km(lat, lon, [r.geo_lat for r in rows], [r.geo_lon for r in rows])
+    keep = np.flatnonzero(dist <= radius_km)
+    keep = keep[np.argsort(dist[keep], kind="stable")]
+    return [(rows[i], float(dist[i])) for i in keep], stats
+
+
+def within(query, model, polygon, max_candidates=GEO_MAX_CANDIDATES):
+    """Rows of `query` inside the polygon: ([row], stats)."""
+    lats, lons = [p[0] for p in polygon], [p[1] for p in polygon]
+    rows, stats = _candidates(query, model, (min(lats), min(lons), max(lats), max(lons)),
+                              max_candidates=max_candidates)
+    if not rows:
+        return [], stats
+    inside = points_in_polygon([r.geo_lat for r in rows], [r.geo_lon for r in rows], polygon)
+    return [rows[i] for i in np.flatnonzero(inside)], stats
+
+
+def backfill(session, model, batch=10000):
+    """Set geohash on rows that have coordinates but no hash; returns the count."""
+    done = 0
+    while True:
+        rows = (session.query(model.id, model.geo_lat, model.geo_lon)
+                .filter(model.geohash.is_(None), model.geo_lat.isnot(None), model.geo_lon.isnot(None))
+                .limit(batch).all())
+        if not rows:
+            return done
+        hashes = encode_many([r[1] for r in rows], [r[2] for r in rows])
+        session.bulk_update_mappings(model, [{"id": r[0], "geohash": h} for r, h in zip(rows, hashes)])
+        session.commit()
+        done += len(rows)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from database import create_app, db
+    from models import Land
+    app = create_app()
+    with app.app_context():
+        print(f"geohashed {backfill(db.session, Land)} lands")
@@ -0,0 +1,60 @@
+# backend/gunicorn.conf.py
+"""
+Production serving: WEB_WORKERS preforked processes x WEB_THREADS threads each.
+
+    cd backend && gunicorn -c gunicorn.conf.py app:app
+
+preload_app imports app.py once in the master, so the model bundle (ml.py), the
+flattened Model 2 forest (np.load(mmap_mode="r"), shared through the page cache)
+and every imported library are in memory before fork and shared copy-on-write.
+gc.freeze() moves those objects out of the collector's reach so its passes don't
+dirty the shared pages. Each worker then drops the SQLite connections it
+inherited and starts its own background threads (model watcher, chain outbox,
+indexer).
+
+    kill -HUP <master>     graceful reload: new workers are forked, old ones finish
+                           their requests (up to WEB_GRACEFUL_TIMEOUT) and exit.
+                           Forked from the preloaded master, so they pick up a newly
+                           promoted model bundle but not code changes.
+    kill -USR2 <master>    code deploy: starts a new master on the new code next to
+                           the old one; then `kill -TERM <old master>`.
+
+Liveness: GET /health. Readiness: GET /health/ready (503 until models are loaded
+and the database answers).
+"""
+import gc, os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1))
+threads = int(os.environ.get("WEB_THREADS", 10))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# recycle workers after this many requests (0 = never); jitter keeps them from restarting together
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get("WEB_ACCESS_LOG") or None
+
+
+def pre_fork(server, worker):
+    # in the master: load a newly promoted bundle before forking, so replacement workers
+    # (HUP, max_requests, crashes) share it instead of each loading a private copy
+    import ml
+    ml.check_models(wait=True)
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import app, ensure_background_workers
+    from database import db
+    with app.app_context():
+        db.engine.dispose(close=False)  # the pool's connections belong to the master
+    ensure_background_workers()
+
+
+def worker_exit(server, worker):
+    from app import stop_background_workers
+    stop_background_workers()
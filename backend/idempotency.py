@@ -0,0 +1,233 @@
+# backend/idempotency.py
+"""
+Idempotency-Key support for the claim submission endpoints.
+
+A client that retries after a timeout sends the same Idempotency-Key header
+(any string up to 255 chars, a UUID per logical submission). The first request
+with a key inserts an idempotency_keys row ('inflight') and runs; its response
+is stored on the row ('done') and every later request with that key and the
+same body gets the stored response back (Idempotent-Replayed: true) without
+running the models, writing claims or queueing chain transactions.
+
+    same key, other body          422
+    same key, still running       waits up to IDEMPOTENCY_WAIT seconds for the
+                                  result, then 409 with Retry-After
+    first attempt answered 5xx    the key is released; the retry runs again
+    key older than IDEMPOTENCY_TTL  purged; the key can be used afresh
+
+Lookups are one probe of the (endpoint, key) unique index. The row flips to
+'committed' inside the transaction that commits the claims, so if a worker dies
+after that commit but before storing the response, retries get a 409 instead
+of a second claim. An 'inflight' row older than IDEMPOTENCY_LOCK_SECONDS
+committed nothing and is taken over by the next retry.
+"""
+import functools, hashlib, os, threading, time
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, g, has_request_context, jsonify, request
+from sqlalchemy import and_, event, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import db
+from models import IdempotencyKey
+
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 24 * 3600))
+IDEMPOTENCY_WAIT = float(os.environ.get("IDEMPOTENCY_WAIT", 10))
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", 120))
+IDEMPOTENCY_PURGE_SECONDS = float(os.environ.get("IDEMPOTENCY_PURGE_SECONDS", 300))
+MAX_KEY_LENGTH = 255
+
+_inflight = {}  # (endpoint, key) -> Event, for duplicates arriving at the same process
+_inflight_lock = threading.Lock()
+_last_purge = [0.0]
+_stats = {"first": 0, "replayed": 0, "waited": 0, "conflict": 0, "mismatch": 0, "released": 0, "purged": 0}
+
+
+def _error(msg, code, **headers):
+    resp = jsonify({"ok": False, "error": msg})
+    resp.status_code = code
+    resp.headers.update(headers)
+    return resp
+
+
+def _replay(row):
+    _stats["replayed"] += 1
+    return Response(row.response_body, status=row.response_status, mimetype="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+def _row(endpoint, key):
+    t = IdempotencyKey.__table__
+    row = db.session.execute(select(t).where(t.c.endpoint == endpoint, t.c.key == key)).first()
+    db.session.rollback()  # end the read so the next poll sees other workers' commits
+    return row
+
+
+def _acquire(endpoint, key, request_hash):
+    """True if this request now owns the key, else the existing row."""
+    t = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    while True:
+        inserted = db.session.execute(sqlite_insert(t).values(
+            endpoint=endpoint, key=key, request_hash=request_hash, status="inflight", locked_at=now,
+            created_at=now, expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL)).on_conflict_do_nothing())
+        db.session.commit()
+        if inserted.rowcount == 1:
+            return True
+        row = _row(endpoint, key)
+        if row is None:
+            continue  # purged between the insert and the read
+        if row.expires_at <= now:
+            db.session.execute(t.delete().where(t.c.id == row.id, t.c.expires_at == row.expires_at))
+            db.session.commit()
+            continue
+        if (row.status == "inflight" and row.request_hash == request_hash
+                and row.locked_at <= now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)):
+            # the owner died before committing anything; compare-and-set so only one retry takes over
+            took = db.session.execute(update(t).where(t.c.id == row.id, t.c.status == "inflight",
+                                                      t.c.locked_at == row.locked_at).values(locked_at=now))
+            db.session.commit()
+            if took.rowcount == 1:
+                return True
+            continue
+        return row
+
+
+def _wait(endpoint, key, deadline):
+    """The row once it is 'done', or the last row seen when the deadline passes."""
+    local = _inflight.get((endpoint, key))
+    delay = 0.02
+    while True:
+        row = _row(endpoint, key)
+        remaining = deadline - time.monotonic()
+        if row is None or row.status == "done" or remaining <= 0:
+            return row
+        if local is not None:
+            local.wait(min(remaining, 1.0))
+        else:
+            time.sleep(min(remaining, delay))
+            delay = min(delay * 2, 0.5)
+
+
+def _store(endpoint, key, resp):
+    t = IdempotencyKey.__table__
+    db.session.rollback()
+    if resp.status_code >= 500:
+        # nothing was committed: release the key so the retry runs again
+        n = db.session.execute(t.delete().where(t.c.endpoint == endpoint, t.c.key == key,
+                                                t.c.status == "inflight")).rowcount
+        _stats["released"] += n
+    db.session.execute(update(t).where(t.c.endpoint == endpoint, t.c.key == key).values(
+        status="done", response_status=resp.status_code, response_body=resp.get_data(as_text=True)))
+    db.session.commit()
+
+
+def _release(endpoint, key):
+    t = IdempotencyKey.__table__
+    db.session.rollback()
+    db.session.execute(t.delete().where(t.c.endpoint == endpoint, t.c.key == key, t.c.status == "inflight"))
+    db.session.commit()
+    _stats["released"] += 1
+
+
+def purge_expired(batch=1000):
+    """Delete expired keys in small transactions; returns the count."""
+    t = IdempotencyKey.__table__
+    done = 0
+    while True:
+        ids = select(t.c.id).where(t.c.expires_at <= datetime.utcnow()).limit(batch).scalar_subquery()
+        n = db.session.execute(t.delete().where(t.c.id.in_(ids))).rowcount
+        db.session.commit()
+        done += n
+        if n < batch:
+            _stats["purged"] += done
+            return done
+
+
+def _maybe_purge():
+    now = time.monotonic()
+    if now - _last_purge[0] >= IDEMPOTENCY_PURGE_SECONDS:
+        _last_purge[0] = now
+        try:
+            purge_expired()
+        except Exception as e:
+            db.session.rollback()
+            print("idempotency purge warning:", e)
+
+
+def idempotent(view):
+    """Honour an Idempotency-Key header on `view`; requests without one run as before."""
+    endpoint = view.__name__
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return view(*args, **kwargs)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return _error(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters", 400)
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        owned = _acquire(endpoint, key, request_hash)
+        if owned is not True:
+            row = owned
+            if row.request_hash != request_hash:
+                _stats["mismatch"] += 1
+                return _error("Idempotency-Key was already used with a different request body", 422)
+            if row.status != "done":
+                _stats["waited"] += 1
+                row = _wait(endpoint, key, time.monotonic() + IDEMPOTENCY_WAIT)
+            if row is not None and row.status == "done":
+                return _replay(row)
+            _stats["conflict"] += 1
+            return _error("a request with this Idempotency-Key is still in progress", 409,
+                          **{"Retry-After": str(max(1, int(IDEMPOTENCY_WAIT)))})
+
+        _stats["first"] += 1
+        done = threading.Event()
+        with _inflight_lock:
+            _inflight[(endpoint, key)] = done
+        g.idempotency_key = (endpoint, key)
+        try:
+            try:
+                resp = current_app.make_response(view(*args, **kwargs))
+            finally:
+                g.pop("idempotency_key", None)
+        except BaseException:
+            _release(endpoint, key)
+            raise
+        try:
+            _store(endpoint, key, resp)
+            return resp
+        finally:
+            with _inflight_lock:
+                _inflight.pop((endpoint, key), None)
+            done.set()
+            _maybe_purge()
+    return wrapper
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_committed(session):
+    # first commit inside an idempotent request: the claims and 'committed' land together
+    if not has_request_context():
+        return
+    pending = g.pop("idempotency_key", None)
+    if pending:
+        t = IdempotencyKey.__table__
+        session.execute(update(t).where(and_(t.c.endpoint == pending[0], t.c.key == pending[1],
+                                             t.c.status == "inflight")).values(status="committed"))
+
+
+def stats():
+    return dict(_stats, inflight=len(_inflight), ttl_seconds=IDEMPOTENCY_TTL, wait_seconds=IDEMPOTENCY_WAIT)
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from database import create_app
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"purged {purge_expired()} expired idempotency keys")
@@ -0,0 +1,248 @@
+# backend/identity_cache.py
+"""
+In-process cache of farmer and land identity rows.
+
+The farmer-facing endpoints resolve `registration_no` -> farmer and `land_id` -> land
+before doing any work. Those rows are read far more often than they change, so
+read-only snapshots are kept here in bounded LRU caches with a TTL:
+
+    farmers       registration_no -> FarmerSnapshot
+    lands         land id         -> LandSnapshot
+    farmer_lands  farmer id       -> tuple of land ids
+
+Any flush that inserts, updates or deletes a Farmer or Land drops the affected
+keys (again after commit, so a concurrent reader can't re-cache the old row),
+and a bulk Query.update()/delete() on either table clears that cache. Writes
+from other processes are only picked up after IDENTITY_CACHE_TTL; unverified
+farmers are never cached so OTP verification is visible everywhere at once.
+"""
+import os, threading, time
+from collections import OrderedDict, namedtuple
+from itertools import chain
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Farmer, Land
+
+IDENTITY_CACHE = os.environ.get("IDENTITY_CACHE", "true").lower() == "true"
+IDENTITY_CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", 50000))
+IDENTITY_CACHE_TTL = float(os.environ.get("IDENTITY_CACHE_TTL", 300))
+
+FarmerSnapshot = namedtuple("FarmerSnapshot", "id registration_no name wallet_address verified")
+LandSnapshot = namedtuple("LandSnapshot", "id farmer_id land_name crop_type geo_lat geo_lon")
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return value
+                del self._data[key]
+                self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return _MISSING
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def pop(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.counters["invalidations"] += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            out = dict(self.counters, size=len(self._data), maxsize=self.maxsize, ttl=self.ttl)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else None
+        return out
+
+
+farmers = TTLCache()
+lands = TTLCache()
+farmer_lands = TTLCache()
+
+
+def _farmer_snapshot(f):
+    return FarmerSnapshot(f.id, f.registration_no, f.name, f.wallet_address, bool(f.verified))
+
+
+def _land_snapshot(l):
+    return LandSnapshot(l.id, l.farmer_id, l.land_name, l.crop_type, l.geo_lat, l.geo_lon)
+
+
+def _cache_farmer(snap):
+    if snap.verified:
+        farmers.put(snap.registration_no, snap)
+
+
+def get_farmer(reg):
+    """FarmerSnapshot for `reg`, or None."""
+    if not reg:
+        return None
+    if IDENTITY_CACHE:
+        snap = farmers.get(reg)
+        if snap is not _MISSING:
+            return snap
+    row = Farmer.query.filter_by(registration_no=reg).first()
+    if row is None:
+        return None
+    snap = _farmer_snapshot(row)
+    if IDENTITY_CACHE:
+        _cache_farmer(snap)
+    return snap
+
+
+def get_farmers(regs):
+    """{registration_no: FarmerSnapshot}; one query for all the misses."""
+    out, missing = {}, []
+    for reg in set(regs):
+        snap = farmers.get(reg) if IDENTITY_CACHE else _MISSING
+        if snap is _MISSING:
+            missing.append(reg)
+        else:
+            out[reg] = snap
+    if missing:
+        for row in Farmer.query.filter(Farmer.registration_no.in_(missing)).all():
+            snap = out[row.registration_no] = _farmer_snapshot(row)
+            if IDENTITY_CACHE:
+                _cache_farmer(snap)
+    return out
+
+
+def get_lands(land_ids):
+    """{land_id: LandSnapshot}; one query for all the misses."""
+    out, missing = {}, []
+    for land_id in set(land_ids):
+        snap = lands.get(land_id) if IDENTITY_CACHE else _MISSING
+        if snap is _MISSING:
+            missing.append(land_id)
+        else:
+            out[land_id] = snap
+    if missing:
+        for row in Land.query.filter(Land.id.in_(missing)).all():
+            snap = out[row.id] = _land_snapshot(row)
+            if IDENTITY_CACHE:
+                lands.put(row.id, snap)
+    return out
+
+
+def get_land(land_id):
+    return get_lands([land_id]).get(land_id)
+
+
+def get_farmer_lands(farmer_id):
+    """LandSnapshots of one farmer, in id order."""
+    ids = farmer_lands.get(farmer_id) if IDENTITY_CACHE else _MISSING
+    if ids is _MISSING:
+        rows = Land.query.filter_by(farmer_id=farmer_id).order_by(Land.id).all()
+        if IDENTITY_CACHE:
+            farmer_lands.put(farmer_id, tuple(l.id for l in rows))
+            for l in rows:
+                lands.put(l.id, _land_snapshot(l))
+        return [_land_snapshot(l) for l in rows]
+    found = get_lands(ids)
+    return [found[i] for i in ids if i in found]
+
+
+def clear():
+    for cache in (farmers, lands, farmer_lands):
+        cache.clear()
+
+
+def stats():
+    return {"enabled": IDENTITY_CACHE, "farmers": farmers.stats(), "lands": lands.stats(),
+            "farmer_lands": farmer_lands.stats()}
+
+
+# -- invalidation ---------------------------------------------------------
+
+def _history_values(obj, attr):
+    hist = inspect(obj).attrs[attr].history
+    return [v for v in chain(hist.unchanged or (), hist.added or (), hist.deleted or ()) if v is not None]
+
+
+def _affected_keys(session):
+    # (cache name, key); key _MISSING when the attribute is expired on the instance
+    # and we can't tell which entry it was, which drops the whole cache
+    keys = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Farmer):
+            regs = _history_values(obj, "registration_no") or [_MISSING]
+            keys.update(("farmers", reg) for reg in regs)
+        elif isinstance(obj, Land):
+            state = inspect(obj)
+            land_id = state.identity[0] if state.identity else obj.__dict__.get("id")
+            keys.add(("lands", land_id if land_id is not None else _MISSING))
+            fids = _history_values(obj, "farmer_id") or [_MISSING]
+            keys.update(("farmer_lands", fid) for fid in fids)
+    return keys
+
+
+def _drop(keys):
+    caches = {"farmers": farmers, "lands": lands, "farmer_lands": farmer_lands}
+    for name, key in keys:
+        if key is _MISSING:
+            caches[name].clear()
+        else:
+            caches[name].pop(key)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    keys = _affected_keys(session)
+    if keys:
+        _drop(keys)
+        session.info.setdefault("identity_cache_keys", set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    keys = session.info.pop("identity_cache_keys", None)
+    if keys:
+        _drop(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("identity_cache_keys", None)
+
+
+def _after_bulk(context):
+    cls = context.mapper.class_ if context.mapper is not None else None
+    if cls is Farmer:
+        farmers.clear()
+    elif cls is Land:
+        lands.clear()
+        farmer_lands.clear()
+
+
+event.listen(Session, "after_bulk_update", _after_bulk)
+event.listen(Session, "after_bulk_delete", _after_bulk)
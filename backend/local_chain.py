@@ -0,0 +1,204 @@
+# backend/local_chain.py
+"""
+In-process eth-tester chain with FarmInsurancePool deployed, for exercising the
+chain code paths (outbox worker, benchmarks) without Sepolia.
+
+Needs `pip install "eth-tester[py-evm]"`; only ever imported by dev tooling.
+
+abi/FarmInsurancePool.json is a hardhat artifact of contracts/FarmInsurancePool.sol.
+Regenerate it (abi + bytecode) after changing the contract:
+
+    pip install py-solc-x && npm install @openzeppelin/contracts@4
+    python local_chain.py build
+"""
+import json, os, threading
+from web3 import Web3, EthereumTesterProvider
+from web3.providers.base import BaseProvider
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+POOL_ARTIFACT = os.path.join(BASE_DIR, "abi", "FarmInsurancePool.json")
+TOKEN_ARTIFACT = os.path.join(BASE_DIR, "abi", "TestStableToken.json")
+CONTRACT = os.path.abspath(os.path.join(BASE_DIR, "..", "contracts", "FarmInsurancePool.sol"))
+OZ_NODE_MODULES = os.environ.get("OZ_NODE_MODULES", os.path.abspath(os.path.join(BASE_DIR, "..", "node_modules")))
+SOLC_VERSION = "0.8.19"
+BATCH_SIGNATURE = "submitOracleDataBatch(uint256[],uint8[],uint256[])"
+
+
+def load_artifact(path):
+    with open(path, "r", encoding="utf-8") as f:
+        j = json.load(f)
+    return j["abi"], j["bytecode"]
+
+
+def has_function(bytecode, signature):
+    """True if the dispatcher in `bytecode` (hex) knows the function's selector."""
+    selector = Web3.keccak(text=signature)[:4].hex().replace("0x", "")
+    return selector in (bytecode.hex() if isinstance(bytecode, bytes) else bytecode)
+
+
+def compile_pool(solc_version=SOLC_VERSION, node_modules=OZ_NODE_MODULES, runtime=False):
+    """(abi, bytecode[, deployed bytecode]) of FarmInsurancePool from source, with the hardhat settings (optimizer, 200 runs)."""
+    import solcx
+    if solc_version not in [str(v) for v in solcx.get_installed_solc_versions()]:
+        solcx.install_solc(solc_version)
+    out = solcx.compile_files(
+        [CONTRACT],
+        output_values=["abi", "bin", "bin-runtime"],
+        solc_version=solc_version,
+        import_remappings={"@openzeppelin/": os.path.join(node_modules, "@openzeppelin", "")},
+        allow_paths=[os.path.dirname(CONTRACT), node_modules],
+        optimize=True,
+        optimize_runs=200,
+    )
+    compiled = next(v for k, v in out.items() if k.endswith(":FarmInsurancePool"))
+    if runtime:
+        return compiled["abi"], "0x" + compiled["bin"], "0x" + compiled["bin-runtime"]
+    return compiled["abi"], "0x" + compiled["bin"]
+
+
+def build_artifact(path=POOL_ARTIFACT, solc_version=SOLC_VERSION):
+    """Rewrite the hardhat artifact's abi and bytecode from contracts/FarmInsurancePool.sol."""
+    abi, bytecode, deployed = compile_pool(solc_version, runtime=True)
+    with open(path, "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    artifact.update(abi=abi, bytecode=bytecode, deployedBytecode=deployed)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+    return artifact
+
+
+def _pool_artifact(artifact):
+    # the committed artifact predates the batch entry point: deploy a fresh compile when solc is available
+    if not isinstance(artifact, str) or has_function(load_artifact(artifact)[1], BATCH_SIGNATURE):
+        return artifact
+    try:
+        return compile_pool()
+    except Exception as e:
+        print(f"local_chain: {os.path.basename(artifact)} predates {BATCH_SIGNATURE} and the contract "
+              f"could not be compiled ({e}); batch submission is disabled. Run `python local_chain.py build`.")
+        return artifact
+
+
+def _deploy(w3, artifact, *args, sender):
+    # artifact: path to a hardhat artifact, or an (abi, bytecode) pair from a fresh compile
+    abi, bytecode = load_artifact(artifact) if isinstance(artifact, str) else artifact
+    tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact({"from": sender})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+
+class SerializedProvider(BaseProvider):
+    """Wraps the tester provider so every request (middlewares included) runs under one lock.
+
+    Hand this to web3_client.use_provider() when several threads share the chain.
+    """
+    def __init__(self, inner, lock):
+        super().__init__()
+        self.inner = inner
+        self.lock = lock
+
+    def request_func(self, w3, outer_middlewares):
+        func = self.inner.request_func(w3, outer_middlewares)
+        def locked(method, params):
+            with self.lock:
+                return func(method, params)
+        return locked
+
+    def make_request(self, method, params):
+        with self.lock:
+            return self.inner.make_request(method, params)
+
+    def is_connected(self, show_traceback=False):
+        return self.inner.is_connected(show_traceback)
+
+
+class LocalChain:
+    """eth-tester chain with the stable token and insurance pool deployed and funded.
+
+    `accounts[0]` owns both contracts and is an authorized oracle.
+    """
+    def __init__(self, pool_artifact=POOL_ARTIFACT, token_artifact=TOKEN_ARTIFACT, fund=10**24):
+        self.w3 = Web3(EthereumTesterProvider())
+        self.lock = threading.RLock()  # py-evm is not thread-safe; serialize the worker threads
+        self.owner = self.w3.eth.accounts[0]
+        self.farmer = self.w3.eth.accounts[1]
+        self.token = _deploy(self.w3, token_artifact, sender=self.owner)
+        self.pool = _deploy(self.w3, _pool_artifact(pool_artifact), self.token.address, sender=self.owner)
+        self.has_batch = has_function(self.w3.eth.get_code(self.pool.address), BATCH_SIGNATURE)
+        self._wait(self.token.functions.mint(self.owner, fund * 2).transact({"from": self.owner}))
+        self._wait(self.token.functions.approve(self.pool.address, fund * 2).transact({"from": self.owner}))
+        self._wait(self.pool.functions.fundPool(fund).transact({"from": self.owner}))
+
+    def provider(self):
+        """Thread-safe provider onto this chain, for web3_client.use_provider()."""
+        return SerializedProvider(self.w3.provider, self.lock)
+
+    def _wait(self, tx_hash):
+        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    def create_policies(self, n, insured_amount=10**21, premium=10**18):
+        """Create `n` policies for the farmer account; policy ids are 1..policyCount."""
+        for _ in range(n):
+            # fixed gas skips a second EVM run for estimation
+            self._wait(self.pool.functions.createPolicy(self.farmer, insured_amount, "0,0", 0, premium).transact({"from": self.owner, "gas": 500_000}))
+        return self.pool.functions.policyCount().call()
+
+    def submit_claim_to_chain(self, policy_id, stress_level, payout_percentage_scaled, wait_for_receipt=True,
+                              on_signed=None):
+        """Drop-in for web3_client.submit_claim_to_chain against this chain.
+
+        transact() signs and mines in one step under the lock, so there is no signed-but-unsent
+        tx to hand to `on_signed`; use web3_client.use_provider(provider()) to exercise that path.
+        """
+        with self.lock:
+            try:
+                tx_hash = self.pool.functions.submitOracleData(int(policy_id), int(stress_level), int(payout_percentage_scaled)).transact({"from": self.owner})
+            except Exception as e:
+                return {"error": str(e)}
+            result = {"tx_hash": self.w3.to_hex(tx_hash)}
+            if wait_for_receipt:
+                receipt = self._wait(tx_hash)
+                result["status"] = receipt.status
+                result["gas_used"] = receipt.gasUsed
+        return result
+
+    def submit_claims_batch_to_chain(self, items, wait_for_receipt=True, on_signed=None):
+        """Drop-in for web3_client.submit_claims_batch_to_chain (needs a pool built with the batch entry point)."""
+        ids = [int(p) for p, _, _ in items]
+        levels = [int(l) for _, l, _ in items]
+        pcts = [int(s) for _, _, s in items]
+        if not self.has_batch:
+            return {"error": f"deployed pool has no {BATCH_SIGNATURE}; run `python local_chain.py build`"}
+        with self.lock:
+            try:
+                tx_hash = self.pool.functions.submitOracleDataBatch(ids, levels, pcts).transact({"from": self.owner})
+            except Exception as e:
+                return {"error": str(e)}
+            result = {"tx_hash": self.w3.to_hex(tx_hash)}
+            if wait_for_receipt:
+                receipt = self._wait(tx_hash)
+                result["status"] = receipt.status
+                result["gas_used"] = receipt.gasUsed
+        return result
+
+    def get_tx_status(self, tx_hash):
+        try:
+            with self.lock:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            return {"tx_hash": tx_hash, "status": receipt.status, "receipt": json.loads(Web3.to_json(receipt))}
+        except Exception as e:
+            return {"error": str(e)}
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=["build"])
+    ap.add_argument("--solc", default=SOLC_VERSION)
+    args = ap.parse_args()
+    artifact = build_artifact(solc_version=args.solc)
+    print(f"wrote {POOL_ARTIFACT}: {len(artifact['abi'])} abi entries, "
+          f"batch entry point {'present' if has_function(artifact['deployedBytecode'], BATCH_SIGNATURE) else 'MISSING'}")
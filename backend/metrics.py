@@ -0,0 +1,184 @@
+# backend/metrics.py
+"""
+In-process latency histograms for the claim hot path, exposed at GET /metrics
+in the Prometheus text format.
+
+    with timed("build_model_inputs"): ...        # or
+    @timed("predict_stress")
+    def predict_stress_batch(...): ...
+
+Each observation is a perf_counter() pair, a bisect into fixed buckets and three
+integer increments under a per-series lock. Series are per process; with several
+server workers, scrape each one or aggregate in Prometheus.
+
+Set METRICS_SAMPLE_RATE (0..1) to also print the per-stage breakdown of that
+fraction of requests as one JSON line each.
+"""
+import bisect, contextvars, json, os, random, threading, time
+from functools import wraps
+
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", 0))
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = {
+    "stage_duration_seconds": "Time spent in one stage of request or worker processing.",
+    "http_request_duration_seconds": "Time from request start to response, by endpoint.",
+}
+
+# stages of the current (sampled) request, or None when it isn't sampled
+_breakdown = contextvars.ContextVar("metrics_breakdown", default=None)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+
+_series = {}
+_series_lock = threading.Lock()
+
+
+def histogram(name, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    h = _series.get(key)
+    if h is None:
+        with _series_lock:
+            h = _series.setdefault(key, Histogram())
+    return h
+
+
+def observe_stage(stage, seconds):
+    histogram("stage_duration_seconds", stage=stage).observe(seconds)
+    stages = _breakdown.get()
+    if stages is not None:
+        stages.append((stage, round(seconds * 1000, 3)))
+
+
+class timed:
+    """Context manager / decorator recording elapsed time under `stage`."""
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe_stage(self.stage, time.perf_counter() - self.t0)
+        return False
+
+    def __call__(self, fn):
+        stage = self.stage
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe_stage(stage, time.perf_counter() - t0)
+        return wrapper
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+
+def render():
+    """All series in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    by_name = {}
+    for (name, labels), h in list(_series.items()):
+        by_name.setdefault(name, []).append((labels, h))
+    for name in sorted(by_name):
+        lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, h in sorted(by_name[name], key=lambda x: x[0]):
+            counts, total, n = h.snapshot()
+            cumulative = 0
+            for bound, c in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_label_str(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_label_str(labels)} {total}")
+            lines.append(f"{name}_count{_label_str(labels)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def instrument_commits():
+    """Time every Session.commit() (flush included) as stage db_commit, app and worker threads alike."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    @event.listens_for(Session, "before_commit")
+    def _commit_start(session):
+        session.info["metrics_commit_t0"] = time.perf_counter()
+
+    @event.listens_for(Session, "after_commit")
+    def _commit_done(session):
+        t0 = session.info.pop("metrics_commit_t0", None)
+        if t0 is not None:
+            observe_stage("db_commit", time.perf_counter() - t0)
+
+    @event.listens_for(Session, "after_rollback")
+    def _commit_failed(session):
+        session.info.pop("metrics_commit_t0", None)
+
+
+def init_app(app, sample_rate=METRICS_SAMPLE_RATE):
+    """Time every request, optionally log sampled stage breakdowns, and serve GET /metrics."""
+    from flask import Response, g, request
+    instrument_commits()
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+        g._metrics_token = _breakdown.set([] if sample_rate and random.random() < sample_rate else None)
+
+    @app.after_request
+    def _metrics_finish(response):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is None:
+            return response
+        elapsed = time.perf_counter() - t0
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        histogram("http_request_duration_seconds", endpoint=endpoint, method=request.method,
+                  status=response.status_code).observe(elapsed)
+        stages = _breakdown.get()
+        if stages is not None:
+            print(json.dumps({"metrics": "request", "method": request.method, "path": request.path,
+                              "status": response.status_code, "ms": round(elapsed * 1000, 3), "stages": stages}))
+        token = g.pop("_metrics_token", None)
+        if token is not None:
+            try:
+                _breakdown.reset(token)
+            except ValueError:
+                pass
+        return response
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    return app
@@ -62,6 +62,24 @@ def migrate():
             except Exception as ex:
                 print(f"Failed to add column {name}: {ex}")
 
+        # Columns added to tables that db.create_all() created in earlier revisions
+        later_columns = {
+            "chain_outbox": [("lease", "VARCHAR(32)"), ("tx_hash", "VARCHAR(80)"), ("tx_nonce", "INTEGER"),
+                             ("raw_tx", "TEXT")],
+            "claims": [("model_version", "VARCHAR(64)"), ("onchain_block", "INTEGER")],
+            "lands": [("geohash", "VARCHAR(12)")],  # then `python geo.py` to fill it
+        }
+        for table, columns in later_columns.items():
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (table,))
+            if not cur.fetchone():
+                continue  # db.create_all() will create it with every column
+            for name, definition in columns:
+                try:
+                    if add_column_if_missing(cur, table, name, definition):
+                        added.append(f"{table}.{name}")
+                except Exception as ex:
+                    print(f"Failed to add column {table}.{name}: {ex}")
+
         conn.commit()
 
         # If registration_no empty for existing rows, fill with generated values
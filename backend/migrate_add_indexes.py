@@ -0,0 +1,60 @@
+# backend/migrate_add_indexes.py
+"""
+One-off migration helper for SQLite used by the Flask backend.
+Creates the lookup indexes declared in models.py on databases that db.create_all()
+built before they existed (create_all never alters existing tables), then runs
+ANALYZE so the query planner picks them up.
+Run this from the backend/ folder using your Python interpreter.
+"""
+
+import os, sqlite3, sys
+
+try:
+    from app import app
+    from database import db
+except Exception as e:
+    print("Error importing app/db. Make sure to run from backend/ folder.")
+    print("Exception:", e)
+    sys.exit(1)
+
+# names match what SQLAlchemy generates for index=True, so create_all() and this script agree
+INDEXES = [
+    ("ix_lands_farmer_id", "lands", "farmer_id"),
+    ("ix_lands_geohash", "lands", "geohash"),
+    ("ix_claims_farmer_id", "claims", "farmer_id"),
+    ("ix_claims_land_id", "claims", "land_id"),
+    ("ix_claims_status", "claims", "status"),
+    ("ix_claims_farmer_created", "claims", "farmer_id, created_at, id"),
+]
+
+
+def migrate():
+    with app.app_context():
+        db_file = db.engine.url.database
+        print("Detected sqlite DB file:", db_file)
+        if not db_file or not os.path.exists(db_file):
+            print("Database file not found:", db_file)
+            sys.exit(1)
+
+        conn = sqlite3.connect(db_file)
+        cur = conn.cursor()
+        created = []
+        for name, table, columns in INDEXES:
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (table,))
+            if not cur.fetchone():
+                continue  # db.create_all() will create the table with its indexes
+            cur.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?;", (name,))
+            if cur.fetchone():
+                print(f"Index `{name}` already exists, skipping.")
+                continue
+            print(f"Creating index `{name}` on {table}({columns})")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});")
+            created.append(name)
+        cur.execute("ANALYZE;")
+        conn.commit()
+        conn.close()
+        print("Migration complete. Created indexes:", created)
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,53 +1,540 @@
 # backend/ml.py
-import os, json
+import os, json, hashlib, random, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
+from metrics import timed
+from model_registry import MODEL_REGISTRY_DIR, read_manifest, bundle_dir
+
 MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models") if os.path.exists(os.path.join(os.path.dirname(__file__), "..", "models")) else os.path.join(os.path.dirname(__file__), "models")
 STRESS_FEATURES = ['NDVI','SAVI','Chlorophyll_Content','Leaf_Area_Index','Temperature','Humidity','Rainfall','Soil_Moisture']
 PAYOUT_FEATURES = ['NDVI','Expected_Yield','Crop_Stress_Indicator','Temperature','Rainfall','Soil_Moisture','Crop_Type_encoded','Canopy_Coverage','Pest_Damage','Leaf_Area_Index']
 
-clf = None
-scaler = None
-reg = None
-
-try:
-    import joblib
-    scaler_path = os.path.join(MODELS_DIR, "model1_ffn_scaler.joblib")
-    reg_path = os.path.join(MODELS_DIR, "model2_rf.joblib")
-    clf_joblib = os.path.join(MODELS_DIR, "model1_clf.joblib")
-    if os.path.exists(scaler_path):
-        scaler = joblib.load(scaler_path)
-    if os.path.exists(reg_path):
-        reg = joblib.load(reg_path)
-    if os.path.exists(clf_joblib):
-        clf = joblib.load(clf_joblib)
-except Exception as e:
-    print("ML load warning:", e)
-
-def predict_stress(feature_dict):
+class FFNEngine:
+    """Torch-free forward pass for the Model 1 FFN exported by model_training/export_model1.py.
+
+    The scaler is folded into the first layer, so raw STRESS_FEATURES go straight in.
+    """
+    def __init__(self, weights, biases, features=None):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.features = list(features) if features is not None else list(STRESS_FEATURES)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            n = int(z["n_layers"])
+            features = [str(f) for f in z["features"]] if "features" in z else None
+            return cls([z[f"w{i}"] for i in range(n)], [z[f"b{i}"] for i in range(n)], features)
+
+    def predict_proba(self, X):
+        """P(stressed) for each row of X, shape (n_rows,)."""
+        h = np.asarray(X, dtype=np.float32)
+        if h.ndim == 1:
+            h = h.reshape(1, -1)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w
+            h += b
+            if i < last:
+                np.maximum(h, 0.0, out=h)
+        z = np.clip(h[:, 0], -60.0, 60.0)
+        return 1.0 / (1.0 + np.exp(-z))
+
+class FlatForest:
+    """RandomForestRegressor flattened into contiguous node arrays (see model_training/compile_model2.py).
+
+    All trees live in one set of arrays; leaves point at themselves with an +inf threshold,
+    so every tree can be walked in lock-step for exactly `max_depth` steps.
+    """
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, features=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.features = list(features) if features is not None else list(PAYOUT_FEATURES)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        # mmap'd .npy files are shared page-cache across workers
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # np.asarray drops the memmap subclass (cheaper indexing) but keeps the shared mapping
+        arrays = {k: np.asarray(np.load(os.path.join(path, f"{k}.npy"), mmap_mode=mmap_mode)) for k in cls.ARRAYS}
+        return cls(max_depth=meta["max_depth"], features=meta.get("features"), **arrays)
+
+    def predict(self, X):
+        # sklearn compares float32 inputs against float64 thresholds; do the same for parity
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_cols = X.shape
+        n_trees = len(self.roots)
+        # one cursor per (row, tree), flattened so every step is a handful of 1-D takes
+        idx = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(0, n_rows * n_cols, n_cols), n_trees)
+        flat = X.ravel()
+        for _ in range(self.max_depth):
+            x = flat.take(row_base + self.feature.take(idx))
+            idx = np.where(x <= self.threshold.take(idx), self.left.take(idx), self.right.take(idx))
+        return self.value.take(idx).reshape(n_rows, n_trees).mean(axis=1)
+
+MODEL_VERSION = None
+
+# prediction cache: rows are rounded to PREDICTION_CACHE_DECIMALS before scoring, so
+# re-submitted readings (retries, duplicate uploads, plots on one satellite tile) hit
+PREDICTION_CACHE = os.environ.get("PREDICTION_CACHE", "true").lower() == "true"
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 100000))
+PREDICTION_CACHE_DECIMALS = int(os.environ.get("PREDICTION_CACHE_DECIMALS", 4))
+MODEL_CHECK_SECONDS = float(os.environ.get("MODEL_CHECK_SECONDS", 10))
+# fraction of batches also scored by the registry's shadow bundle (when one is set)
+MODEL_SHADOW_SAMPLE_RATE = float(os.environ.get("MODEL_SHADOW_SAMPLE_RATE", 1.0))
+MODEL_SHADOW_MAX_BACKLOG = int(os.environ.get("MODEL_SHADOW_MAX_BACKLOG", 8))  # in flight per process; more are dropped
+
+def _model_paths(m1=None, m2=None):
+    # MODEL1_DIR / MODEL2_DIR: serve a run directory written by model_training/engine.py
+    m1 = m1 or os.environ.get("MODEL1_DIR") or MODELS_DIR
+    m2 = m2 or os.environ.get("MODEL2_DIR") or MODELS_DIR
+    forest_dir = os.path.join(m2, "model2_forest")
+    return {
+        "ffn": os.path.join(m1, "model1_ffn.npz"),
+        "scaler": os.path.join(m1, "model1_ffn_scaler.joblib"),
+        "clf": os.path.join(m1, "model1_clf.joblib"),
+        "forest": os.path.join(forest_dir, "meta.json"),
+        "forest_dir": forest_dir,
+        "reg": os.path.join(m2, "model2_rf.joblib"),
+    }
+
+def _model_signature():
+    # (size, mtime) of every artifact ml could load; changes when any file is replaced
+    paths = _model_paths()
+    files = [paths[k] for k in ("ffn", "scaler", "clf", "forest", "reg")]
+    if os.path.isdir(paths["forest_dir"]):
+        files += [os.path.join(paths["forest_dir"], f"{k}.npy") for k in FlatForest.ARRAYS]
+    sig = []
+    for f in files:
+        try:
+            st = os.stat(f)
+            sig.append((f, st.st_size, st.st_mtime_ns))
+        except OSError:
+            sig.append((f, None, None))
+    return tuple(sig)
+
+def _check_bundle_files(path, version):
+    # a registry bundle must hold every artifact its bundle.json lists
+    try:
+        with open(os.path.join(path, "bundle.json"), "r", encoding="utf-8") as f:
+            files = json.load(f)["files"]
+    except (OSError, ValueError, KeyError) as e:
+        raise RuntimeError(f"bundle {version}: unreadable bundle.json in {path}: {e}") from e
+    missing = [name for name in files if not os.path.exists(os.path.join(path, name))]
+    if missing:
+        raise RuntimeError(f"bundle {version}: missing {', '.join(missing)}")
+
+class ModelBundle:
+    """One loaded set of model artifacts under a version name.
+
+    Never mutated after loading: a request that picked up a bundle keeps scoring on
+    it while a newer one is swapped in, and the old one is freed once unreferenced.
+    """
+    def __init__(self, version, source="files", ffn=None, scaler=None, clf=None, forest=None, reg=None):
+        self.version = version
+        self.source = source
+        self.ffn, self.scaler, self.clf, self.forest, self.reg = ffn, scaler, clf, forest, reg
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, version, m1=None, m2=None, source="files", strict=False):
+        loaded = {}
+        try:
+            import joblib
+            paths = _model_paths(m1, m2)
+            if strict and source == "registry":
+                _check_bundle_files(m1, version)
+            if os.path.exists(paths["ffn"]):
+                loaded["ffn"] = FFNEngine.load(paths["ffn"])
+            if os.path.exists(paths["scaler"]):
+                loaded["scaler"] = joblib.load(paths["scaler"])
+            if os.path.exists(paths["forest"]):
+                loaded["forest"] = FlatForest.load(paths["forest_dir"])
+            elif os.path.exists(paths["reg"]):
+                loaded["reg"] = joblib.load(paths["reg"])
+                loaded["reg"].n_jobs = 1  # per-request rows are tiny; joblib thread dispatch costs more than the trees
+            if os.path.exists(paths["clf"]):
+                loaded["clf"] = joblib.load(paths["clf"])
+        except Exception as e:
+            if strict:
+                raise
+            print("ML load warning:", e)
+        return cls(version, source, **loaded)
+
+    @property
+    def has_stress(self):
+        return self.ffn is not None or self.clf is not None
+
+    @property
+    def has_payout(self):
+        return self.forest is not None or self.reg is not None
+
+    def score_stress(self, arr):
+        if self.ffn is not None:
+            return self.ffn.predict_proba(arr)
+        if self.scaler is not None:
+            arr = self.scaler.transform(arr)
+        return self.clf.predict_proba(arr)[:,1]
+
+    def score_payout(self, arr):
+        return self.forest.predict(arr) if self.forest is not None else self.reg.predict(arr)
+
+    def warm_up(self):
+        # first calls pay for lazy imports, allocator growth and page faults on the mmap'd trees
+        for n in (1, 64):
+            if self.has_stress:
+                self.score_stress(np.zeros((n, len(STRESS_FEATURES))))
+            if self.has_payout:
+                self.score_payout(np.zeros((n, len(PAYOUT_FEATURES))))
+        return self
+
+    def describe(self):
+        stress = "ffn" if self.ffn is not None else "sklearn" if self.clf is not None else "heuristic"
+        payout = "forest" if self.forest is not None else "sklearn" if self.reg is not None else "heuristic"
+        return {"version": self.version, "source": self.source, "stress": stress, "payout": payout,
+                "loaded_at": self.loaded_at}
+
+_active = None   # production bundle; replaced by reference, never modified
+_shadow = None   # candidate scored alongside production, or None
+_loaded_key = [None]
+_failed_key = [None]
+_reloading = threading.Event()
+
+def _source():
+    """(key, production spec, shadow spec) for what should be served now; spec = (version, m1_dir, m2_dir, source)."""
+    manifest = read_manifest()
+    if manifest and manifest.get("production"):
+        spec = lambda v: (v, bundle_dir(v), bundle_dir(v), "registry") if v else None
+        return ("registry", manifest["production"], manifest.get("shadow")), \
+            spec(manifest["production"]), spec(manifest.get("shadow"))
+    sig = _model_signature()
+    return ("files", sig), (hashlib.sha1(repr(sig).encode()).hexdigest()[:12], None, None, "files"), None
+
+def _load(spec, strict):
+    version, m1, m2, source = spec
+    for b in (_active, _shadow):  # promoting the shadow bundle (or changing only the shadow) reuses what's loaded
+        if b is not None and b.version == version and b.source == source:
+            return b
+    return ModelBundle.load(version, m1, m2, source, strict).warm_up()
+
+def _swap(key, prod, shadow):
+    global _active, _shadow, MODEL_VERSION
+    changed = _active is None or prod.version != _active.version
+    _active, _shadow = prod, shadow
+    MODEL_VERSION = prod.version
+    _loaded_key[0] = key
+    if changed:
+        stress_cache.clear()
+        payout_cache.clear()
+
+def load_models():
+    """Load the production (and shadow) bundle in the calling thread and swap it in."""
+    key, prod, shadow = _source()
+    _swap(key, _load(prod, strict=False), _load(shadow, strict=False) if shadow else None)
+    return MODEL_VERSION
+
+def _require_models(bundle, current):
+    # never swap to a bundle that would fall back to the heuristics where the current one had a model
+    lost = [name for name, had, has in (("stress", current and current.has_stress, bundle.has_stress),
+                                         ("payout", current and current.has_payout, bundle.has_payout)) if had and not has]
+    if lost or not (bundle.has_stress or bundle.has_payout):
+        raise RuntimeError(f"bundle {bundle.version} has no {' / '.join(lost) or 'stress or payout'} model")
+    return bundle
+
+def _reload(key, prod_spec, shadow_spec):
     try:
-        arr = np.array([feature_dict.get(k, 0.0) for k in STRESS_FEATURES], dtype=float).reshape(1,-1)
-        if scaler is not None:
-            arr = scaler.transform(arr)
-        if clf is not None:
-            proba = clf.predict_proba(arr)[0,1]
-            return (1 if proba>=0.5 else 0, float(proba))
-        ndvi = feature_dict.get('NDVI', 0.5)
-        stress_indicator = feature_dict.get('Crop_Stress_Indicator', 0)
-        prob = max(0.0, min(1.0, 1.0 - ndvi*0.8 + (stress_indicator/200.0)))
-        return (1 if prob>=0.5 else 0, float(prob))
+        prod = _require_models(_load(prod_spec, strict=True), _active)
+        shadow = _require_models(_load(shadow_spec, strict=True), None) if shadow_spec else None
+        _swap(key, prod, shadow)
+        print(json.dumps({"ml": "swap", "production": prod.version, "shadow": shadow.version if shadow else None}))
     except Exception as e:
-        return (0, 0.0)
+        _failed_key[0] = key  # not retried until the manifest / files change again
+        print(f"ML reload failed, still serving {MODEL_VERSION}:", e)
+    finally:
+        _reloading.clear()
+
+def current_model():
+    """The production bundle; hold on to it for the whole request so every prediction uses one version."""
+    return _active
 
-def predict_payout(feature_dict):
+class PredictionCache:
+    """Bounded LRU of model outputs keyed on (model version, quantized feature row)."""
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_many(self, keys):
+        """Cached value or None per key."""
+        out = []
+        with self._lock:
+            for k in keys:
+                v = self._data.get(k)
+                if v is None:
+                    self.misses += 1
+                else:
+                    self._data.move_to_end(k)
+                    self.hits += 1
+                out.append(v)
+        return out
+
+    def put_many(self, items):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            for k, v in items:
+                self._data[k] = v
+                self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._data),
+                "maxsize": self.maxsize, "hit_rate": round(self.hits / lookups, 4) if lookups else None}
+
+stress_cache = PredictionCache()
+payout_cache = PredictionCache()
+_last_check = [0.0]
+_reload_lock = threading.Lock()
+
+def check_models(wait=False):
+    """Start a background reload if the registry manifest or a model file changed.
+
+    Polls at most every MODEL_CHECK_SECONDS. The new bundle is loaded and warmed up
+    off the request path; requests keep scoring on the current one until the swap.
+    """
+    now = time.monotonic()
+    if now - _last_check[0] < MODEL_CHECK_SECONDS:
+        return False
+    with _reload_lock:
+        if now - _last_check[0] < MODEL_CHECK_SECONDS or _reloading.is_set():
+            return False
+        _last_check[0] = now
+        try:
+            key, prod, shadow = _source()
+        except Exception as e:
+            print("ML check warning:", e)
+            return False
+        if key in (_loaded_key[0], _failed_key[0]):
+            return False
+        _reloading.set()
+    t = threading.Thread(target=_reload, args=(key, prod, shadow), name="ml-reload", daemon=True)
+    t.start()
+    if wait:
+        t.join()
+    return True
+
+def start_watcher(interval=MODEL_CHECK_SECONDS):
+    """Poll for new models on a daemon thread, so idle workers swap before their next request."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            check_models()
+    if interval > 0:
+        threading.Thread(target=loop, name="ml-watcher", daemon=True).start()
+
+class ShadowStats:
+    """How far the shadow bundle's outputs are from production's, per model."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.versions = (None, None)
+        self.data = self._empty()
+
+    @staticmethod
+    def _empty():
+        return {m: {"batches": 0, "rows": 0, "flips": 0, "abs_diff_sum": 0.0, "max_abs_diff": 0.0, "errors": 0,
+                    "dropped": 0} for m in ("stress", "payout")}
+
+    def record(self, model, versions, diff=None, flips=0, error=False, dropped=False):
+        with self._lock:
+            if versions != self.versions:  # new pair: start over
+                self.versions = versions
+                self.data = self._empty()
+            d = self.data[model]
+            if error or dropped:
+                d["errors" if error else "dropped"] += 1
+                return
+            d["batches"] += 1
+            d["rows"] += len(diff)
+            d["flips"] += flips
+            d["abs_diff_sum"] += float(diff.sum())
+            d["max_abs_diff"] = max(d["max_abs_diff"], float(diff.max()))
+
+    def stats(self):
+        with self._lock:
+            out = {"production": self.versions[0], "shadow": self.versions[1]}
+            for m, d in self.data.items():
+                out[m] = dict(d, mean_abs_diff=round(d["abs_diff_sum"] / d["rows"], 6) if d["rows"] else None)
+                out[m].pop("abs_diff_sum")
+            return out
+
+shadow_stats = ShadowStats()
+_shadow_pool = [None, None]  # (executor, pid)
+_shadow_backlog = [0]  # batches submitted to the pool and not finished yet
+_shadow_lock = threading.Lock()
+
+def _shadow_compare(model, prod_version, shadow, arr, served):
+    versions = (prod_version, shadow.version)
     try:
-        arr = np.array([feature_dict.get(k, 0.0) for k in PAYOUT_FEATURES], dtype=float).reshape(1,-1)
-        if reg is not None:
-            out = reg.predict(arr)[0]
-            return float(np.clip(out, 0.0, 100.0))
-        stress = feature_dict.get('Crop_Stress_Indicator', 0)
-        ndvi = feature_dict.get('NDVI', 0.5)
-        base = max(0.0, (stress/100.0)*80.0 + (1.0-ndvi)*20.0)
-        return float(np.clip(base, 0.0, 100.0))
+        if model == "stress":
+            cand = shadow.score_stress(arr)
+            flips = int(((cand >= 0.5) != (served >= 0.5)).sum())
+        else:
+            cand, served = np.clip(shadow.score_payout(arr), 0.0, 100.0), np.clip(served, 0.0, 100.0)
+            flips = 0
     except Exception as e:
-        return 0.0
+        shadow_stats.record(model, versions, error=True)
+        print("ML shadow error:", e)
+        return
+    diff = np.abs(np.asarray(cand, dtype=float) - served)
+    shadow_stats.record(model, versions, diff, flips)
+    print(json.dumps({"ml": "shadow", "model": model, "production": prod_version, "shadow": shadow.version,
+                      "rows": len(diff), "flips": flips, "mean_abs_diff": round(float(diff.mean()), 6),
+                      "max_abs_diff": round(float(diff.max()), 6)}))
+
+def _maybe_shadow(model, bundle, arr, served):
+    # scored on a background thread: shadow mode must not add request latency
+    shadow = _shadow
+    if shadow is None or shadow is bundle or MODEL_SHADOW_SAMPLE_RATE <= 0:
+        return
+    if not (shadow.has_stress if model == "stress" else shadow.has_payout):
+        return
+    if MODEL_SHADOW_SAMPLE_RATE < 1 and random.random() >= MODEL_SHADOW_SAMPLE_RATE:
+        return
+    with _shadow_lock:
+        if _shadow_pool[1] != os.getpid():
+            _shadow_pool[:] = [ThreadPoolExecutor(max_workers=1, thread_name_prefix="ml-shadow"), os.getpid()]
+            _shadow_backlog[0] = 0
+        if _shadow_backlog[0] >= MODEL_SHADOW_MAX_BACKLOG:
+            # the shadow can't keep up: skip the batch rather than queue work (and memory) without bound
+            shadow_stats.record(model, (bundle.version, shadow.version), dropped=True)
+            return
+        _shadow_backlog[0] += 1
+    fut = _shadow_pool[0].submit(_shadow_compare, model, bundle.version, shadow, arr, np.asarray(served, dtype=float))
+    fut.add_done_callback(_shadow_done)
+
+def _shadow_done(fut):
+    with _shadow_lock:
+        _shadow_backlog[0] -= 1
+
+def model_status():
+    return {"production": _active.describe() if _active else None,
+            "shadow": _shadow.describe() if _shadow else None,
+            "registry": MODEL_REGISTRY_DIR if read_manifest() else None,
+            "reloading": _reloading.is_set(), "check_seconds": MODEL_CHECK_SECONDS,
+            "shadow_sample_rate": MODEL_SHADOW_SAMPLE_RATE, "shadow_max_backlog": MODEL_SHADOW_MAX_BACKLOG,
+            "shadow_backlog": _shadow_backlog[0], "shadow_stats": shadow_stats.stats()}
+
+def prediction_cache_stats():
+    return {"enabled": PREDICTION_CACHE, "model_version": MODEL_VERSION, "decimals": PREDICTION_CACHE_DECIMALS,
+            "stress": stress_cache.stats(), "payout": payout_cache.stats()}
+
+load_models()
+_last_check[0] = time.monotonic()
+
+def invalid_features(feature_dict, features):
+    """Return the keys in `features` whose values cannot be read as floats."""
+    bad = []
+    for k in features:
+        if k in feature_dict:
+            try:
+                float(feature_dict[k])
+            except (TypeError, ValueError):
+                bad.append(k)
+    return bad
+
+def _feature_matrix(feature_dicts, features):
+    # one row per claim, column order fixed by the feature list
+    return np.array([[fd.get(k, 0.0) for k in features] for fd in feature_dicts], dtype=float).reshape(len(feature_dicts), len(features))
+
+def _quantized(arr):
+    """The matrix the models actually score: rounded to the cache key precision when caching."""
+    if not PREDICTION_CACHE:
+        return arr
+    return np.round(arr, PREDICTION_CACHE_DECIMALS) + 0.0  # + 0.0 folds -0.0 into 0.0 for the key
+
+def _cached(cache, version, arr, score):
+    """score(rows) only for rows not already cached under `version`; `arr` comes from _quantized."""
+    if not PREDICTION_CACHE:
+        return score(arr)
+    keys = [(version, row.tobytes()) for row in arr]
+    out = cache.get_many(keys)
+    miss = [i for i, v in enumerate(out) if v is None]
+    if miss:
+        # duplicate rows inside one batch are scored once
+        first = {}
+        for i in miss:
+            first.setdefault(keys[i], i)
+        rows = list(first.values())
+        scored = score(arr[rows])
+        fresh = dict(zip((keys[i] for i in rows), (float(v) for v in scored)))
+        cache.put_many(fresh.items())
+        for i in miss:
+            out[i] = fresh[keys[i]]
+    return np.asarray(out, dtype=float)
+
+@timed("predict_stress")
+def predict_stress_batch(feature_dicts, bundle=None):
+    """Score many claims with a single model call. Returns [(is_stressed, prob), ...]."""
+    if not feature_dicts:
+        return []
+    try:
+        check_models()
+        bundle = bundle or _active
+        if bundle.has_stress:
+            arr = _quantized(_feature_matrix(feature_dicts, STRESS_FEATURES))
+            proba = _cached(stress_cache, bundle.version, arr, bundle.score_stress)
+            _maybe_shadow("stress", bundle, arr, proba)
+        else:
+            ndvi = np.array([fd.get('NDVI', 0.5) for fd in feature_dicts], dtype=float)
+            stress_indicator = np.array([fd.get('Crop_Stress_Indicator', 0) for fd in feature_dicts], dtype=float)
+            proba = np.clip(1.0 - ndvi*0.8 + (stress_indicator/200.0), 0.0, 1.0)
+        return [(1 if p>=0.5 else 0, float(p)) for p in proba]
+    except Exception as e:
+        return [(0, 0.0)] * len(feature_dicts)
+
+@timed("predict_payout")
+def predict_payout_batch(feature_dicts, bundle=None):
+    """Payout percentage (0-100) for many claims with a single model call."""
+    if not feature_dicts:
+        return []
+    try:
+        check_models()
+        bundle = bundle or _active
+        if bundle.has_payout:
+            arr = _quantized(_feature_matrix(feature_dicts, PAYOUT_FEATURES))
+            out = _cached(payout_cache, bundle.version, arr, bundle.score_payout)
+            _maybe_shadow("payout", bundle, arr, out)
+        else:
+            stress = np.array([fd.get('Crop_Stress_Indicator', 0) for fd in feature_dicts], dtype=float)
+            ndvi = np.array([fd.get('NDVI', 0.5) for fd in feature_dicts], dtype=float)
+            out = np.maximum(0.0, (stress/100.0)*80.0 + (1.0-ndvi)*20.0)
+        return [float(v) for v in np.clip(out, 0.0, 100.0)]
+    except Exception as e:
+        return [0.0] * len(feature_dicts)
+
+def predict_stress(feature_dict, bundle=None):
+    return predict_stress_batch([feature_dict], bundle)[0]
+
+def predict_payout(feature_dict, bundle=None):
+    return predict_payout_batch([feature_dict], bundle)[0]
@@ -0,0 +1,194 @@
+# backend/model_registry.py
+"""
+Versioned model registry.
+
+    <MODEL_REGISTRY_DIR>/
+        manifest.json          {"production": "<version>", "shadow": "<version>" | null, "versions": {...}}
+        <version>/             one complete bundle, same layout as models/:
+            model1_ffn.npz  model1_ffn_scaler.joblib  model1_clf.joblib
+            model2_forest/  model2_rf.joblib  bundle.json
+
+A bundle directory is never modified after publish, so a version name always
+means the same bytes. manifest.json is the only mutable file and is replaced
+atomically; ml.py polls it and hot-swaps to the new production bundle (and
+loads the shadow bundle, if any) without a restart.
+
+    python model_registry.py publish --model1 ../models/runs/model1/<run> --promote
+    python model_registry.py publish --model2 ../models/runs/model2/<run> --shadow
+    python model_registry.py promote <version>
+    python model_registry.py shadow <version> | --off
+    python model_registry.py rollback
+    python model_registry.py list
+"""
+import argparse, hashlib, json, os, shutil, sys, tempfile
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", os.path.join(REPO_DIR, "models", "registry"))
+
+MODEL1_FILES = ("model1_ffn.npz", "model1_ffn_scaler.joblib", "model1_clf.joblib")
+MODEL2_FILES = ("model2_forest", "model2_rf.joblib")
+
+
+def manifest_path(root=MODEL_REGISTRY_DIR):
+    return os.path.join(root, "manifest.json")
+
+
+def read_manifest(root=MODEL_REGISTRY_DIR):
+    """The manifest dict, or None when there is no registry."""
+    try:
+        with open(manifest_path(root), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(manifest, root=MODEL_REGISTRY_DIR):
+    os.makedirs(root, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".manifest-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path(root))
+
+
+def bundle_dir(version, root=MODEL_REGISTRY_DIR):
+    return os.path.join(root, version)
+
+
+def _empty_manifest():
+    return {"production": None, "shadow": None, "versions": {}, "history": []}
+
+
+def _copy(src_dir, names, dest):
+    copied = []
+    for name in names:
+        src = os.path.join(src_dir, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(dest, name))
+        elif os.path.exists(src):
+            shutil.copy2(src, os.path.join(dest, name))
+        else:
+            continue
+        copied.append(name)
+    return copied
+
+
+def _digest(path):
+    h = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name == "bundle.json":
+                continue
+            full = os.path.join(dirpath, name)
+            h.update(os.path.relpath(full, path).encode())
+            with open(full, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+    return h.hexdigest()
+
+
+def publish(model1=None, model2=None, version=None, root=MODEL_REGISTRY_DIR):
+    """Copy artifacts into a new immutable bundle; models not given are taken from production."""
+    manifest = read_manifest(root) or _empty_manifest()
+    base = bundle_dir(manifest["production"], root) if manifest["production"] else os.path.join(REPO_DIR, "models")
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=root, prefix=".publish-")
+    try:
+        sources = {"model1": model1 or base, "model2": model2 or base}
+        files = _copy(sources["model1"], MODEL1_FILES, staging) + _copy(sources["model2"], MODEL2_FILES, staging)
+        if not files:
+            raise ValueError("no model artifacts found to publish")
+        digest = _digest(staging)
+        version = version or f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{digest[:8]}"
+        if version in manifest["versions"] or os.path.exists(bundle_dir(version, root)):
+            raise ValueError(f"version {version} already exists")
+        info = {"version": version, "sha1": digest, "files": files,
+                "sources": {k: os.path.abspath(v) for k, v in sources.items()},
+                "created_at": datetime.utcnow().isoformat() + "Z"}
+        with open(os.path.join(staging, "bundle.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        os.rename(staging, bundle_dir(version, root))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    manifest = read_manifest(root) or _empty_manifest()
+    manifest["versions"][version] = {k: info[k] for k in ("sha1", "files", "sources", "created_at")}
+    write_manifest(manifest, root)
+    return version
+
+
+def promote(version, root=MODEL_REGISTRY_DIR):
+    manifest = read_manifest(root) or _empty_manifest()
+    if version not in manifest["versions"]:
+        raise ValueError(f"unknown version {version}")
+    if manifest["production"] and manifest["production"] != version:
+        manifest["history"].append(manifest["production"])
+    manifest["production"] = version
+    if manifest.get("shadow") == version:
+        manifest["shadow"] = None
+    write_manifest(manifest, root)
+    return manifest
+
+
+def set_shadow(version, root=MODEL_REGISTRY_DIR):
+    manifest = read_manifest(root) or _empty_manifest()
+    if version is not None and version not in manifest["versions"]:
+        raise ValueError(f"unknown version {version}")
+    manifest["shadow"] = version
+    write_manifest(manifest, root)
+    return manifest
+
+
+def rollback(root=MODEL_REGISTRY_DIR):
+    manifest = read_manifest(root) or _empty_manifest()
+    if not manifest["history"]:
+        raise ValueError("no previous production version")
+    manifest["production"] = manifest["history"].pop()
+    write_manifest(manifest, root)
+    return manifest
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default=MODEL_REGISTRY_DIR)
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("publish")
+    p.add_argument("--model1", help="directory with model1_* artifacts (e.g. an engine.py run)")
+    p.add_argument("--model2", help="directory with model2_* artifacts")
+    p.add_argument("--version")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--promote", action="store_true")
+    mode.add_argument("--shadow", action="store_true")
+    sub.add_parser("promote").add_argument("version")
+    s = sub.add_parser("shadow")
+    s.add_argument("version", nargs="?")
+    s.add_argument("--off", action="store_true")
+    sub.add_parser("rollback")
+    sub.add_parser("list")
+    args = ap.parse_args()
+
+    try:
+        if args.command == "publish":
+            version = publish(args.model1, args.model2, args.version, args.root)
+            print(f"published {version}")
+            if args.promote:
+                promote(version, args.root)
+            elif args.shadow:
+                set_shadow(version, args.root)
+        elif args.command == "promote":
+            promote(args.version, args.root)
+        elif args.command == "shadow":
+            if not args.off and not args.version:
+                sys.exit("shadow needs a version or --off")
+            set_shadow(None if args.off else args.version, args.root)
+        elif args.command == "rollback":
+            rollback(args.root)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print(json.dumps(read_manifest(args.root) or _empty_manifest(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
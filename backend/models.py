@@ -21,7 +21,7 @@ class Farmer(db.Model):
 class Land(db.Model):
     __tablename__ = "lands"
     id = db.Column(db.Integer, primary_key=True)
-    farmer_id = db.Column(db.Integer, db.ForeignKey("farmers.id"), nullable=False)
+    farmer_id = db.Column(db.Integer, db.ForeignKey("farmers.id"), nullable=False, index=True)
     land_name = db.Column(db.String(128), nullable=False)
     size_acres = db.Column(db.Float, nullable=True)
     crop_type = db.Column(db.String(32), nullable=False)
@@ -29,19 +29,165 @@ class Land(db.Model):
     verification_image_path = db.Column(db.String(256), nullable=True)
     geo_lat = db.Column(db.Float, nullable=True)
     geo_lon = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # spatial index, see geo.py
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     claims = db.relationship("Claim", backref="land", lazy=True)
 
 class Claim(db.Model):
     __tablename__ = "claims"
     id = db.Column(db.Integer, primary_key=True)
-    land_id = db.Column(db.Integer, db.ForeignKey("lands.id"), nullable=False)
-    farmer_id = db.Column(db.Integer, nullable=False)
-    status = db.Column(db.String(40), default="submitted")
+    land_id = db.Column(db.Integer, db.ForeignKey("lands.id"), nullable=False, index=True)
+    farmer_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(40), default="submitted", index=True)
     is_stressed = db.Column(db.Integer, nullable=True)
     model1_probability = db.Column(db.Float, nullable=True)
     payout_percentage = db.Column(db.Float, nullable=True)  # percent 0-100
     payload_json = db.Column(db.Text, nullable=True)
+    model_version = db.Column(db.String(64), nullable=True)  # ml bundle that scored the claim
     onchain_tx = db.Column(db.String(128), nullable=True)
-    onchain_status = db.Column(db.String(32), nullable=True)  # 'pending','success','failed'
+    onchain_status = db.Column(db.String(32), nullable=True)  # 'queued','pending','success','failed'
+    onchain_block = db.Column(db.Integer, nullable=True)  # block of the log/receipt that settled it, for reorgs
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # per-farmer listings newest first
+    __table_args__ = (db.Index("ix_claims_farmer_created", "farmer_id", "created_at", "id"),)
+
+def _feature_value(fd, key):
+    # what ml._feature_matrix scored: missing keys are 0.0; unreadable values are stored as NULL
+    try:
+        return float(fd.get(key, 0.0))
+    except (TypeError, ValueError):
+        return None
+
+class ClaimFeatures(db.Model):
+    """Model inputs a claim was scored on, one typed column per feature (payload_json keeps the raw request)."""
+    __tablename__ = "claim_features"
+    claim_id = db.Column(db.Integer, db.ForeignKey("claims.id"), primary_key=True)
+    land_id = db.Column(db.Integer, nullable=False)
+    farmer_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    # Model 1 (stress) inputs
+    m1_ndvi = db.Column(db.Float)
+    m1_savi = db.Column(db.Float)
+    m1_chlorophyll_content = db.Column(db.Float)
+    m1_leaf_area_index = db.Column(db.Float)
+    m1_temperature = db.Column(db.Float)
+    m1_humidity = db.Column(db.Float)
+    m1_rainfall = db.Column(db.Float)
+    m1_soil_moisture = db.Column(db.Float)
+    # Model 2 (payout) inputs
+    m2_ndvi = db.Column(db.Float)
+    m2_expected_yield = db.Column(db.Float)
+    m2_crop_stress_indicator = db.Column(db.Float)
+    m2_temperature = db.Column(db.Float)
+    m2_rainfall = db.Column(db.Float)
+    m2_soil_moisture = db.Column(db.Float)
+    m2_crop_type_encoded = db.Column(db.Float)
+    m2_canopy_coverage = db.Column(db.Float)
+    m2_pest_damage = db.Column(db.Float)
+    m2_leaf_area_index = db.Column(db.Float)
+    # per-land time ranges (trigger evaluation, per-plot history)
+    __table_args__ = (db.Index("ix_claim_features_land_created", "land_id", "created_at"),)
+
+    MODEL1_COLUMNS = {"NDVI": "m1_ndvi", "SAVI": "m1_savi", "Chlorophyll_Content": "m1_chlorophyll_content",
+                      "Leaf_Area_Index": "m1_leaf_area_index", "Temperature": "m1_temperature",
+                      "Humidity": "m1_humidity", "Rainfall": "m1_rainfall", "Soil_Moisture": "m1_soil_moisture"}
+    MODEL2_COLUMNS = {"NDVI": "m2_ndvi", "Expected_Yield": "m2_expected_yield",
+                      "Crop_Stress_Indicator": "m2_crop_stress_indicator", "Temperature": "m2_temperature",
+                      "Rainfall": "m2_rainfall", "Soil_Moisture": "m2_soil_moisture",
+                      "Crop_Type_encoded": "m2_crop_type_encoded", "Canopy_Coverage": "m2_canopy_coverage",
+                      "Pest_Damage": "m2_pest_damage", "Leaf_Area_Index": "m2_leaf_area_index"}
+
+    @classmethod
+    def values(cls, claim_id, land_id, farmer_id, created_at, m1, m2):
+        """Column dict for one claim, usable as constructor kwargs or for bulk inserts."""
+        row = {"claim_id": claim_id, "land_id": land_id, "farmer_id": farmer_id, "created_at": created_at}
+        row.update((col, _feature_value(m1, k)) for k, col in cls.MODEL1_COLUMNS.items())
+        row.update((col, _feature_value(m2, k)) for k, col in cls.MODEL2_COLUMNS.items())
+        return row
+
+    @classmethod
+    def for_claim(cls, claim, m1, m2):
+        return cls(**cls.values(claim.id, claim.land_id, claim.farmer_id, claim.created_at, m1, m2))
+
+class ClaimExposure(db.Model):
+    """Claim totals per (week, crop, region, status, stress flag), kept current by analytics.py."""
+    __tablename__ = "claim_exposure"
+    id = db.Column(db.Integer, primary_key=True)
+    week = db.Column(db.Date, nullable=False)              # Monday of the claim's week (UTC)
+    crop_type = db.Column(db.String(32), nullable=False)
+    region = db.Column(db.String(32), nullable=False)      # lat,lon grid cell of the land
+    status = db.Column(db.String(40), nullable=False)
+    is_stressed = db.Column(db.Integer, nullable=False)    # -1 when not scored
+    claims = db.Column(db.Integer, nullable=False, default=0)
+    acres = db.Column(db.Float, nullable=False, default=0.0)
+    payout_pct_sum = db.Column(db.Float, nullable=False, default=0.0)
+    payout_acres_sum = db.Column(db.Float, nullable=False, default=0.0)  # sum(payout % * size_acres)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+    __table_args__ = (db.UniqueConstraint("week", "crop_type", "region", "status", "is_stressed",
+                                          name="uq_claim_exposure_key"),)
+
+class AnalyticsState(db.Model):
+    """Flags on a summary table that must outlive the process, e.g. claim_exposure gone stale (analytics.py)."""
+    __tablename__ = "analytics_state"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+    stale_reason = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TriggerRun(db.Model):
+    """Progress of one parametric_trigger.py run; committed with each chunk of claims, so a rerun resumes."""
+    __tablename__ = "trigger_runs"
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(128), unique=True, nullable=False)
+    raster_path = db.Column(db.String(512), nullable=True)
+    model_version = db.Column(db.String(64), nullable=True)
+    status = db.Column(db.String(16), default="running")  # 'running','done'
+    last_land_id = db.Column(db.Integer, nullable=False, default=0)  # every candidate land <= this is done
+    lands_scored = db.Column(db.Integer, nullable=False, default=0)
+    lands_no_data = db.Column(db.Integer, nullable=False, default=0)
+    claims_created = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header (idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    id = db.Column(db.Integer, primary_key=True)
+    endpoint = db.Column(db.String(64), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 of the body; reuse with another body is refused
+    status = db.Column(db.String(16), nullable=False, default="inflight")  # 'inflight','committed','done'
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    locked_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    __table_args__ = (db.UniqueConstraint("endpoint", "key", name="uq_idempotency_endpoint_key"),)
+
+class ChainOutbox(db.Model):
+    __tablename__ = "chain_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    claim_id = db.Column(db.Integer, db.ForeignKey("claims.id"), nullable=False, index=True)
+    stress_level = db.Column(db.Integer, nullable=False)
+    payout_scaled = db.Column(db.Integer, nullable=False)  # payout fraction scaled by 1e6
+    status = db.Column(db.String(16), default="queued", index=True)  # 'queued','inflight','done','dead'
+    attempts = db.Column(db.Integer, default=0)
+    lease = db.Column(db.String(32), nullable=True, index=True)  # token of the worker batch holding the row
+    # the signed tx, committed before it is broadcast so requeue_stale can reconcile instead of re-signing
+    tx_hash = db.Column(db.String(80), nullable=True)
+    tx_nonce = db.Column(db.Integer, nullable=True)
+    raw_tx = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class IndexerCheckpoint(db.Model):
+    __tablename__ = "indexer_checkpoints"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    last_block = db.Column(db.Integer, nullable=False)        # last fully indexed block
+    last_block_hash = db.Column(db.String(80), nullable=True)  # to detect reorgs below the confirmation depth
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,265 @@
+# backend/parametric_trigger.py
+"""
+Parametric regional trigger: score every insured land under a gridded weather /
+NDVI product and file the resulting claims, without anyone calling submit.
+
+Raster layout: <name>.npy shaped (bands, rows, cols), opened with mmap_mode="r",
+plus a <name>.json sidecar:
+
+    {"bands": ["NDVI", "Rainfall", ...],      # any of STRESS_FEATURES / PAYOUT_FEATURES
+     "origin_lat": 35.0, "origin_lon": 68.0,  # north-west corner of cell (0, 0)
+     "cell_lat": 0.01, "cell_lon": 0.01,      # cell size in degrees (rows run south)
+     "nodata": -9999, "event_id": "imd-2026-w41"}
+
+A .npz with one 2-D array per band name is read too, though npz members
+cannot be memory-mapped and are loaded per band.
+
+The job picks candidate lands through the geohash index (geo.py) over the raster
+extent, optionally clipped to --polygon, then walks them in land-id chunks:
+
+    sample  one fancy-index gather per band at the lands' cells (only those pages are read)
+    score   the production model bundle over the chunk's feature matrices
+    write   Claim + ClaimFeatures (+ ChainOutbox) rows as Core executemany inserts, the
+            claim_exposure deltas and the TriggerRun checkpoint in one commit
+
+so an interrupted run restarts after the last committed chunk and no land gets
+two claims for one event. Bands missing from the raster score as 0.0, as
+missing fields do in submit; Crop_Type_encoded comes from the land's crop.
+Lands outside the grid or on nodata/NaN cells are skipped and counted.
+
+Only lands the models find stressed with a payout above zero get a claim (and a
+queued oracle tx): the pool's executePayout pays nothing on an unstressed result,
+so a claim for any other land would be an oracle write with nothing to pay.
+--min-payout N additionally requires payout >= N percent.
+
+    python parametric_trigger.py run rasters/imd-2026-w41.npy [--polygon district.geojson]
+    python parametric_trigger.py status [event_id]
+"""
+import argparse, json, os, sys, time
+from datetime import datetime
+
+import numpy as np
+
+import analytics
+import geo
+import ml
+from database import db
+from models import ChainOutbox, Claim, ClaimFeatures, Land, TriggerRun
+
+TRIGGER_CHUNK = int(os.environ.get("TRIGGER_CHUNK", 5000))
+CROP_MAP = {'Wheat': 0, 'Maize': 1, 'Rice': 2}
+
+
+class Raster:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        with open(os.path.splitext(path)[0] + ".json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        names = list(self.meta["bands"])
+        if path.endswith(".npz"):
+            z = np.load(path)
+            self.bands = {name: z[name] for name in names}
+            shape = self.bands[names[0]].shape
+        else:
+            data = np.load(path, mmap_mode="r")
+            if data.ndim != 3 or data.shape[0] != len(names):
+                raise ValueError(f"expected ({len(names)}, rows, cols), got {data.shape}")
+            self.bands = {name: data[i] for i, name in enumerate(names)}
+            shape = data.shape[1:]
+        self.rows, self.cols = shape
+        self.origin_lat = float(self.meta["origin_lat"])
+        self.origin_lon = float(self.meta["origin_lon"])
+        self.cell_lat = float(self.meta["cell_lat"])
+        self.cell_lon = float(self.meta["cell_lon"])
+        self.nodata = self.meta.get("nodata")
+
+    @property
+    def extent(self):
+        """(min_lat, min_lon, max_lat, max_lon)"""
+        return (self.origin_lat - self.rows * self.cell_lat, self.origin_lon,
+                self.origin_lat, self.origin_lon + self.cols * self.cell_lon)
+
+    def cells(self, lats, lons):
+        """(row, col, inside) of each point's cell."""
+        r = np.floor((self.origin_lat - lats) / self.cell_lat).astype(np.int64)
+        c = np.floor((lons - self.origin_lon) / self.cell_lon).astype(np.int64)
+        inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+        return np.where(inside, r, 0), np.where(inside, c, 0), inside
+
+    def sample(self, rows, cols, features):
+        """(n, len(features)) float matrix and a per-row validity mask; absent bands are 0.0."""
+        X = np.zeros((len(rows), len(features)), dtype=float)
+        valid = np.ones(len(rows), dtype=bool)
+        for j, name in enumerate(features):
+            band = self.bands.get(name)
+            if band is None:
+                continue
+            v = np.asarray(band[rows, cols], dtype=float)
+            bad = np.isnan(v)
+            if self.nodata is not None:
+                bad |= v == self.nodata
+            valid &= ~bad
+            X[:, j] = np.where(bad, 0.0, v)
+        return X, valid
+
+
+def _score(bundle, X1, X2):
+    """(is_stressed, probability, payout %) arrays, matching predict_*_batch but without the prediction cache."""
+    if bundle.has_stress:
+        proba = np.asarray(bundle.score_stress(X1), dtype=float)
+    else:
+        proba = np.array([p for _, p in ml.predict_stress_batch(
+            [dict(zip(ml.STRESS_FEATURES, row)) for row in X1], bundle)])
+    if bundle.has_payout:
+        payout = np.clip(np.asarray(bundle.score_payout(X2), dtype=float), 0.0, 100.0)
+    else:
+        payout = np.array(ml.predict_payout_batch([dict(zip(ml.PAYOUT_FEATURES, row)) for row in X2], bundle))
+    return (proba >= 0.5).astype(int), proba, payout
+
+
+def candidate_ids(session, raster, polygon=None):
+    """Sorted ids of lands inside the raster extent (and polygon), via the geohash index."""
+    box = raster.extent
+    if polygon:
+        lats, lons = [p[0] for p in polygon], [p[1] for p in polygon]
+        box = (max(box[0], min(lats)), max(box[1], min(lons)), min(box[2], max(lats)), min(box[3], max(lons)))
+        if box[0] > box[2] or box[1] > box[3]:
+            return np.zeros(0, dtype=np.int64)
+    rows = (session.query(Land.id, Land.geo_lat, Land.geo_lon)
+            .filter(geo.prefix_filter(Land.geohash, geo.cover(*box)),
+                    Land.geo_lat.between(box[0], box[2]), Land.geo_lon.between(box[1], box[3])).all())
+    if not rows:
+        return np.zeros(0, dtype=np.int64)
+    ids, lats, lons = (np.array(c) for c in zip(*rows))
+    if polygon:
+        ids = ids[geo.points_in_polygon(lats, lons, polygon)]
+    return np.sort(ids)
+
+
+def run(session, raster_path, event_id=None, polygon=None, chunk=TRIGGER_CHUNK, min_payout=None,
+        enqueue=True, max_chunks=None, log=print):
+    raster = Raster(raster_path)
+    event_id = event_id or raster.meta.get("event_id") or os.path.splitext(os.path.basename(raster_path))[0]
+    trigger = TriggerRun.query.filter_by(event_id=event_id).first()
+    if trigger is None:
+        trigger = TriggerRun(event_id=event_id, raster_path=raster.path, last_land_id=0)
+        session.add(trigger)
+        session.commit()
+    if trigger.status == "done":
+        log(f"{event_id}: already done ({trigger.claims_created} claims)")
+        return trigger
+    bundle = ml.current_model()  # one model version for the whole run
+    if trigger.model_version and trigger.model_version != bundle.version:
+        log(f"{event_id}: resuming with model {bundle.version} (started on {trigger.model_version})")
+    trigger.model_version = bundle.version
+
+    ids = candidate_ids(session, raster, polygon)
+    todo = ids[ids > trigger.last_land_id]
+    log(f"{event_id}: {len(ids)} lands in region, {len(todo)} to score, model {bundle.version}")
+    started = time.perf_counter()
+    for n, start in enumerate(range(0, len(todo), chunk)):
+        if max_chunks is not None and n >= max_chunks:
+            return trigger
+        chunk_ids = todo[start:start + chunk]
+        wanted = set(chunk_ids.tolist())
+        # a range scan on the primary key instead of a huge IN list
+        lands = [l for l in session.query(Land.id, Land.farmer_id, Land.crop_type, Land.size_acres,
+                                          Land.geo_lat, Land.geo_lon)
+                 .filter(Land.id >= int(chunk_ids[0]), Land.id <= int(chunk_ids[-1])).order_by(Land.id)
+                 if l.id in wanted]
+        lats = np.array([l.geo_lat for l in lands], dtype=float)
+        lons = np.array([l.geo_lon for l in lands], dtype=float)
+        r, c, inside = raster.cells(lats, lons)
+        X1, ok1 = raster.sample(r, c, ml.STRESS_FEATURES)
+        X2, ok2 = raster.sample(r, c, ml.PAYOUT_FEATURES)
+        if "Crop_Type_encoded" not in raster.bands:
+            X2[:, ml.PAYOUT_FEATURES.index("Crop_Type_encoded")] = [CROP_MAP.get(l.crop_type, 0) for l in lands]
+        valid = inside & ok1 & ok2
+        stressed, proba, payout = _score(bundle, X1[valid], X2[valid]) if valid.any() else (np.zeros(0, int), np.zeros(0), np.zeros(0))
+        idx = np.flatnonzero(valid)
+        # each filed claim costs an oracle tx: nothing for lands the event left unharmed
+        keep = (stressed == 1) & (payout > 0)
+        if min_payout is not None:
+            keep &= payout >= min_payout
+
+        trigger.last_land_id = int(chunk_ids[-1])  # this write takes SQLite's lock: claim ids below are ours
+        session.flush()
+        now = datetime.utcnow()
+        next_id = (session.query(db.func.max(Claim.id)).scalar() or 0) + 1
+        claims, features, outbox, deltas = [], [], [], {}
+        for k in np.flatnonzero(keep):
+            land = lands[idx[k]]
+            m1 = dict(zip(ml.STRESS_FEATURES, X1[idx[k]].tolist()))
+            m2 = dict(zip(ml.PAYOUT_FEATURES, X2[idx[k]].tolist()))
+            row = {"id": next_id + len(claims), "land_id": land.id, "farmer_id": land.farmer_id, "status": "predicted",
+                   "is_stressed": int(stressed[k]), "model1_probability": float(proba[k]),
+                   "payout_percentage": float(payout[k]), "model_version": bundle.version,
+                   "payload_json": json.dumps({"model1": m1, "model2": m2, "trigger": event_id}),
+                   "onchain_status": "queued" if enqueue else None, "created_at": now}
+            claims.append(row)
+            features.append(ClaimFeatures.values(row["id"], land.id, land.farmer_id, now, m1, m2))
+            if enqueue:
+                outbox.append({"claim_id": row["id"], "stress_level": row["is_stressed"], "status": "queued",
+                               "payout_scaled": int(round(row["payout_percentage"] / 100.0 * 1_000_000))})
+            key, sums = analytics.contribution(row, (land.crop_type, land.size_acres, land.geo_lat, land.geo_lon))
+            deltas[key] = tuple(a + b for a, b in zip(deltas.get(key, (0,) * len(sums)), sums))
+        # Core executemany instead of the ORM unit of work, so the analytics deltas are applied here
+        if claims:
+            conn = session.connection()
+            conn.execute(Claim.__table__.insert(), claims)
+            conn.execute(ClaimFeatures.__table__.insert(), features)
+            if outbox:
+                conn.execute(ChainOutbox.__table__.insert(), outbox)
+            analytics.apply_deltas(conn, deltas)
+        trigger.lands_scored += int(valid.sum())
+        trigger.lands_no_data += int(len(lands) - valid.sum())
+        trigger.claims_created += len(claims)
+        session.commit()
+        done = start + len(chunk_ids)
+        log(f"{event_id}: {done}/{len(todo)} lands, {trigger.claims_created} claims, "
+            f"{done / (time.perf_counter() - started):.0f} lands/s")
+
+    trigger.status = "done"
+    trigger.finished_at = datetime.utcnow()
+    session.commit()
+    return trigger
+
+
+def status(event_id=None):
+    q = TriggerRun.query.order_by(TriggerRun.id.desc())
+    runs = [q.filter_by(event_id=event_id).first()] if event_id else q.limit(20).all()
+    return [{c.name: (v.isoformat() + "Z" if isinstance(v, datetime) else v)
+             for c in TriggerRun.__table__.columns for v in [getattr(r, c.name)]} for r in runs if r]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("raster", help=".npy (memory-mapped) or .npz, with a .json sidecar")
+    r.add_argument("--event", help="event id (default: sidecar event_id or the file name)")
+    r.add_argument("--polygon", help="GeoJSON Polygon / {\"polygon\": [[lat, lon], ...]} file limiting the region")
+    r.add_argument("--chunk", type=int, default=TRIGGER_CHUNK)
+    r.add_argument("--min-payout", type=float,
+                   help="only file stressed claims paying at least this percent (default: any payout > 0)")
+    r.add_argument("--no-enqueue", action="store_true", help="don't queue the on-chain oracle writes")
+    s = sub.add_parser("status")
+    s.add_argument("event_id", nargs="?")
+    args = ap.parse_args()
+
+    from app import app
+    with app.app_context():
+        if args.command == "status":
+            print(json.dumps(status(args.event_id), indent=2))
+            return
+        polygon = None
+        if args.polygon:
+            with open(args.polygon, "r", encoding="utf-8") as f:
+                polygon = geo.parse_polygon(json.load(f))
+        trigger = run(db.session, args.raster, args.event, polygon, args.chunk, args.min_payout,
+                      enqueue=not args.no_enqueue)
+        print(json.dumps(status(trigger.event_id)[0], indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
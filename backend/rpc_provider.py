@@ -0,0 +1,125 @@
+# backend/rpc_provider.py
+"""
+Web3 provider over several JSON-RPC endpoints.
+
+Each endpoint is an HTTPProvider with its own keep-alive requests.Session sized to
+the worker's thread count. Requests go to the healthy endpoint with the lowest
+observed latency (EWMA); on a connection error, timeout or 5xx/429 the endpoint
+is benched for RPC_COOLDOWN seconds and the call moves on to the next one.
+Standby endpoints are re-probed in the background every RPC_PROBE_INTERVAL
+seconds so a recovered or faster endpoint is picked up again.
+"""
+import os, threading, time
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+RPC_TIMEOUT = float(os.environ.get("RPC_TIMEOUT", 10))
+RPC_COOLDOWN = float(os.environ.get("RPC_COOLDOWN", 30))
+RPC_PROBE_INTERVAL = float(os.environ.get("RPC_PROBE_INTERVAL", 60))
+# default to the server's thread count so every request thread can hold a connection
+RPC_POOL_SIZE = int(os.environ.get("RPC_POOL_SIZE", os.environ.get("WEB_THREADS", 10)))
+
+
+def pooled_session(pool_size=RPC_POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _is_endpoint_failure(exc):
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, OSError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500 or exc.response.status_code == 429
+    return False
+
+
+class FailoverHTTPProvider(BaseProvider):
+    def __init__(self, endpoint_uris, pool_size=RPC_POOL_SIZE, timeout=RPC_TIMEOUT,
+                 cooldown=RPC_COOLDOWN, probe_interval=RPC_PROBE_INTERVAL):
+        super().__init__()
+        if not endpoint_uris:
+            raise ValueError("at least one RPC endpoint is required")
+        self.endpoint_uris = list(endpoint_uris)
+        self.providers = [Web3.HTTPProvider(uri, request_kwargs={"timeout": timeout}, session=pooled_session(pool_size))
+                          for uri in self.endpoint_uris]
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self._latency = [None] * len(self.providers)   # EWMA seconds, None = not measured yet
+        self._benched_until = [0.0] * len(self.providers)
+        self._last_probe = time.monotonic()
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def _order(self):
+        now = time.monotonic()
+        # healthy before benched, then fastest first; unmeasured endpoints keep config order
+        return sorted(range(len(self.providers)), key=lambda i: (
+            self._benched_until[i] > now,
+            self._latency[i] if self._latency[i] is not None else float("inf"),
+            i,
+        ))
+
+    def _observe(self, i, elapsed):
+        with self._lock:
+            prev = self._latency[i]
+            self._latency[i] = elapsed if prev is None else 0.8 * prev + 0.2 * elapsed
+
+    def _bench(self, i):
+        with self._lock:
+            self._benched_until[i] = time.monotonic() + self.cooldown
+            self._latency[i] = None
+
+    def make_request(self, method, params):
+        self._maybe_probe()
+        last_exc = None
+        for n, i in enumerate(self._order()):
+            t0 = time.perf_counter()
+            try:
+                response = self.providers[i].make_request(method, params)
+            except Exception as e:
+                if not _is_endpoint_failure(e):
+                    raise
+                self._bench(i)
+                last_exc = e
+                continue
+            self._observe(i, time.perf_counter() - t0)
+            if n:
+                self.failovers += 1
+            return response
+        raise last_exc
+
+    def _maybe_probe(self):
+        if len(self.providers) < 2 or time.monotonic() - self._last_probe < self.probe_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_probe < self.probe_interval:
+                return
+            self._last_probe = time.monotonic()
+        threading.Thread(target=self.probe, name="rpc-probe", daemon=True).start()
+
+    def probe(self):
+        """Time eth_blockNumber on every endpoint and update the ranking."""
+        for i, provider in enumerate(self.providers):
+            t0 = time.perf_counter()
+            try:
+                provider.make_request("eth_blockNumber", [])
+            except Exception:
+                self._bench(i)
+                continue
+            with self._lock:
+                self._benched_until[i] = 0.0
+            self._observe(i, time.perf_counter() - t0)
+
+    def is_connected(self, show_traceback=False):
+        return any(p.is_connected(show_traceback) for p in self.providers)
+
+    def stats(self):
+        now = time.monotonic()
+        return [{"endpoint": uri.split("?")[0], "latency_ms": round(lat * 1000, 1) if lat is not None else None,
+                 "benched": until > now}
+                for uri, lat, until in zip(self.endpoint_uris, self._latency, self._benched_until)]
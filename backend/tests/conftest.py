@@ -0,0 +1,23 @@
+# backend/tests/conftest.py
+import os, sys, tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+# app and the modules it imports read their config at import time: a throwaway
+# database, no background chain threads and no outbound Chainlink pushes
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="tests_"), "test.sqlite3")
+os.environ.update(CHAIN_WORKERS="0", CHAIN_INDEXER="false", PUSH_TO_CHAINLINK="false", MODELS_REQUIRED="none")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
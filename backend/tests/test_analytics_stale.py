@@ -0,0 +1,39 @@
+# backend/tests/test_analytics_stale.py
+"""The claim_exposure stale flag lives in the database: set by bulk claim writes, cleared by rebuild."""
+import sqlite3
+
+import analytics
+from database import db
+from models import Claim
+
+
+def flag_from_another_connection(app):
+    # what a separate process reading the same database sees
+    with app.app_context():
+        path = db.engine.url.database
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT stale FROM analytics_state WHERE name = ?", (analytics.STATE_NAME,)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_bulk_update_marks_stale_until_rebuild(app, client):
+    with app.app_context():
+        analytics.rebuild(db.session)
+        Claim.query.filter(Claim.id < 0).update({"status": "rejected"}, synchronize_session=False)
+        db.session.rollback()  # a rolled-back bulk write leaves the summaries alone
+    assert flag_from_another_connection(app) == (0,)
+    assert client.get("/api/analytics/exposure").get_json()["data"]["stale"] is False
+
+    with app.app_context():
+        Claim.query.filter(Claim.id < 0).update({"status": "rejected"}, synchronize_session=False)
+        db.session.commit()
+    assert flag_from_another_connection(app) == (1,)
+    data = client.get("/api/analytics/exposure").get_json()["data"]
+    assert data["stale"] is True and data["stale_reason"].startswith("bulk")
+
+    with app.app_context():
+        analytics.rebuild(db.session)
+    assert flag_from_another_connection(app) == (0,)
+    assert client.get("/api/analytics/exposure").get_json()["data"]["stale"] is False
@@ -0,0 +1,134 @@
+# backend/tests/test_chain_indexer.py
+"""EventIndexer against a fake node: stale-claim sweep paging, dropped txs and reorg rollback."""
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from web3.exceptions import TransactionNotFound
+
+from chain_indexer import EventIndexer
+from database import db
+from models import ChainOutbox, Claim, Farmer, IndexerCheckpoint, Land
+
+
+class FakeEth:
+    def __init__(self):
+        self.block_number = 100
+        self.hashes = {}
+        self.receipts = {}
+        self.mempool = set()
+        self.receipt_calls = []
+
+    def get_block(self, number):
+        return {"hash": self.hashes.get(number, bytes([number % 256]) * 32)}
+
+    def get_logs(self, query):
+        return []
+
+    def get_transaction_receipt(self, tx_hash):
+        self.receipt_calls.append(tx_hash)
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.receipts[tx_hash]
+
+    def get_transaction(self, tx_hash):
+        if tx_hash not in self.mempool:
+            raise TransactionNotFound(tx_hash)
+        return {"hash": tx_hash}
+
+
+@pytest.fixture
+def chain():
+    return FakeEth()
+
+
+@pytest.fixture
+def indexer(app, chain):
+    return EventIndexer(app, w3=SimpleNamespace(eth=chain), pool=SimpleNamespace(address="0x0"),
+                        name=f"test-{uuid.uuid4().hex[:8]}", confirmations=6, stale_seconds=60, drop_seconds=3600)
+
+
+@pytest.fixture
+def make_claims(app):
+    farmer_ids = []
+
+    def make(specs):
+        with app.app_context():
+            f = Farmer(registration_no=f"HBL-TEST-INDEXER-{uuid.uuid4().hex[:8]}", name="indexer")
+            db.session.add(f)
+            db.session.flush()
+            farmer_ids.append(f.id)
+            land = Land(farmer_id=f.id, land_name="plot", crop_type="Rice")
+            db.session.add(land)
+            db.session.flush()
+            claims = [Claim(land_id=land.id, farmer_id=f.id, **spec) for spec in specs]
+            db.session.add_all(claims)
+            db.session.commit()
+            return [c.id for c in claims]
+    yield make
+    with app.app_context():  # other tests' sweeps must not see these claims
+        Claim.query.filter(Claim.farmer_id.in_(farmer_ids)).update({"onchain_status": "done"}, synchronize_session=False)
+        db.session.commit()
+
+
+def claims(app, ids):
+    with app.app_context():
+        out = {c.id: (c.onchain_status, c.status, c.onchain_tx, c.onchain_block)
+               for c in Claim.query.filter(Claim.id.in_(ids))}
+        db.session.remove()
+        return [out[i] for i in ids]
+
+
+def test_sweep_pages_through_every_stale_claim_oldest_first(app, chain, indexer, make_claims):
+    t0 = datetime.utcnow() - timedelta(minutes=30)
+    ids = make_claims([{"status": "onchain_submitted", "onchain_status": "pending", "onchain_tx": f"0x{i:064x}",
+                        "created_at": t0 + timedelta(seconds=i // 4)} for i in range(250)])
+    for i in range(250):
+        chain.receipts[f"0x{i:064x}"] = SimpleNamespace(status=0, blockNumber=90)
+    with app.app_context():
+        assert indexer.sweep_stale(page_size=100) == 250
+        db.session.remove()
+    assert chain.receipt_calls == [f"0x{i:064x}" for i in range(250)]
+    assert {c[:2] + c[3:] for c in claims(app, ids)} == {("failed", "onchain_failed", 90)}
+
+
+def test_dropped_tx_is_requeued_after_the_deadline(app, chain, indexer, make_claims):
+    old, young = datetime.utcnow() - timedelta(hours=2), datetime.utcnow() - timedelta(minutes=5)
+    pending = {"status": "onchain_submitted", "onchain_status": "pending"}
+    dropped, waiting, recent, orphan = make_claims([
+        dict(pending, onchain_tx="0x" + "1" * 64, created_at=old),
+        dict(pending, onchain_tx="0x" + "2" * 64, created_at=old),  # still in the node's mempool
+        dict(pending, onchain_tx="0x" + "3" * 64, created_at=young),  # not past the drop deadline yet
+        dict(pending, onchain_tx="0x" + "4" * 64, created_at=old),  # no outbox row (direct submit)
+    ])
+    chain.mempool.add("0x" + "2" * 64)
+    with app.app_context():
+        for claim_id, c in ((dropped, "1"), (waiting, "2"), (recent, "3")):
+            db.session.add(ChainOutbox(claim_id=claim_id, stress_level=1, payout_scaled=400_000, status="done",
+                                       attempts=1, tx_hash="0x" + c * 64, tx_nonce=int(c)))
+        db.session.commit()
+        assert indexer.sweep_stale() == 4
+        row = ChainOutbox.query.filter_by(claim_id=dropped).one()
+        assert (row.status, row.tx_hash, row.tx_nonce) == ("queued", None, None)
+        assert ChainOutbox.query.filter_by(claim_id=waiting).one().status == "done"
+        ChainOutbox.query.filter(ChainOutbox.claim_id.in_([dropped, waiting, recent])).delete(synchronize_session=False)
+        db.session.commit()
+    got = claims(app, [dropped, waiting, recent, orphan])
+    assert got[0][:3] == ("queued", "onchain_submitted", None)
+    assert got[1][0] == got[2][0] == "pending"
+    assert got[3][:2] == ("failed", "onchain_error")
+
+
+def test_reorg_puts_claims_from_orphaned_blocks_back_to_pending(app, chain, indexer, make_claims):
+    settled = {"status": "paid_out", "onchain_status": "success", "onchain_tx": "0x" + "a" * 64}
+    kept, orphaned = make_claims([dict(settled, onchain_block=40), dict(settled, onchain_block=47)])
+    with app.app_context():
+        db.session.add(IndexerCheckpoint(name=indexer.name, last_block=50, last_block_hash="0x" + "f" * 64))
+        db.session.commit()
+        assert indexer.run_once() == 0  # block 50's hash changed: step back instead of indexing
+        ckpt = IndexerCheckpoint.query.filter_by(name=indexer.name).one()
+        assert (ckpt.last_block, ckpt.last_block_hash) == (44, None)
+        db.session.remove()
+    assert claims(app, [kept, orphaned]) == [("success", "paid_out", "0x" + "a" * 64, 40),
+                                            ("pending", "onchain_submitted", "0x" + "a" * 64, None)]
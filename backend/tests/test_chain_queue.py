@@ -0,0 +1,90 @@
+# backend/tests/test_chain_queue.py
+"""OutboxWorker recovery of rows a dead worker left 'inflight'."""
+import time, uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from chain_queue import OutboxWorker
+from database import db
+from models import ChainOutbox, Claim, Farmer, Land
+
+
+@pytest.fixture
+def make_rows(app):
+    farmer_ids = []
+
+    def make(n, **outbox):
+        with app.app_context():
+            f = Farmer(registration_no=f"HBL-TEST-OUTBOX-{uuid.uuid4().hex[:8]}", name="outbox")
+            db.session.add(f)
+            db.session.flush()
+            farmer_ids.append(f.id)
+            land = Land(farmer_id=f.id, land_name="plot", crop_type="Rice")
+            db.session.add(land)
+            db.session.flush()
+            ids = []
+            for _ in range(n):
+                claim = Claim(land_id=land.id, farmer_id=f.id, status="predicted", onchain_status="queued")
+                db.session.add(claim)
+                db.session.flush()
+                row = ChainOutbox(claim_id=claim.id, stress_level=1, payout_scaled=400_000, **outbox)
+                db.session.add(row)
+                db.session.flush()
+                ids.append(row.id)
+            db.session.commit()
+            return ids
+    yield make
+    with app.app_context():  # other tests' workers must not see these rows
+        claim_ids = [c for (c,) in db.session.query(Claim.id).filter(Claim.farmer_id.in_(farmer_ids))]
+        ChainOutbox.query.filter(ChainOutbox.claim_id.in_(claim_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def rows(app, ids):
+    with app.app_context():
+        out = {r.id: (r.status, r.tx_hash, r.tx_nonce, r.raw_tx) for r in ChainOutbox.query.filter(ChainOutbox.id.in_(ids))}
+        db.session.remove()
+        return [out[i] for i in ids]
+
+
+def test_running_worker_requeues_rows_that_go_stale_after_it_started(app, make_rows):
+    sent = []
+    submit = lambda policy_id, **kw: sent.append(policy_id) or {"tx_hash": "0x%064x" % policy_id}
+    worker = OutboxWorker(app, submit_fn=submit, concurrency=1, poll_interval=0.05, lease_seconds=1, batch_size=1)
+    worker.start()
+    try:
+        # a worker that died just now: its row is not stale yet when the replacement starts
+        ids = make_rows(1, status="inflight", lease="dead", attempts=1, updated_at=datetime.utcnow())
+        deadline = time.monotonic() + 10
+        while rows(app, ids)[0][0] != "done" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+    assert rows(app, ids)[0][0] == "done"
+    assert len(sent) == 1
+
+
+def test_requeue_stale_reconciles_signed_rows_instead_of_resigning(app, make_rows):
+    stale = dict(status="inflight", lease="dead", attempts=1, updated_at=datetime.utcnow() - timedelta(hours=1))
+    mined, known, taken, down = (make_rows(1, tx_hash=f"0x{c * 64}", tx_nonce=n, raw_tx=f"0xraw{c}", **stale)[0]
+                                 for c, n in (("a", 1), ("b", 2), ("c", 3), ("d", 4)))
+    unsigned = make_rows(1, **stale)[0]
+    receipts = {"0x" + "a" * 64}
+    answers = {"0xrawb": {"error": "already known"}, "0xrawc": {"error": "nonce too low"},
+               "0xrawd": {"error": "connection refused"}}
+    tx_status = lambda h: {"tx_hash": h, "status": 1} if h in receipts else {"error": "transaction not found"}
+    worker = OutboxWorker(app, submit_fn=lambda **kw: pytest.fail("nothing should be re-signed"), concurrency=1,
+                          lease_seconds=60, batch_size=1, tx_status_fn=tx_status, rebroadcast_fn=answers.get)
+    with app.app_context():
+        assert worker.requeue_stale() == 2  # the never-signed row and the one whose nonce went elsewhere
+        claims = {c.id: c for c in Claim.query.filter(Claim.id.in_(
+            [r.claim_id for r in ChainOutbox.query.filter(ChainOutbox.id.in_([mined, known]))]))}
+        assert {(c.onchain_status, c.onchain_tx[:3]) for c in claims.values()} == {("pending", "0xa"), ("pending", "0xb")}
+        db.session.remove()
+    got = dict(zip(("mined", "known", "taken", "down", "unsigned"), rows(app, [mined, known, taken, down, unsigned])))
+    assert got["mined"][:2] == ("done", "0x" + "a" * 64)
+    assert got["known"][:2] == ("done", "0x" + "b" * 64)
+    assert got["taken"] == ("queued", None, None, None)
+    assert got["down"] == ("inflight", "0x" + "d" * 64, 4, "0xrawd")  # left for the next sweep
+    assert got["unsigned"][0] == "queued"
@@ -0,0 +1,131 @@
+# backend/tests/test_chainlink_dispatcher.py
+"""ChainlinkDispatcher against a local stub webhook: batching, retries and the drop/fail counters."""
+import json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from chainlink_client import ChainlinkDispatcher
+
+
+class StubWebhook:
+    """Records every POST; answers with the scripted statuses in order, then 200."""
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append({"body": body, "api_key": self.headers.get("X-API-Key")})
+                self.send_response(stub.statuses.pop(0) if stub.statuses else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    stubs = []
+
+    def make(statuses=()):
+        stubs.append(StubWebhook(statuses))
+        return stubs[-1]
+    yield make
+    for s in stubs:
+        s.close()
+
+
+def dispatcher(url, **kwargs):
+    kwargs = dict(dict(batch=False, flush_seconds=0.05, max_attempts=3, timeout=5, retry_base=0.01, retry_max=0.05),
+                  **kwargs)
+    return ChainlinkDispatcher(url=url, **kwargs)
+
+
+def drain(d, pushed):
+    # queued before start(), so batching does not depend on timing
+    d.start()
+    d.stop(timeout=10)
+    s = d.stats()
+    assert s["queued"] == 0 and s["delivered"] + s["failed"] == pushed, s
+    return s
+
+
+def test_batches_up_to_batch_size(webhook):
+    hook = webhook()
+    d = dispatcher(hook.url, batch=True, batch_size=5, api_key="k-123")
+    for i in range(12):
+        assert d.push({"claim_id": i})["queued"]
+    s = drain(d, 12)
+    assert [len(r["body"]["predictions"]) for r in hook.requests] == [5, 5, 2]
+    assert [p["claim_id"] for r in hook.requests for p in r["body"]["predictions"]] == list(range(12))
+    assert {r["api_key"] for r in hook.requests} == {"k-123"}
+    assert s == {"delivered": 12, "failed": 0, "dropped": 0, "retries": 0, "posts": 3, "queued": 0}
+
+
+def test_unbatched_posts_one_prediction_each(webhook):
+    hook = webhook()
+    d = dispatcher(hook.url)
+    for i in range(3):
+        d.push({"claim_id": i})
+    s = drain(d, 3)
+    assert [r["body"] for r in hook.requests] == [{"claim_id": i} for i in range(3)]
+    assert s["posts"] == 3 and s["delivered"] == 3
+
+
+def test_retries_503_once_then_delivers(webhook):
+    hook = webhook([503])
+    d = dispatcher(hook.url)
+    d.push({"claim_id": 1})
+    s = drain(d, 1)
+    assert [r["body"] for r in hook.requests] == [{"claim_id": 1}] * 2
+    assert s == {"delivered": 1, "failed": 0, "dropped": 0, "retries": 1, "posts": 2, "queued": 0}
+
+
+def test_gives_up_after_max_attempts(webhook):
+    hook = webhook([503, 429, 502])
+    d = dispatcher(hook.url, max_attempts=3)
+    d.push({"claim_id": 1})
+    s = drain(d, 1)
+    assert len(hook.requests) == 3
+    assert (s["failed"], s["retries"], s["posts"]) == (1, 2, 3)
+
+
+def test_client_error_is_not_retried(webhook):
+    hook = webhook([400])
+    d = dispatcher(hook.url)
+    d.push({"claim_id": 1})
+    s = drain(d, 1)
+    assert len(hook.requests) == 1
+    assert (s["failed"], s["retries"]) == (1, 0)
+
+
+def test_full_queue_drops_and_counts(webhook):
+    hook = webhook()
+    d = dispatcher(hook.url, queue_max=2)
+    assert d.push({"claim_id": 1})["queued"] and d.push({"claim_id": 2})["queued"]
+    assert d.push({"claim_id": 3}) == {"queued": False, "reason": "dispatcher queue full"}
+    s = drain(d, 2)
+    assert (s["dropped"], s["delivered"]) == (1, 2)
+    assert [r["body"]["claim_id"] for r in hook.requests] == [1, 2]
+
+
+def test_unreachable_webhook_fails_after_retries(webhook):
+    hook = webhook()
+    url = hook.url
+    hook.close()  # nothing listens on the port any more
+    d = dispatcher(url, max_attempts=2)
+    d.push({"claim_id": 1})
+    s = drain(d, 1)
+    assert (s["failed"], s["retries"], s["posts"]) == (1, 1, 2)
@@ -0,0 +1,31 @@
+# backend/tests/test_flat_forest.py
+"""ml.FlatForest (model_training/compile_model2.py output) matches RandomForestRegressor.predict."""
+import os, sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from conftest import BACKEND_DIR
+from ml import FlatForest
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, "..", "model_training"))
+from compile_model2 import FEATURES, flatten_forest, write_forest  # noqa: E402
+
+
+@pytest.mark.parametrize("max_depth, min_samples_leaf", [(None, 1), (4, 5)])
+def test_flat_forest_matches_sklearn(tmp_path, max_depth, min_samples_leaf):
+    rng = np.random.default_rng(3)
+    X = rng.uniform(0, 100, size=(600, len(FEATURES)))
+    X[:, FEATURES.index("Crop_Type_encoded")] = rng.integers(0, 3, len(X))  # ties on a discrete feature
+    y = 0.6 * X[:, 2] + 20 * np.sin(X[:, 0] / 10) + rng.normal(0, 2, len(X))
+    rf = RandomForestRegressor(n_estimators=12, max_depth=max_depth, min_samples_leaf=min_samples_leaf,
+                               random_state=0, n_jobs=1).fit(X, y)
+    arrays, depth = flatten_forest(rf)
+    write_forest(arrays, depth, str(tmp_path))
+    forest = FlatForest.load(str(tmp_path))
+
+    # fresh rows, plus training rows that sit exactly on split thresholds
+    X_test = np.vstack([rng.uniform(-10, 110, size=(300, len(FEATURES))), X[:100]])
+    np.testing.assert_allclose(forest.predict(X_test), rf.predict(X_test), rtol=0, atol=1e-9)
+    assert forest.predict(X_test[0]).shape == (1,)
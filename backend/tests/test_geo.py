@@ -0,0 +1,59 @@
+# backend/tests/test_geo.py
+"""Radius/polygon queries read at most max_candidates rows (nearest first for radius) and say so."""
+import numpy as np
+import pytest
+
+import geo
+from database import db
+from models import Farmer, Land
+
+# a corner of the Pacific no other test puts lands in, straddling the antimeridian
+LAT, LON = -45.0, 179.99
+
+
+@pytest.fixture(scope="module")
+def lands(app):
+    rng = np.random.default_rng(7)
+    lats = LAT + rng.uniform(-0.3, 0.3, 300)
+    lons = (LON + rng.uniform(-0.3, 0.3, 300) + 180.0) % 360.0 - 180.0
+    with app.app_context():
+        f = Farmer(registration_no="HBL-TEST-GEO", name="geo")
+        db.session.add(f)
+        db.session.flush()
+        db.session.add_all([Land(farmer_id=f.id, land_name=f"p{i}", crop_type="Rice", geo_lat=float(a),
+                                 geo_lon=float(b), geohash=geo.encode(a, b)) for i, (a, b) in enumerate(zip(lats, lons))])
+        db.session.commit()
+    return lats, lons
+
+
+def test_near_caps_candidates_nearest_first(app, lands):
+    lats, lons = lands
+    dist = np.sort(geo.haversine_km(LAT, LON, lats, lons))
+    with app.app_context():
+        full, stats = geo.near(db.session.query(Land), Land, LAT, LON, 40.0)
+        assert not stats["candidates_truncated"]
+        capped, stats = geo.near(db.session.query(Land), Land, LAT, LON, 40.0, max_candidates=50)
+    assert stats["candidates"] == 50 and stats["candidates_truncated"]
+    # the 50 read are the nearest (planar ranking), including lands across the antimeridian
+    np.testing.assert_allclose([d for _, d in capped], dist[:50])
+    assert [r.id for r, _ in capped] == [r.id for r, _ in full[:50]]
+
+
+def test_within_caps_candidates(app, lands):
+    polygon = [(LAT - 0.2, 179.7), (LAT + 0.2, 179.7), (LAT + 0.2, 179.98), (LAT - 0.2, 179.98)]
+    with app.app_context():
+        hits, stats = geo.within(db.session.query(Land), Land, polygon, max_candidates=10)
+    assert stats == {"cells": stats["cells"], "candidates": 10, "candidates_truncated": True}
+    assert len(hits) <= 10
+
+
+def test_endpoints_report_truncation_and_reject_huge_polygons(client, lands, monkeypatch):
+    candidates = geo._candidates
+    monkeypatch.setattr(geo, "_candidates", lambda query, model, box, order_by=None, max_candidates=None:
+                        candidates(query, model, box, order_by, 5))
+    body = client.get(f"/api/lands/near?lat={LAT}&lon={LON}&radius_km=40").get_json()
+    assert body["candidates"] == 5 and body["candidates_truncated"] and body["truncated"]
+
+    ring = [[LAT + 0.1 * np.sin(t), LON - 0.2 + 0.1 * np.cos(t)] for t in np.linspace(0, 6.28, geo.GEO_MAX_POLYGON_VERTICES + 5)]
+    resp = client.post("/api/lands/within", json={"polygon": ring})
+    assert resp.status_code == 400 and "vertices" in resp.get_json()["error"]
@@ -0,0 +1,29 @@
+# backend/tests/test_upload_store.py
+"""Uploads dedupe on content whatever the extension; partial uploads in tmp/ are never served."""
+import io, os
+
+from upload_store import UploadStore
+
+
+def test_same_bytes_stored_once_under_any_extension(tmp_path):
+    store = UploadStore(str(tmp_path), thumb_workers=0)
+    body = b"\xff\xd8\xff\xe0 not really a jpeg"
+    first = store.save(io.BytesIO(body), "jpeg")
+    assert first.endswith(".jpg")
+    assert store.save(io.BytesIO(body), "JPG") == first
+    assert store.save(io.BytesIO(body), "png") == first
+    assert store.stats()["stored"] == 1 and store.stats()["deduped"] == 2
+    assert os.listdir(os.path.join(str(tmp_path), os.path.dirname(first))) == [os.path.basename(first)]
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_tmp_uploads_are_not_served(app, client):
+    import app as app_module
+    tmp = os.path.join(app_module.upload_store.tmp_dir, "partial-upload")
+    with open(tmp, "wb") as f:
+        f.write(b"half an image")
+    try:
+        for path in ("tmp/partial-upload", "./tmp/partial-upload", "thumbs/../tmp/partial-upload"):
+            assert client.get(f"/uploads/{path}").status_code == 404, path
+    finally:
+        os.unlink(tmp)
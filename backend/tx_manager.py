@@ -0,0 +1,106 @@
+# backend/tx_manager.py
+"""
+Nonce allocation and fee caching for the oracle signer.
+
+NonceManager hands out nonces from a local counter under a lock, so concurrent
+sends never read the same nonce from the node. It goes back to the chain only on
+first use, after a failed send, or when the periodic gap check finds the node
+ahead of us (another process signed with the same key).
+
+GasOracle caches EIP-1559 fee suggestions for a short TTL instead of paying a
+fixed 20 gwei gasPrice on every tx.
+"""
+import os, threading, time
+
+NONCE_RESYNC_INTERVAL = float(os.environ.get("NONCE_RESYNC_INTERVAL", 30))  # seconds between gap checks
+GAS_CACHE_TTL = float(os.environ.get("GAS_CACHE_TTL", 12))                   # ~one block
+GAS_BASE_FEE_MULTIPLIER = float(os.environ.get("GAS_BASE_FEE_MULTIPLIER", 2))
+
+# node error substrings meaning "this nonce is already taken on chain"
+NONCE_ERRORS = ("nonce too low", "already known", "replacement transaction underpriced", "nonce has already been used",
+                "invalid transaction nonce")
+
+
+def is_nonce_error(exc):
+    msg = str(exc).lower()
+    return any(s in msg for s in NONCE_ERRORS)
+
+
+class NonceManager:
+    def __init__(self, w3, address, resync_interval=NONCE_RESYNC_INTERVAL):
+        self.w3 = w3
+        self.address = address
+        self.resync_interval = resync_interval
+        self._lock = threading.Lock()
+        self._next = None
+        self._checked_at = 0.0
+        self.allocated = 0
+        self.resyncs = 0
+
+    def _chain_nonce(self):
+        return self.w3.eth.get_transaction_count(self.address, "pending")
+
+    def allocate(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._next is None:
+                self._next = self._chain_nonce()
+                self._checked_at = now
+            elif now - self._checked_at > self.resync_interval:
+                # gap check: only ever move forward, our in-flight nonces may not be visible yet
+                self._next = max(self._next, self._chain_nonce())
+                self._checked_at = now
+            nonce = self._next
+            self._next += 1
+            self.allocated += 1
+            return nonce
+
+    def resync(self):
+        """Forget the local counter; the next allocate() re-reads the pending nonce."""
+        with self._lock:
+            self._next = None
+            self.resyncs += 1
+
+    def stats(self):
+        return {"next_nonce": self._next, "allocated": self.allocated, "resyncs": self.resyncs}
+
+
+class GasOracle:
+    def __init__(self, w3, ttl=GAS_CACHE_TTL, base_fee_multiplier=GAS_BASE_FEE_MULTIPLIER):
+        self.w3 = w3
+        self.ttl = ttl
+        self.base_fee_multiplier = base_fee_multiplier
+        self._lock = threading.Lock()
+        self._fees = None
+        self._fetched_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _fetch(self):
+        block = self.w3.eth.get_block("latest")
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is None:
+            # pre-London chain
+            return {"gasPrice": self.w3.eth.gas_price}
+        tip = self.w3.eth.max_priority_fee
+        return {
+            "maxPriorityFeePerGas": tip,
+            "maxFeePerGas": int(base_fee * self.base_fee_multiplier) + tip,
+        }
+
+    def fees(self):
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._fetched_at < self.ttl:
+                self.hits += 1
+                return dict(self._fees)
+            self.misses += 1
+            self._fees = self._fetch()
+            self._fetched_at = time.monotonic()
+            return dict(self._fees)
+
+    def invalidate(self):
+        with self._lock:
+            self._fees = None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "fees": self._fees}
@@ -0,0 +1,162 @@
+# backend/upload_store.py
+"""
+Content-addressed store for gov-ID, selfie and land images.
+
+Uploads are streamed to a temp file in UPLOAD_CHUNK_BYTES chunks while being
+hashed (sha256), then renamed to <root>/<h[0:2]>/<h[2:4]>/<h>.<ext>. A second
+upload of the same bytes finds the file already there (under any extension;
+jpeg is stored as jpg) and is dropped, so every image is stored once and the
+two shard levels cap each directory at 256 entries. Partial uploads live in
+<root>/tmp/ and are never served.
+
+Thumbnails (UPLOAD_THUMB_SIZE px, longest side) are rendered on a small thread
+pool after the request returns, into <root>/thumbs/ with the same layout. They
+need Pillow; without it only originals are served.
+
+The stored name doubles as a strong ETag: the bytes behind a name never change.
+"""
+import hashlib, os, posixpath, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 64 * 1024))
+UPLOAD_THUMB_SIZE = int(os.environ.get("UPLOAD_THUMB_SIZE", 320))
+UPLOAD_THUMB_WORKERS = int(os.environ.get("UPLOAD_THUMB_WORKERS", 2))
+EXT_ALIASES = {"jpeg": "jpg"}
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class UploadStore:
+    def __init__(self, root, chunk_size=UPLOAD_CHUNK_BYTES, thumb_size=UPLOAD_THUMB_SIZE,
+                 thumb_workers=UPLOAD_THUMB_WORKERS):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.thumb_dir = os.path.join(self.root, "thumbs")
+        self.chunk_size = chunk_size
+        self.thumb_size = thumb_size
+        self.thumb_workers = thumb_workers
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "deduped": 0, "bytes_stored": 0, "thumbs": 0, "thumb_errors": 0}
+
+    @staticmethod
+    def shard_path(digest, ext):
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+    @staticmethod
+    def is_temporary(name):
+        """True for paths inside tmp/, where uploads are written before they are complete."""
+        return posixpath.normpath(name).split("/", 1)[0] == "tmp"
+
+    @staticmethod
+    def is_content_addressed(name):
+        """True for names produced by save(); the legacy flat uploads are not."""
+        parts = name.split("/")
+        if len(parts) != 3:
+            return False
+        digest = parts[2].split(".", 1)[0]
+        return len(digest) == 64 and parts[0] == digest[:2] and parts[1] == digest[2:4]
+
+    def save(self, stream, ext):
+        """Stream `stream` into the store; returns the relative name (shard path)."""
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            ext = ext.lower()
+            digest = h.hexdigest()
+            existing = self._stored_name(digest)
+            if existing:
+                os.unlink(tmp)
+                self._count("deduped")
+                return existing
+            name = self.shard_path(digest, EXT_ALIASES.get(ext, ext))
+            dest = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp, dest)  # atomic; a concurrent identical upload just replaces equal bytes
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._count("stored")
+        self._count("bytes_stored", size)
+        self.submit_thumbnail(name)
+        return name
+
+    def _stored_name(self, digest):
+        # the same bytes may have arrived before under another extension
+        shard = self.shard_path(digest, "").rsplit("/", 1)[0]
+        try:
+            entries = os.listdir(os.path.join(self.root, shard))
+        except FileNotFoundError:
+            return None
+        for entry in entries:
+            if entry.split(".", 1)[0] == digest:
+                return f"{shard}/{entry}"
+        return None
+
+    def thumbnail_name(self, name):
+        return "thumbs/" + name.rsplit(".", 1)[0] + ".jpg"
+
+    def submit_thumbnail(self, name):
+        if Image is None or self.thumb_workers <= 0:
+            return None
+        return self._executor().submit(self.make_thumbnail, name)
+
+    def make_thumbnail(self, name):
+        src = os.path.join(self.root, name)
+        dest = os.path.join(self.root, self.thumbnail_name(name))
+        if os.path.exists(dest):
+            return dest
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with Image.open(src) as im:
+                im.thumbnail((self.thumb_size, self.thumb_size))
+                fd, tmp = tempfile.mkstemp(dir=self.tmp_dir, suffix=".jpg")
+                with os.fdopen(fd, "wb") as out:
+                    im.convert("RGB").save(out, "JPEG", quality=80, optimize=True)
+            os.replace(tmp, dest)
+        except Exception as e:
+            self._count("thumb_errors")
+            print("thumbnail error:", name, e)
+            return None
+        self._count("thumbs")
+        return dest
+
+    def resolve(self, name, size=None):
+        """Relative path to serve for `name`: the thumbnail when asked for and ready, else the original."""
+        if size == "thumb" and self.is_content_addressed(name):
+            thumb = self.thumbnail_name(name)
+            if os.path.exists(os.path.join(self.root, thumb)):
+                return thumb
+        return name
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, thumbnails_enabled=Image is not None and self.thumb_workers > 0)
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _executor(self):
+        # one pool per process; a forked worker must not inherit the parent's threads
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.thumb_workers, thread_name_prefix="thumbs")
+                    self._pool_pid = os.getpid()
+        return self._pool
@@ -1,4 +1,6 @@
 # backend/utils.py
+import base64
+from datetime import datetime
 from flask import jsonify
 
 def ok(data=None, **kwargs):
@@ -10,3 +12,17 @@ def ok(data=None, **kwargs):
 
 def err(msg, code=400):
     return jsonify({"ok": False, "error": msg}), code
+
+def encode_cursor(created_at, row_id):
+    # opaque keyset cursor for (created_at, id) descending pages
+    raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """(created_at, id) from encode_cursor(); raises ValueError on garbage."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(ts) if ts else None), int(row_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
@@ -1,13 +1,25 @@
 # backend/web3_client.py
-import os, json, time
+"""
+Oracle signer and pool contract access.
+
+Nothing touches the network at import: the provider, ABIs, contracts, nonce
+manager and gas oracle are built on first use behind a lock (`get_client()`),
+so workers boot even while the RPC is down. Set SEPOLIA_RPCS to a comma-separated
+list of endpoints for latency-ranked failover (see rpc_provider.py).
+"""
+import os, json, threading, time
 from dotenv import load_dotenv
 from web3 import Web3, exceptions
 from web3.middleware import geth_poa_middleware
+from rpc_provider import FailoverHTTPProvider
+from tx_manager import NonceManager, GasOracle, is_nonce_error
+from metrics import timed
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv()
 
 SEPOLIA_RPC = os.getenv("SEPOLIA_RPC")
+SEPOLIA_RPCS = [u.strip() for u in os.getenv("SEPOLIA_RPCS", SEPOLIA_RPC or "").split(",") if u.strip()]
 PRIVATE_KEY = os.getenv("PRIVATE_KEY")
 WALLET_ADDRESS = os.getenv("WALLET_ADDRESS")
 INSURANCE_POOL = os.getenv("INSURANCE_POOL")
@@ -17,15 +29,6 @@ STABLE_TOKEN = os.getenv("STABLE_TOKEN")
 POOL_ABI_PATH = os.path.join(BASE_DIR, "abi", "FarmInsurancePool.json")
 TOKEN_ABI_PATH = os.path.join(BASE_DIR, "abi", "TestStableToken.json")
 
-if not SEPOLIA_RPC:
-    raise RuntimeError("SEPOLIA_RPC must be set")
-
-w3 = Web3(Web3.HTTPProvider(SEPOLIA_RPC))
-w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-if not w3.is_connected():
-    raise RuntimeError("Web3 provider not connected - check SEPOLIA_RPC")
-
 
 def load_abi(path):
     abs_path = os.path.abspath(path)
@@ -36,38 +39,111 @@ def load_abi(path):
         return j.get("abi", j)
 
 
-# Load ABIs if addresses are set
-pool_abi = load_abi(POOL_ABI_PATH) if INSURANCE_POOL else None
-stable_abi = load_abi(TOKEN_ABI_PATH) if STABLE_TOKEN else None
+class ChainClient:
+    def __init__(self, provider=None):
+        if provider is None:
+            if not SEPOLIA_RPCS:
+                raise RuntimeError("SEPOLIA_RPC (or SEPOLIA_RPCS) must be set")
+            provider = FailoverHTTPProvider(SEPOLIA_RPCS)
+        self.w3 = Web3(provider)
+        self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+
+        # Load ABIs if addresses are set
+        pool_abi = load_abi(POOL_ABI_PATH) if INSURANCE_POOL else None
+        stable_abi = load_abi(TOKEN_ABI_PATH) if STABLE_TOKEN else None
+        self.pool_contract = (
+            self.w3.eth.contract(address=Web3.to_checksum_address(INSURANCE_POOL), abi=pool_abi)
+            if INSURANCE_POOL and pool_abi
+            else None
+        )
+        self.stable_contract = (
+            self.w3.eth.contract(address=Web3.to_checksum_address(STABLE_TOKEN), abi=stable_abi)
+            if STABLE_TOKEN and stable_abi
+            else None
+        )
+
+        self.nonce_manager = NonceManager(self.w3, Web3.to_checksum_address(WALLET_ADDRESS)) if WALLET_ADDRESS else None
+        self.gas_oracle = GasOracle(self.w3)
+        self._chain_id = None
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ChainClient()
+    return _client
+
+
+def use_provider(provider):
+    """Swap the singleton onto another provider (e.g. EthereumTesterProvider) for local runs."""
+    global _client
+    with _client_lock:
+        _client = ChainClient(provider)
+    return _client
+
+
+def get_w3():
+    return get_client().w3
+
+
+def get_pool_contract():
+    return get_client().pool_contract
+
 
-# Initialize contracts
-pool_contract = (
-    w3.eth.contract(address=Web3.to_checksum_address(INSURANCE_POOL), abi=pool_abi)
-    if INSURANCE_POOL and pool_abi
-    else None
-)
+def _tx_params():
+    """build_transaction defaults: cached chain id and fees, so only gas estimation hits the RPC."""
+    client = get_client()
+    params = {"from": Web3.to_checksum_address(WALLET_ADDRESS), "chainId": client.chain_id}
+    params.update(client.gas_oracle.fees())
+    return params
 
-stable_contract = (
-    w3.eth.contract(address=Web3.to_checksum_address(STABLE_TOKEN), abi=stable_abi)
-    if STABLE_TOKEN and stable_abi
-    else None
-)
 
+def _build_and_send(tx_dict, wait_for_receipt=True, timeout=120, on_signed=None):
+    """Sign with the managed nonce and broadcast.
 
-def _build_and_send(tx_dict, wait_for_receipt=True, timeout=120):
+    `on_signed(tx_hash, nonce, raw_tx)` runs after signing and before the broadcast,
+    so a caller can persist the tx and later rebroadcast it instead of signing again.
+    """
     if not PRIVATE_KEY or not WALLET_ADDRESS:
         raise RuntimeError("PRIVATE_KEY and WALLET_ADDRESS must be set")
+    client = get_client()
+    w3, nonce_manager, gas_oracle = client.w3, client.nonce_manager, client.gas_oracle
 
-    tx_dict.setdefault(
-        "nonce", w3.eth.get_transaction_count(Web3.to_checksum_address(WALLET_ADDRESS))
-    )
-    if "gasPrice" not in tx_dict:
-        tx_dict["gasPrice"] = w3.to_wei("20", "gwei")
+    if "gasPrice" not in tx_dict and "maxFeePerGas" not in tx_dict:
+        tx_dict.update(gas_oracle.fees())
     if "gas" not in tx_dict:
         tx_dict["gas"] = 300_000
 
-    signed = w3.eth.account.sign_transaction(tx_dict, private_key=PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
+    managed = "nonce" not in tx_dict
+    for attempt in range(2):
+        if managed:
+            tx_dict["nonce"] = nonce_manager.allocate()
+        signed = w3.eth.account.sign_transaction(tx_dict, private_key=PRIVATE_KEY)
+        if on_signed:
+            on_signed(w3.to_hex(signed.hash), tx_dict["nonce"], w3.to_hex(signed.rawTransaction))
+        try:
+            tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
+            break
+        except Exception as e:
+            # the allocated nonce was not consumed (or was already taken): re-read it from the chain
+            if managed:
+                nonce_manager.resync()
+            if "underpriced" in str(e).lower():
+                gas_oracle.invalidate()
+            if not managed or attempt or not is_nonce_error(e):
+                raise
     tx_hex = w3.to_hex(tx_hash)
     result = {"tx_hash": tx_hex}
 
@@ -81,46 +157,87 @@ def _build_and_send(tx_dict, wait_for_receipt=True, timeout=120):
     return result
 
 
+@timed("submit_claim_to_chain")
 def submit_claim_to_chain(
-    policy_id: int, stress_level: int, payout_percentage_scaled: int, wait_for_receipt=True
+    policy_id: int, stress_level: int, payout_percentage_scaled: int, wait_for_receipt=True, on_signed=None
 ):
+    pool_contract = get_pool_contract()
     if pool_contract is None:
         raise RuntimeError("Pool contract not initialized. Check INSURANCE_POOL and ABI")
     try:
         fn = pool_contract.functions.submitOracleData(
             policy_id, int(stress_level), int(payout_percentage_scaled)
         )
-        tx = fn.build_transaction({"from": Web3.to_checksum_address(WALLET_ADDRESS)})
-        return _build_and_send(tx, wait_for_receipt=wait_for_receipt)
+        tx = fn.build_transaction(_tx_params())
+        return _build_and_send(tx, wait_for_receipt=wait_for_receipt, on_signed=on_signed)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def pool_has_batch():
+    """True if abi/FarmInsurancePool.json exposes submitOracleDataBatch (the committed artifact predates it)."""
+    return any(e.get("name") == "submitOracleDataBatch" for e in load_abi(POOL_ABI_PATH))
+
+
+@timed("submit_claims_batch_to_chain")
+def submit_claims_batch_to_chain(items, wait_for_receipt=True, on_signed=None):
+    """items: [(policy_id, stress_level, payout_percentage_scaled), ...] sent as one submitOracleDataBatch tx.
+
+    Needs a pool deployed from the current contracts/FarmInsurancePool.sol; invalid entries are
+    skipped on-chain (OracleDataSkipped) rather than reverting the batch.
+    """
+    pool_contract = get_pool_contract()
+    if pool_contract is None:
+        raise RuntimeError("Pool contract not initialized. Check INSURANCE_POOL and ABI")
+    try:
+        ids = [int(p) for p, _, _ in items]
+        levels = [int(l) for _, l, _ in items]
+        pcts = [int(s) for _, _, s in items]
+        fn = pool_contract.functions.submitOracleDataBatch(ids, levels, pcts)
+        tx = fn.build_transaction(_tx_params())
+        return _build_and_send(tx, wait_for_receipt=wait_for_receipt, on_signed=on_signed)
     except Exception as e:
         return {"error": str(e)}
 
 
 def execute_payout_onchain(policy_id: int, wait_for_receipt=True):
+    pool_contract = get_pool_contract()
     if pool_contract is None:
         raise RuntimeError("Pool contract not initialized")
     try:
         fn = pool_contract.functions.executePayout(policy_id)
-        tx = fn.build_transaction({"from": Web3.to_checksum_address(WALLET_ADDRESS)})
+        tx = fn.build_transaction(_tx_params())
         return _build_and_send(tx, wait_for_receipt=wait_for_receipt)
     except Exception as e:
         return {"error": str(e)}
 
 
 def authorize_oracle(oracle_addr: str):
+    pool_contract = get_pool_contract()
     if pool_contract is None:
         raise RuntimeError("Pool contract not initialized")
     try:
         fn = pool_contract.functions.authorizeOracle(Web3.to_checksum_address(oracle_addr))
-        tx = fn.build_transaction({"from": Web3.to_checksum_address(WALLET_ADDRESS)})
+        tx = fn.build_transaction(_tx_params())
         return _build_and_send(tx)
     except Exception as e:
         return {"error": str(e)}
 
 
+def rebroadcast(raw_tx: str):
+    """Send an already signed tx (hex) again; the node answers 'already known' if it still has it."""
+    try:
+        w3 = get_w3()
+        return {"tx_hash": w3.to_hex(w3.eth.send_raw_transaction(raw_tx))}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@timed("get_tx_status")
 def get_tx_status(tx_hash: str):
     try:
-        receipt = w3.eth.get_transaction_receipt(tx_hash)
-        return {"tx_hash": tx_hash, "status": receipt.status, "receipt": dict(receipt)}
+        receipt = get_w3().eth.get_transaction_receipt(tx_hash)
+        # to_json turns HexBytes/AttributeDict into plain JSON types for the API response
+        return {"tx_hash": tx_hash, "status": receipt.status, "receipt": json.loads(Web3.to_json(receipt))}
     except Exception as e:
         return {"error": str(e)}
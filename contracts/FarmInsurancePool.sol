@@ -57,6 +57,12 @@ contract FarmInsurancePool is ReentrancyGuard, Ownable {
         address indexed farmer,
         uint256 amount
     );
+    // reason: 1=invalid policy, 2=bad stress level, 3=percentage > 1e6,
+    //         4=policy not active, 5=already paid out, 6=insufficient pool balance
+    event OracleDataSkipped(
+        uint256 indexed policyId,
+        uint8 reason
+    );
 
     modifier onlyAuthorizedOracle() {
         require(authorizedOracles[msg.sender], "Not authorized oracle");
@@ -115,6 +121,61 @@ contract FarmInsurancePool is ReentrancyGuard, Ownable {
         require(policy.active, "Policy not active");
         require(!policy.paidOut, "Already paid out");
 
+        _recordOracleData(policyId, stressLevel, payoutPercentage);
+    }
+
+    /**
+     * @dev Batched submitOracleData: one tx, one signature and one 21k base cost for many claims.
+     * Entries that would revert on their own are skipped (OracleDataSkipped) instead of
+     * reverting the whole batch. Returns the number of entries applied.
+     */
+    function submitOracleDataBatch(
+        uint256[] calldata ids,
+        uint8[] calldata levels,
+        uint256[] calldata pcts
+    ) external onlyAuthorizedOracle nonReentrant returns (uint256 accepted) {
+        require(ids.length == levels.length && ids.length == pcts.length, "Length mismatch");
+
+        for (uint256 i = 0; i < ids.length; i++) {
+            uint8 reason = _oracleDataError(ids[i], levels[i], pcts[i]);
+            if (reason != 0) {
+                emit OracleDataSkipped(ids[i], reason);
+                continue;
+            }
+            _recordOracleData(ids[i], levels[i], pcts[i]);
+            accepted++;
+        }
+    }
+
+    // Mirrors the require() checks of submitOracleData plus the pool balance check
+    // of _executePayout, so a batch entry is skipped rather than reverting.
+    function _oracleDataError(
+        uint256 policyId,
+        uint8 stressLevel,
+        uint256 payoutPercentage
+    ) internal view returns (uint8) {
+        if (policyId > policyCount || policyId == 0) return 1;
+        if (stressLevel > 1) return 2;
+        if (payoutPercentage > 1_000_000) return 3;
+
+        Policy storage policy = policies[policyId];
+        if (!policy.active) return 4;
+        if (policy.paidOut) return 5;
+
+        if (stressLevel == 1) {
+            uint256 owed = policy.insuredAmount == 0
+                ? policy.premium
+                : (policy.insuredAmount * payoutPercentage) / 1_000_000;
+            if (stableToken.balanceOf(address(this)) < owed) return 6;
+        }
+        return 0;
+    }
+
+    function _recordOracleData(
+        uint256 policyId,
+        uint8 stressLevel,
+        uint256 payoutPercentage
+    ) internal {
         oracleResults[policyId] = OracleResult({
             fulfilled: true,
             stressLevel: stressLevel,
@@ -0,0 +1,99 @@
+# Compile MODEL 2 RandomForest into flat NumPy arrays for serving
+#
+#   python model_training/compile_model2.py
+#
+# Reads models/model2_rf.joblib and writes models/model2_forest/ with one .npy per
+# node array (feature, threshold, left, right, value, roots) plus meta.json.
+# backend/ml.py loads them with mmap_mode="r" and walks all trees vectorized.
+import argparse, json, os, sys, time
+import numpy as np
+import pandas as pd
+import joblib
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+FEATURES = ['NDVI', 'Expected_Yield', 'Crop_Stress_Indicator', 'Temperature',
+            'Rainfall', 'Soil_Moisture', 'Crop_Type_encoded', 'Canopy_Coverage',
+            'Pest_Damage', 'Leaf_Area_Index']
+
+
+def flatten_forest(rf):
+    """Concatenate every tree of a fitted forest into global node arrays.
+
+    Child indices are rebased to global node ids. Leaves get feature 0, an +inf
+    threshold and point at themselves, so a walk that reaches a leaf stays there.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for est in rf.estimators_:
+        t = est.tree_
+        n = t.node_count
+        is_leaf = t.children_left == -1
+        node_ids = np.arange(offset, offset + n)
+        feature.append(np.where(is_leaf, 0, t.feature).astype(np.int32))
+        threshold.append(np.where(is_leaf, np.inf, t.threshold).astype(np.float64))
+        left.append(np.where(is_leaf, node_ids, t.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, node_ids, t.children_right + offset).astype(np.int32))
+        value.append(t.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        max_depth = max(max_depth, int(t.max_depth))
+        offset += n
+    return {
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "value": np.concatenate(value),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }, max_depth
+
+
+def write_forest(arrays, max_depth, out_dir, features=FEATURES):
+    os.makedirs(out_dir, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+    meta = {"n_trees": int(len(arrays["roots"])), "n_nodes": int(len(arrays["feature"])),
+            "max_depth": int(max_depth), "features": list(features)}
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def load_payout_features(path):
+    df = pd.read_csv(path)
+    if "Crop_Type_encoded" not in df.columns:
+        crop_map = {"Wheat": 0, "Maize": 1, "Rice": 2}
+        df["Crop_Type_encoded"] = df["Crop_Type"].map(crop_map)
+    return df[FEATURES].to_numpy(dtype=np.float64)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Flatten the Model 2 forest into .npy node arrays")
+    ap.add_argument("--model", default=os.path.join(ROOT, "models", "model2_rf.joblib"))
+    ap.add_argument("--out", default=os.path.join(ROOT, "models", "model2_forest"))
+    ap.add_argument("--data", default=os.path.join(ROOT, "model2_payout_prediction_dataset.csv"))
+    args = ap.parse_args()
+
+    rf = joblib.load(args.model)
+    arrays, max_depth = flatten_forest(rf)
+    meta = write_forest(arrays, max_depth, args.out)
+    print(f"💾 wrote {args.out}: {meta['n_trees']} trees, {meta['n_nodes']} nodes, depth {meta['max_depth']}")
+
+    # ===== Single-row latency (parity with reg.predict: backend/tests/test_flat_forest.py) =====
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    from ml import FlatForest
+
+    X = load_payout_features(args.data)
+    forest = FlatForest.load(args.out)
+    rf.n_jobs = 1
+    row = X[:1]
+    for name, fn in (("sklearn", lambda: rf.predict(pd.DataFrame(row, columns=FEATURES))), ("flat", lambda: forest.predict(row))):
+        fn()
+        n = 200
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        print(f"{name:>8} single-row predict: {(time.perf_counter() - t0) / n * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
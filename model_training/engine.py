@@ -0,0 +1,410 @@
+# Training engine for MODEL 1 (FFN) and MODEL 2 (RandomForest)
+#
+#   python model_training/engine.py model1 --trials 12 --workers 4
+#   python model_training/engine.py model2 --trials 8 --workers 2
+#
+# The CSV is read once, split into train/val/test and saved as .npy under the
+# run directory; every hyperparameter trial runs in a worker process (spawn)
+# that memory-maps those arrays and gets cpu_count // workers torch/sklearn
+# threads. Model 1 streams shuffled mini-batches chunk by chunk from the mmap'd
+# split (standardized per batch, never copied whole) and stops early when the
+# validation loss stops improving; Model 2 grows the forest with warm_start
+# in --tree-step increments and stops when validation RMSE does.
+#
+# Each run lands in models/runs/<model>/<timestamp>-<id>/ with run.json (wall
+# clock, every trial's params and metrics) and the best trial's serving
+# artifacts: model1_ffn.npz (+ .pth/scaler) or model2_forest/ (+ model2_rf.joblib).
+# Point the backend at it with MODEL1_DIR / MODEL2_DIR.
+import argparse, json, math, os, random, shutil, sys, time, uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODEL1_FEATURES = ['NDVI', 'SAVI', 'Chlorophyll_Content', 'Leaf_Area_Index',
+                   'Temperature', 'Humidity', 'Rainfall', 'Soil_Moisture']
+MODEL2_FEATURES = ['NDVI', 'Expected_Yield', 'Crop_Stress_Indicator', 'Temperature',
+                   'Rainfall', 'Soil_Moisture', 'Crop_Type_encoded', 'Canopy_Coverage',
+                   'Pest_Damage', 'Leaf_Area_Index']
+
+SEARCH_SPACE = {
+    "model1": {
+        "hidden": [[64, 32], [128, 64], [32, 16], [256, 128]],
+        "lr": ("log", 1e-4, 1e-2),
+        "batch_size": [128, 256, 512, 1024],
+        "weight_decay": [0.0, 1e-5, 1e-4],
+    },
+    "model2": {
+        "max_depth": [8, 10, 12, 16, None],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": [1.0, 0.7, 0.5, "sqrt"],
+    },
+}
+# the hard-coded configurations of train_model1.py / train_model2.py, always tried first
+BASELINE = {
+    "model1": {"hidden": [64, 32], "lr": 1e-3, "batch_size": 256, "weight_decay": 0.0},
+    "model2": {"max_depth": 12, "min_samples_leaf": 1, "max_features": 1.0},
+}
+
+
+# ===== Data =====
+def load_dataset(model, path):
+    df = pd.read_csv(path)
+    if model == "model1":
+        return df[MODEL1_FEATURES].to_numpy(dtype=np.float32), df["is_stressed"].to_numpy(dtype=np.float32)
+    if "Crop_Type_encoded" not in df.columns:
+        df["Crop_Type_encoded"] = df["Crop_Type"].map({"Wheat": 0, "Maize": 1, "Rice": 2})
+    return df[MODEL2_FEATURES].to_numpy(dtype=np.float64), df["payout_percentage"].to_numpy(dtype=np.float64)
+
+
+def split_to_disk(X, y, out_dir, val_frac, test_frac, seed, stratify):
+    """Shuffle once, write train/val/test .npy for the workers to mmap."""
+    from sklearn.model_selection import train_test_split
+    strat = y if stratify else None
+    X_rest, X_test, y_rest, y_test = train_test_split(X, y, test_size=test_frac, random_state=seed, stratify=strat)
+    strat = y_rest if stratify else None
+    X_tr, X_val, y_tr, y_val = train_test_split(X_rest, y_rest, test_size=val_frac / (1 - test_frac),
+                                                random_state=seed, stratify=strat)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, arr in (("X_train", X_tr), ("y_train", y_tr), ("X_val", X_val), ("y_val", y_val),
+                      ("X_test", X_test), ("y_test", y_test)):
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+    return {"train": len(y_tr), "val": len(y_val), "test": len(y_test)}
+
+
+def split_store_to_disk(model, store_root, out_dir, val_frac, test_frac, seed, chunk_rows=262144,
+                        include_claims=False):
+    """Stream a feature-store table into train/val/test .npy without holding it in memory.
+
+    Only the seed rows by default: claim rows are labelled with the served model's own
+    predictions, so training on them feeds the model its outputs back (`include_claims`).
+
+    Rows are assigned to splits by a seeded per-row draw (not stratified), so two
+    passes over the memory-mapped columns replay the same assignment: one to size
+    the outputs, one to fill them.
+    """
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    from feature_store import FeatureStore, SOURCE_SEED
+    table = FeatureStore(store_root).table("stress" if model == "model1" else "payout")
+    source = None if include_claims else SOURCE_SEED
+    dtype = np.float32 if model == "model1" else np.float64
+    cuts = np.array([1 - val_frac - test_frac, 1 - test_frac])
+    names = ("train", "val", "test")
+
+    def assignments():
+        rng = np.random.default_rng(seed)
+        for X, y in table.iter_matrix(chunk_rows, source=source):
+            yield X, y, np.searchsorted(cuts, rng.random(len(y)), side="right")
+
+    sizes = dict.fromkeys(names, 0)
+    for _, y, which in assignments():
+        for i, name in enumerate(names):
+            sizes[name] += int((which == i).sum())
+    os.makedirs(out_dir, exist_ok=True)
+    out, pos = {}, dict.fromkeys(names, 0)
+    for name in names:
+        out["X_" + name] = np.lib.format.open_memmap(os.path.join(out_dir, f"X_{name}.npy"), mode="w+", dtype=dtype,
+                                                     shape=(sizes[name], len(table.features)))
+        out["y_" + name] = np.lib.format.open_memmap(os.path.join(out_dir, f"y_{name}.npy"), mode="w+", dtype=dtype,
+                                                     shape=(sizes[name],))
+    for X, y, which in assignments():
+        for i, name in enumerate(names):
+            keep = which == i
+            n = int(keep.sum())
+            out["X_" + name][pos[name]:pos[name] + n] = X[keep]
+            out["y_" + name][pos[name]:pos[name] + n] = y[keep]
+            pos[name] += n
+    for arr in out.values():
+        arr.flush()
+    return sizes
+
+
+def load_split(data_dir):
+    return {k: np.load(os.path.join(data_dir, f"{k}.npy"), mmap_mode="r")
+            for k in ("X_train", "y_train", "X_val", "y_val", "X_test", "y_test")}
+
+
+def sample_params(model, rng):
+    params = {}
+    for k, space in SEARCH_SPACE[model].items():
+        if isinstance(space, tuple) and space[0] == "log":
+            params[k] = float(math.exp(rng.uniform(math.log(space[1]), math.log(space[2]))))
+        else:
+            params[k] = rng.choice(space)
+    return params
+
+
+# ===== MODEL 1: FFN =====
+def _ffn(input_dim, hidden):
+    import torch.nn as nn
+
+    # train_model1.FFN with configurable hidden widths; same state_dict keys (layers.0, layers.2, ...)
+    class FFN(nn.Module):
+        def __init__(self):
+            super().__init__()
+            layers, prev = [], input_dim
+            for h in hidden:
+                layers += [nn.Linear(prev, h), nn.ReLU()]
+                prev = h
+            self.layers = nn.Sequential(*layers, nn.Linear(prev, 1), nn.Sigmoid())
+        def forward(self, x):
+            return self.layers(x)
+
+    return FFN()
+
+
+CHUNK_ROWS = 65536  # rows of a mmap'd split read into memory at a time
+
+
+def _chunks(X, y=None, chunk_rows=CHUNK_ROWS, order=None):
+    """(x, y) float32 copies of one row range of the split at a time, in ``order`` of chunk starts."""
+    starts = range(0, len(X), chunk_rows) if order is None else order
+    for s in starts:
+        yield (np.array(X[s:s + chunk_rows], dtype=np.float32),  # copy: the mmap is read-only
+               None if y is None else np.array(y[s:s + chunk_rows], dtype=np.float32))
+
+
+def _minibatches(X, y, mean, scale, batch_size, rng, chunk_rows=CHUNK_ROWS):
+    """Shuffled, standardized mini-batches: chunks in random order, rows shuffled within each chunk."""
+    order = rng.permutation(np.arange(0, len(X), chunk_rows))
+    for xs, ys in _chunks(X, y, chunk_rows, order):
+        idx = rng.permutation(len(xs))
+        for b in range(0, len(idx), batch_size):
+            take = idx[b:b + batch_size]
+            yield (xs[take] - mean) / scale, ys[take]
+
+
+def train_model1(params, data, threads, max_epochs, patience, seed, out_dir):
+    import torch
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.metrics import accuracy_score, f1_score
+    import joblib
+    from export_model1 import fold_weights
+
+    torch.set_num_threads(threads)
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    X_train, y_train = data["X_train"], data["y_train"]
+    scaler = StandardScaler()
+    for xs, _ in _chunks(X_train):
+        scaler.partial_fit(xs)
+    mean, scale = scaler.mean_.astype(np.float32), scaler.scale_.astype(np.float32)
+    tensor = lambda a: torch.from_numpy(np.ascontiguousarray(a, dtype=np.float32))
+
+    model = _ffn(X_train.shape[1], params["hidden"])
+    pos = float(np.sum(y_train, dtype=np.float64))
+    # positives weighted n / (2 * positives), negatives 1; train_model1.py's BCELoss weight is one
+    # constant for every sample, which rescales the loss without rebalancing the classes
+    pos_weight = len(y_train) / (2 * pos) if pos else 1.0
+    optimizer = torch.optim.Adam(model.parameters(), lr=params["lr"], weight_decay=params["weight_decay"])
+
+    def weighted_bce(out, target, reduction="mean"):
+        if not torch.isfinite(out).all():
+            return out.new_tensor(float("nan"))  # binary_cross_entropy raises on NaN outputs
+        w = torch.where(target > 0.5, torch.full_like(target, pos_weight), torch.ones_like(target))
+        return torch.nn.functional.binary_cross_entropy(out, target, weight=w, reduction=reduction)
+
+    def predict(X):
+        # eval pass over a split, chunk by chunk; only the 1-D outputs are kept
+        with torch.no_grad():
+            return np.concatenate([model(tensor((xs - mean) / scale)).numpy().ravel()
+                                   for xs, _ in _chunks(X)])
+
+    def val_loss_of():
+        total = 0.0
+        with torch.no_grad():
+            for xs, ys in _chunks(data["X_val"], data["y_val"]):
+                total += float(weighted_bce(model(tensor((xs - mean) / scale)), tensor(ys).view(-1, 1), "sum"))
+        return total / len(data["X_val"])
+
+    best, best_state, bad, epochs = float("inf"), None, 0, 0
+    for epoch in range(max_epochs):
+        model.train()
+        for xb, yb in _minibatches(X_train, y_train, mean, scale, int(params["batch_size"]), rng):
+            optimizer.zero_grad()
+            loss = weighted_bce(model(tensor(xb)), tensor(yb).view(-1, 1))
+            if not torch.isfinite(loss):
+                break
+            loss.backward()
+            optimizer.step()
+        model.eval()
+        val_loss = val_loss_of()
+        epochs = epoch + 1
+        if not np.isfinite(val_loss):
+            break  # diverged: the weights are NaN/inf from here on, keep the best epoch so far
+        if val_loss < best - 1e-5:
+            best, bad = val_loss, 0
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        else:
+            bad += 1
+            if bad >= patience:
+                break
+    if best_state is None:
+        raise ValueError(f"no epoch reached a finite validation loss ({epochs} epochs, "
+                         f"lr={params['lr']}); no model to keep")
+    model.load_state_dict(best_state)
+    model.eval()
+    val_pred = (predict(data["X_val"]) >= 0.5).astype(int)
+    test_pred = (predict(data["X_test"]) >= 0.5).astype(int)
+
+    os.makedirs(out_dir, exist_ok=True)
+    torch.save({"model_state_dict": model.state_dict(), "hidden": list(params["hidden"])},
+               os.path.join(out_dir, "model1_ffn.pth"))
+    joblib.dump(scaler, os.path.join(out_dir, "model1_ffn_scaler.joblib"))
+    linear_keys = [k[:-len(".weight")] for k in model.state_dict() if k.endswith(".weight")]
+    layers = fold_weights(model.state_dict(), scaler, linear_keys)
+    arrays = {}
+    for i, (w, b) in enumerate(layers):
+        arrays[f"w{i}"], arrays[f"b{i}"] = w, b
+    np.savez(os.path.join(out_dir, "model1_ffn.npz"), features=np.array(MODEL1_FEATURES),
+             n_layers=np.array(len(layers)), **arrays)
+    y_val_np, y_te_np = np.asarray(data["y_val"]).astype(int), np.asarray(data["y_test"]).astype(int)
+    return {"val_loss": best, "val_accuracy": float(accuracy_score(y_val_np, val_pred)),
+            "test_accuracy": float(accuracy_score(y_te_np, test_pred)),
+            "test_f1": float(f1_score(y_te_np, test_pred)), "epochs": epochs}
+
+
+# ===== MODEL 2: RandomForest =====
+def train_model2(params, data, threads, max_trees, tree_step, patience, seed, out_dir):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_squared_error, r2_score
+    import joblib
+    from compile_model2 import flatten_forest, write_forest
+
+    X_tr, y_tr = np.asarray(data["X_train"]), np.asarray(data["y_train"])
+    X_val, y_val = np.asarray(data["X_val"]), np.asarray(data["y_val"])
+    rf = RandomForestRegressor(n_estimators=tree_step, max_depth=params["max_depth"],
+                               min_samples_leaf=params["min_samples_leaf"], max_features=params["max_features"],
+                               random_state=seed, n_jobs=threads, warm_start=True)
+    best, best_n, bad = float("inf"), tree_step, 0
+    while True:
+        rf.fit(X_tr, y_tr)
+        rmse = float(np.sqrt(mean_squared_error(y_val, rf.predict(X_val))))
+        if rmse < best - 1e-4:
+            best, best_n, bad = rmse, rf.n_estimators, 0
+        else:
+            bad += 1
+        if bad >= patience or rf.n_estimators >= max_trees:
+            break
+        rf.n_estimators += tree_step
+    rf.estimators_ = rf.estimators_[:best_n]  # drop the trees grown past the best validation score
+    rf.n_estimators = best_n
+    rf.warm_start = False
+    rf.n_jobs = 1
+
+    y_pred = rf.predict(np.asarray(data["X_test"]))
+    y_te = np.asarray(data["y_test"])
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(rf, os.path.join(out_dir, "model2_rf.joblib"))
+    arrays, max_depth = flatten_forest(rf)
+    write_forest(arrays, max_depth, os.path.join(out_dir, "model2_forest"), MODEL2_FEATURES)
+    return {"val_rmse": best, "test_rmse": float(np.sqrt(mean_squared_error(y_te, y_pred))),
+            "test_r2": float(r2_score(y_te, y_pred)), "n_estimators": best_n}
+
+
+# ===== Search =====
+def run_trial(model, trial_id, params, data_dir, out_dir, threads, opts):
+    """Worker-process entry point: train one configuration, return its metrics."""
+    t0 = time.perf_counter()
+    data = load_split(data_dir)
+    if model == "model1":
+        metrics = train_model1(params, data, threads, opts["max_epochs"], opts["patience"], opts["seed"], out_dir)
+    else:
+        metrics = train_model2(params, data, threads, opts["max_trees"], opts["tree_step"], opts["patience"],
+                               opts["seed"], out_dir)
+    return {"trial": trial_id, "params": params, "metrics": metrics, "seconds": round(time.perf_counter() - t0, 2)}
+
+
+def objective(model, result):
+    """Lower is better."""
+    return result["metrics"]["val_loss"] if model == "model1" else result["metrics"]["val_rmse"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Train MODEL 1 / MODEL 2 with a parallel hyperparameter search")
+    ap.add_argument("model", choices=["model1", "model2"])
+    ap.add_argument("--data", help="CSV (defaults to the dataset in the repo root)")
+    ap.add_argument("--store", nargs="?", const=os.environ.get("FEATURE_STORE_DIR", os.path.join(ROOT, "feature_store")),
+                    help="train from the feature store (backend/feature_store.py) instead of a CSV")
+    ap.add_argument("--include-claims", action="store_true",
+                    help="with --store, also train on claim rows (labelled with the served model's predictions)")
+    ap.add_argument("--out-root", default=os.path.join(ROOT, "models", "runs"))
+    ap.add_argument("--trials", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    ap.add_argument("--threads", type=int, help="torch/sklearn threads per trial (default cpu_count // workers)")
+    ap.add_argument("--val-frac", type=float, default=0.15)
+    ap.add_argument("--test-frac", type=float, default=0.15)
+    ap.add_argument("--max-epochs", type=int, default=200)
+    ap.add_argument("--patience", type=int, default=10, help="epochs (model1) / tree steps (model2) without improvement")
+    ap.add_argument("--max-trees", type=int, default=500)
+    ap.add_argument("--tree-step", type=int, default=25)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--keep-trials", action="store_true", help="keep every trial's artifacts, not just the best")
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    data_path = args.data or os.path.join(ROOT, "model1_stress_detection_dataset_balanced.csv" if args.model == "model1"
+                                          else "model2_payout_prediction_dataset.csv")
+    run_id = f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    run_dir = os.path.join(args.out_root, args.model, run_id)
+    data_dir = os.path.join(run_dir, "data")
+    if args.store:
+        data_path = args.store
+        sizes = split_store_to_disk(args.model, args.store, data_dir, args.val_frac, args.test_frac, args.seed,
+                                    include_claims=args.include_claims)
+    else:
+        X, y = load_dataset(args.model, data_path)
+        sizes = split_to_disk(X, y, data_dir, args.val_frac, args.test_frac, args.seed, stratify=args.model == "model1")
+        del X, y
+    print(f"run {run_id}: {sizes} rows, {args.trials} trials on {args.workers} workers")
+
+    rng = random.Random(args.seed)
+    configs = [dict(BASELINE[args.model])] + [sample_params(args.model, rng) for _ in range(max(0, args.trials - 1))]
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    opts = {k: getattr(args, k) for k in ("max_epochs", "patience", "max_trees", "tree_step", "seed")}
+
+    results = []
+    # spawn: torch and OpenMP thread pools don't survive fork reliably
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(run_trial, args.model, i, params, data_dir, os.path.join(run_dir, "trials", str(i)),
+                               threads, opts) for i, params in enumerate(configs)]
+        for fut in as_completed(futures):
+            try:
+                r = fut.result()
+            except Exception as e:
+                print(f"trial failed: {e}")
+                continue
+            results.append(r)
+            print(f"trial {r['trial']:>3} {r['seconds']:>7.1f}s  {json.dumps(r['metrics'])}  {json.dumps(r['params'])}")
+    if not results:
+        sys.exit("❌ every trial failed")
+
+    results.sort(key=lambda r: objective(args.model, r))
+    best = results[0]
+    best_dir = os.path.join(run_dir, "trials", str(best["trial"]))
+    for name in os.listdir(best_dir):
+        shutil.move(os.path.join(best_dir, name), os.path.join(run_dir, name))
+    if not args.keep_trials:
+        shutil.rmtree(os.path.join(run_dir, "trials"), ignore_errors=True)
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    summary = {
+        "model": args.model, "run_id": run_id, "data": os.path.abspath(data_path), "rows": sizes,
+        "include_claims": bool(args.store and args.include_claims),
+        "wall_clock_seconds": round(time.perf_counter() - started, 2), "workers": args.workers,
+        "threads_per_trial": threads, "best": best, "trials": sorted(results, key=lambda r: r["trial"]),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+    }
+    with open(os.path.join(run_dir, "run.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    env = "MODEL1_DIR" if args.model == "model1" else "MODEL2_DIR"
+    print(f"\n✅ best trial {best['trial']}: {json.dumps(best['metrics'])}")
+    print(f"💾 {run_dir}  ({summary['wall_clock_seconds']}s)  serve with {env}={run_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Export MODEL 1 FFN to a torch-free .npz for serving
+#
+#   python model_training/export_model1.py
+#
+# Reads models/model1_ffn.pth + models/model1_ffn_scaler.joblib, folds the
+# StandardScaler into the first Linear layer and writes models/model1_ffn.npz,
+# which backend/ml.py runs with plain float32 matmuls.
+import argparse, os, sys
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import joblib
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+FEATURES = ['NDVI', 'SAVI', 'Chlorophyll_Content', 'Leaf_Area_Index',
+            'Temperature', 'Humidity', 'Rainfall', 'Soil_Moisture']
+LINEAR_KEYS = ["layers.0", "layers.2", "layers.4"]  # Linear layers of the nn.Sequential in train_model1.py
+
+
+# same layout as train_model1.FFN so the state_dict keys line up
+class FFN(nn.Module):
+    def __init__(self, input_dim):
+        super(FFN, self).__init__()
+        self.layers = nn.Sequential(
+            nn.Linear(input_dim, 64), nn.ReLU(),
+            nn.Linear(64, 32), nn.ReLU(),
+            nn.Linear(32, 1), nn.Sigmoid()
+        )
+    def forward(self, x):
+        return self.layers(x)
+
+
+def fold_weights(state_dict, scaler, linear_keys=LINEAR_KEYS):
+    """Return [(W, b), ...] with W shaped (in, out) and the scaler folded into layer 0.
+
+    W0 @ ((x - mean) / scale) + b0 == (W0 / scale) @ x + (b0 - W0 @ (mean / scale))
+    """
+    layers = []
+    for key in linear_keys:
+        w = state_dict[f"{key}.weight"].detach().cpu().numpy().astype(np.float64)
+        b = state_dict[f"{key}.bias"].detach().cpu().numpy().astype(np.float64)
+        layers.append([w, b])
+    w0, b0 = layers[0]
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    layers[0] = [w0 / scale, b0 - w0 @ (mean / scale)]
+    return [(w.T.astype(np.float32), b.astype(np.float32)) for w, b in layers]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the Model 1 FFN checkpoint to .npz")
+    ap.add_argument("--checkpoint", default=os.path.join(ROOT, "models", "model1_ffn.pth"))
+    ap.add_argument("--scaler", default=os.path.join(ROOT, "models", "model1_ffn_scaler.joblib"))
+    ap.add_argument("--out", default=os.path.join(ROOT, "models", "model1_ffn.npz"))
+    ap.add_argument("--data", default=os.path.join(ROOT, "model1_stress_detection_dataset_balanced.csv"))
+    ap.add_argument("--atol", type=float, default=1e-5)
+    args = ap.parse_args()
+
+    ckpt = torch.load(args.checkpoint, map_location="cpu")
+    state_dict = ckpt.get("model_state_dict", ckpt)
+    scaler = joblib.load(args.scaler)
+    layers = fold_weights(state_dict, scaler)
+
+    arrays = {}
+    for i, (w, b) in enumerate(layers):
+        arrays[f"w{i}"] = w
+        arrays[f"b{i}"] = b
+    np.savez(args.out, features=np.array(FEATURES), n_layers=np.array(len(layers)), **arrays)
+    print(f"💾 wrote {args.out} ({os.path.getsize(args.out)} bytes)")
+
+    # ===== Parity check against torch =====
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    from ml import FFNEngine
+
+    X = pd.read_csv(args.data)[FEATURES].to_numpy(dtype=np.float64)
+    model = FFN(len(FEATURES))
+    model.load_state_dict(state_dict)
+    model.eval()
+    with torch.no_grad():
+        ref = model(torch.tensor(scaler.transform(X), dtype=torch.float32)).numpy().ravel()
+    got = FFNEngine.load(args.out).predict_proba(X)
+    max_err = float(np.max(np.abs(ref - got)))
+    print(f"max |torch - numpy| over {len(X)} rows: {max_err:.2e}")
+    if max_err > args.atol:
+        sys.exit(f"❌ parity check failed (atol={args.atol})")
+    print("✅ parity check passed")
+
+
+if __name__ == "__main__":
+    main()